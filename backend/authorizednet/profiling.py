@@ -0,0 +1,157 @@
+"""
+Per-request profiling.
+
+For a sampled share of requests (REQUEST_PROFILING_SAMPLE_RATE),
+RequestProfilingMiddleware adds up time spent in SQL queries, in
+Authorize.Net calls and in rendering DRF responses. The totals go out in a
+``Server-Timing`` header, so they show up in the browser's network panel.
+With REQUEST_PROFILING_LOG they are also logged as one JSON line on the
+``authorizednet.profiling`` logger.
+
+Requests that are not sampled cost one random() call. The SQL hook is
+installed on every connection but does nothing outside a profiled request.
+Work handed to other threads (e.g. batch charge workers) is not counted.
+"""
+import contextvars
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger('authorizednet.profiling')
+
+METRICS = (
+    ('db', "SQL"),
+    ('gateway', "Authorize.Net"),
+    ('serialize', "DRF rendering"),
+)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class Profile:
+    __slots__ = ('started', 'durations', 'counts')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = dict.fromkeys((name for name, _ in METRICS), 0.0)
+        self.counts = dict.fromkeys((name for name, _ in METRICS), 0)
+
+
+def record(metric, elapsed):
+    """Add ``elapsed`` seconds to ``metric`` for the request being profiled, if any."""
+    profile = _current.get()
+    if profile is not None:
+        profile.durations[metric] += elapsed
+        profile.counts[metric] += 1
+
+
+def _time_query(execute, sql, params, many, context):
+    if _current.get() is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record('db', time.perf_counter() - started)
+
+
+def _install(connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def _sampled():
+    rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def _start():
+    # Connections this thread opened before the middleware was loaded
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+    return _current.set(Profile())
+
+
+def _finish(request, response, profile):
+    total = time.perf_counter() - profile.started
+    parts = [
+        f'{name};dur={profile.durations[name] * 1000:.1f};desc="{desc} ({profile.counts[name]})"'
+        for name, desc in METRICS
+    ]
+    parts.append(f'total;dur={total * 1000:.1f}')
+    response['Server-Timing'] = ', '.join(parts)
+    # Lets cross-origin pages read the timings through the Resource Timing API
+    if response.has_header('Access-Control-Allow-Origin'):
+        response['Timing-Allow-Origin'] = response['Access-Control-Allow-Origin']
+
+    if settings.REQUEST_PROFILING_LOG:
+        match = request.resolver_match
+        entry = {
+            "method": request.method,
+            "path": request.path,
+            "route": match.route if match else None,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+        }
+        for name, _ in METRICS:
+            entry[f"{name}_ms"] = round(profile.durations[name] * 1000, 1)
+            entry[f"{name}_count"] = profile.counts[name]
+        logger.info(json.dumps(entry))
+    return response
+
+
+class RequestProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(_install, dispatch_uid='authorizednet.profiling')
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not _sampled():
+            return self.get_response(request)
+        token = _start()
+        try:
+            response = self.get_response(request)
+            profile = _current.get()
+        finally:
+            _current.reset(token)
+        return _finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not _sampled():
+            return await self.get_response(request)
+        token = _start()
+        try:
+            response = await self.get_response(request)
+            profile = _current.get()
+        finally:
+            _current.reset(token)
+        return _finish(request, response, profile)
+
+
+class ProfiledJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its time as ``serialize`` to the request profile."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if _current.get() is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            record('serialize', time.perf_counter() - started)
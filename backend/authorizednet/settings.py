@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'authorizednet.profiling.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Added WhiteNoise
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -96,9 +97,39 @@ DATABASES = {
         'OPTIONS': {
             'sslmode': 'require',
         },
+        # Check connections before reuse; with the pool this is its checkout health check
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Connection pooling (psycopg 3). Each worker process keeps a fixed-size pool of
+# TLS connections to CockroachDB instead of opening one per request. Following
+# CockroachDB's guidance: a fixed pool (min = max), sized so all processes together
+# stay around 4 connections per vCPU of the cluster, and connections recycled every
+# few minutes so load rebalances after node restarts.
+DB_POOL = config('DB_POOL', default=True, cast=bool)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=DB_POOL_MAX_SIZE, cast=int)
+# Seconds before a connection is retired (the pool adds jitter); CockroachDB suggests 5-30 minutes
+DB_POOL_MAX_LIFETIME = config('DB_POOL_MAX_LIFETIME', default=300, cast=float)
+# Seconds an idle connection above min size is kept
+DB_POOL_MAX_IDLE = config('DB_POOL_MAX_IDLE', default=300, cast=float)
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+# Without the pool: seconds to keep a per-thread connection open between requests
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=300, cast=int)
+
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'max_lifetime': DB_POOL_MAX_LIFETIME,
+        'max_idle': DB_POOL_MAX_IDLE,
+        'timeout': DB_POOL_TIMEOUT,
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -143,18 +174,41 @@ WHITENOISE_AUTOREFRESH = True
 
 
 # CORS Settings
+from corsheaders.defaults import default_headers
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'prefer')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Location', 'ETag', 'Server-Timing']
 
 # DRF Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'payments.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'authorizednet.profiling.ProfiledJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+# Request profiling: share of requests that get a Server-Timing breakdown (0 turns it off)
+REQUEST_PROFILING_SAMPLE_RATE = config('REQUEST_PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+# Also log each profiled request as a JSON line on the `authorizednet.profiling` logger
+REQUEST_PROFILING_LOG = config('REQUEST_PROFILING_LOG', default=False, cast=bool)
+
+# Shared cache; set CACHE_BACKEND/CACHE_LOCATION (e.g. Redis) when running more than one process
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
 }
 
+# Seconds an authenticated user stays cached (dropped early when the user is saved)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=300, cast=int)
+
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -170,4 +224,114 @@ import os
 AUTHORIZENET_API_LOGIN_ID = "552qQG29hdL"
 AUTHORIZENET_TRANSACTION_KEY = "8pw42w77GG6AYV6G"
 AUTHORIZENET_ENVIRONMENT = "sandbox"
+# Overrides the environment's endpoint, e.g. to point at `manage.py run_gateway_stub`
+AUTHORIZENET_API_URL = config('AUTHORIZENET_API_URL', default='')
+# Signature Key from the merchant interface, used to verify webhook notifications
+AUTHORIZENET_SIGNATURE_KEY = config('AUTHORIZENET_SIGNATURE_KEY', default='')
+
+# JSON codec for gateway traffic: 'auto' (orjson when installed), 'orjson' or 'json'
+AUTHORIZENET_JSON_CODEC = config('AUTHORIZENET_JSON_CODEC', default='auto')
+
+# Gateway tracing: set GATEWAY_LOG_LEVEL=DEBUG to log sampled, redacted exchanges
+GATEWAY_LOG_SAMPLE_RATE = config('GATEWAY_LOG_SAMPLE_RATE', default=1.0, cast=float)  # successful exchanges
+GATEWAY_LOG_ERROR_SAMPLE_RATE = config('GATEWAY_LOG_ERROR_SAMPLE_RATE', default=1.0, cast=float)  # errors, failures
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'payments.gateway': {
+            'handlers': ['console'],
+            'level': config('GATEWAY_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+        'authorizednet.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Bearer token a scraper can use for /api/payments/gateway/metrics/ (admin users need none)
+GATEWAY_METRICS_TOKEN = config('GATEWAY_METRICS_TOKEN', default='')
+
+# Gateway HTTP transport (per worker process)
+AUTHORIZENET_POOL_MAXSIZE = config('AUTHORIZENET_POOL_MAXSIZE', default=10, cast=int)
+AUTHORIZENET_CONNECT_TIMEOUT = config('AUTHORIZENET_CONNECT_TIMEOUT', default=3.05, cast=float)
+AUTHORIZENET_READ_TIMEOUT = config('AUTHORIZENET_READ_TIMEOUT', default=30, cast=float)
+# Upper bound on concurrent gateway connections per event loop (ASGI only)
+AUTHORIZENET_ASYNC_MAX_CONNECTIONS = config('AUTHORIZENET_ASYNC_MAX_CONNECTIONS', default=200, cast=int)
+
+# Serve the charge and subscription create/cancel endpoints with async views.
+# asgi.py turns this on; WSGI deployments keep the synchronous views.
+PAYMENTS_ASYNC_VIEWS = config('PAYMENTS_ASYNC_VIEWS', default=False, cast=bool)
+
+# Batch charges (/charge/batch/)
+BATCH_CHARGE_MAX_ITEMS = config('BATCH_CHARGE_MAX_ITEMS', default=5000, cast=int)
+# Concurrent gateway calls per batch request
+BATCH_CHARGE_CONCURRENCY = config('BATCH_CHARGE_CONCURRENCY', default=10, cast=int)
+# Transaction rows buffered before each bulk insert
+BATCH_CHARGE_WRITE_SIZE = config('BATCH_CHARGE_WRITE_SIZE', default=100, cast=int)
+
+# Declined/errored charge log (buffered, written in the background)
+CHARGE_ATTEMPT_BATCH_SIZE = config('CHARGE_ATTEMPT_BATCH_SIZE', default=200, cast=int)
+CHARGE_ATTEMPT_FLUSH_INTERVAL = config('CHARGE_ATTEMPT_FLUSH_INTERVAL', default=2.0, cast=float)
+
+# Background subscription provisioning (`Prefer: respond-async`)
+SUBSCRIPTION_PROVISIONING_WORKERS = config('SUBSCRIPTION_PROVISIONING_WORKERS', default=4, cast=int)
+SUBSCRIPTION_PROVISIONING_MAX_ATTEMPTS = config('SUBSCRIPTION_PROVISIONING_MAX_ATTEMPTS', default=3, cast=int)
+# Seconds a worker owns a record before another may resume it
+SUBSCRIPTION_PROVISIONING_LEASE = config('SUBSCRIPTION_PROVISIONING_LEASE', default=180, cast=int)
+# Longest `?wait=` accepted by the provisioning status long-poll (async views only)
+SUBSCRIPTION_PROVISIONING_MAX_WAIT = config('SUBSCRIPTION_PROVISIONING_MAX_WAIT', default=25, cast=float)
+
+# Subscription status reconciliation (`manage.py reconcile_subscriptions`)
+SUBSCRIPTION_RECONCILE_PAGE_SIZE = config('SUBSCRIPTION_RECONCILE_PAGE_SIZE', default=1000, cast=int)  # ARB list limit is 1000
+SUBSCRIPTION_RECONCILE_CONCURRENCY = config('SUBSCRIPTION_RECONCILE_CONCURRENCY', default=10, cast=int)
+# Subscriptions synced more recently than this (seconds) are not re-checked one by one
+SUBSCRIPTION_RECONCILE_MAX_AGE = config('SUBSCRIPTION_RECONCILE_MAX_AGE', default=6 * 60 * 60, cast=int)
+
+# Settlement ingestion (`manage.py ingest_settlements`)
+SETTLEMENT_PAGE_SIZE = config('SETTLEMENT_PAGE_SIZE', default=1000, cast=int)  # getTransactionList limit is 1000
+# How far back the first run looks when there is no cursor yet
+SETTLEMENT_INITIAL_LOOKBACK_DAYS = config('SETTLEMENT_INITIAL_LOOKBACK_DAYS', default=31, cast=int)
+
+# Webhook notifications are acknowledged immediately and written in batches
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=500, cast=int)
+WEBHOOK_FLUSH_INTERVAL = config('WEBHOOK_FLUSH_INTERVAL', default=1.0, cast=float)  # seconds
+
+# Public catalog (products, plans)
+CATALOG_CACHE_MAX_AGE = config('CATALOG_CACHE_MAX_AGE', default=60, cast=int)  # Cache-Control max-age, seconds
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)  # server-side entry lifetime
+
+# CockroachDB follower reads for transaction history and catalog detail endpoints
+FOLLOWER_READS = config('FOLLOWER_READS', default=True, cast=bool)
+# Seconds in the past to read at; 0 uses follower_read_timestamp(). Values below the
+# cluster's closed timestamp lag (about 4.8s by default) fall back to the leaseholder.
+FOLLOWER_READ_STALENESS = config('FOLLOWER_READ_STALENESS', default=0.0, cast=float)
+# Seconds a user's own reads stay strongly consistent after they write
+FOLLOWER_READ_RECENT_WRITE_WINDOW = config('FOLLOWER_READ_RECENT_WRITE_WINDOW', default=10, cast=int)
+
+# Rows read per query by the streaming exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Archival of old transactions and subscription payments (archive_payments)
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=365, cast=int)
+ARCHIVE_BATCH_SIZE = config('ARCHIVE_BATCH_SIZE', default=500, cast=int)
+ARCHIVE_BATCH_PAUSE = config('ARCHIVE_BATCH_PAUSE', default=0.5, cast=float)  # seconds between batches
+
+# Days past next_billing_date before an active subscription counts as dunning
+# (the charge settles and posts the day after it runs)
+DUNNING_GRACE_DAYS = config('DUNNING_GRACE_DAYS', default=2, cast=int)
+
+# Idempotency-Key support on /charge/ and subscription creation
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)  # seconds
+# How long a retry waits for the original request before answering 409
+IDEMPOTENCY_WAIT_TIMEOUT = config('IDEMPOTENCY_WAIT_TIMEOUT', default=35, cast=float)
+# How long a request holds its key; past this its worker is presumed dead and the key is failed
+IDEMPOTENCY_LEASE = config('IDEMPOTENCY_LEASE', default=120, cast=int)  # seconds
 
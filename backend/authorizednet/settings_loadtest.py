@@ -0,0 +1,26 @@
+"""
+Settings for ``manage.py loadtest``.
+
+Uses a local SQLite database so benchmark runs never touch the CockroachDB
+cluster; the gateway is replaced by the in-process stand-in started by the
+command itself.
+
+    DJANGO_SETTINGS_MODULE=authorizednet.settings_loadtest python manage.py loadtest
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'loadtest.sqlite3',
+        'OPTIONS': {
+            'timeout': 30,
+        },
+        'TEST': {
+            'NAME': BASE_DIR / 'loadtest.sqlite3',
+        },
+    }
+}
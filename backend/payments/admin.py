@@ -1,9 +1,18 @@
 from django.contrib import admin
-from .models import Product,Subscription,SubscriptionPayment,SubscriptionPlan, CustomerProfile,Transaction
+from .models import Product,Subscription,SubscriptionPayment,SubscriptionPlan, CustomerProfile,Transaction, IdempotencyKey, SubscriptionProvisioning, SyncCursor, WebhookEvent, PaymentProfile, ChargeAttempt, RevenueRollup, ArchivedTransaction, ArchivedSubscriptionPayment
 # Register your models here.
 admin.site.register(Product)
 admin.site.register(Subscription)
 admin.site.register(SubscriptionPayment)
 admin.site.register(SubscriptionPlan)
 admin.site.register(CustomerProfile)
-admin.site.register(Transaction)
\ No newline at end of file
+admin.site.register(Transaction)
+admin.site.register(IdempotencyKey)
+admin.site.register(SubscriptionProvisioning)
+admin.site.register(SyncCursor)
+admin.site.register(WebhookEvent)
+admin.site.register(PaymentProfile)
+admin.site.register(ChargeAttempt)
+admin.site.register(RevenueRollup)
+admin.site.register(ArchivedTransaction)
+admin.site.register(ArchivedSubscriptionPayment)
@@ -0,0 +1,136 @@
+"""
+Time-based tiering for Transaction and SubscriptionPayment.
+
+``archive`` moves rows older than ARCHIVE_AFTER_DAYS into
+ArchivedTransaction / ArchivedSubscriptionPayment, oldest first, in small
+batches. Each batch copies and deletes in one short database transaction
+and is followed by a pause, so the job can run against a live cluster
+without large transactions or contention. Progress is the
+``archive-<name>`` SyncCursor: everything before its position has been
+moved. An interrupted run simply starts again from the oldest row still in
+the primary table. A row whose transaction_id is already archived is left
+in the primary table and logged, and the boundary stays below it.
+
+``tiers`` is the read side: it returns the querysets that can hold rows in
+a time range, touching the archive only when the range reaches before the
+boundary. Rows written with a timestamp older than the boundary (e.g. a
+settlement backfill) are moved by the next run; until then, reads of a
+range that lies wholly in the archive do not see them.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedSubscriptionPayment, ArchivedTransaction, SubscriptionPayment, SyncCursor, Transaction
+
+logger = logging.getLogger(__name__)
+
+TIERS = {
+    # name: (primary model, archive model, time field)
+    'transactions': (Transaction, ArchivedTransaction, 'created_at'),
+    'subscription-payments': (SubscriptionPayment, ArchivedSubscriptionPayment, 'date'),
+}
+
+
+def cursor_name(name):
+    return f'archive-{name}'
+
+
+def boundary(name):
+    """Everything of ``name`` older than this lives in the archive; None if nothing was archived."""
+    return SyncCursor.objects.filter(name=cursor_name(name)).values_list('position', flat=True).first()
+
+
+def tiers(name, start=None, end=None):
+    """
+    Querysets, newest tier first, holding the rows of ``name`` whose time
+    is in [``start``, ``end``). The primary table is skipped when the whole
+    range is archived and the archive is skipped when none of it is.
+    """
+    primary, archive, time_field = TIERS[name]
+    edge = boundary(name)
+    selected = []
+    if edge is None or end is None or end > edge:
+        selected.append(primary.objects.all())
+    if edge is not None and (start is None or start < edge):
+        selected.append(archive.objects.all())
+
+    bounded = []
+    for rows in selected:
+        if start is not None:
+            rows = rows.filter(**{f'{time_field}__gte': start})
+        if end is not None:
+            rows = rows.filter(**{f'{time_field}__lt': end})
+        bounded.append(rows)
+    return bounded
+
+
+def _copy(archive, row):
+    fields = {field.attname: getattr(row, field.attname) for field in row._meta.concrete_fields}
+    return archive(**fields)
+
+
+def _advance(cursor, position, stuck):
+    # The boundary never passes a row that had to stay in the primary table
+    if stuck is not None:
+        position = min(position, stuck)
+    if cursor.position is None or position > cursor.position or (stuck is not None and cursor.position > stuck):
+        cursor.position = position
+        cursor.save()
+
+
+def archive(name, before=None, batch_size=None, pause=None, limit=None):
+    """Move rows of ``name`` older than ``before`` to the archive. Returns run counters."""
+    primary, archive_model, time_field = TIERS[name]
+    before = before or timezone.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    pause = settings.ARCHIVE_BATCH_PAUSE if pause is None else pause
+    cursor, _ = SyncCursor.objects.get_or_create(name=cursor_name(name))
+    pending = primary.objects.filter(**{f'{time_field}__lt': before}).order_by(time_field, 'id')
+    stats = {'moved': 0, 'batches': 0, 'conflicts': 0}
+    after = None
+    stuck = None  # time of the oldest row left behind on a conflict
+
+    while limit is None or stats['moved'] < limit:
+        size = batch_size if limit is None else min(batch_size, limit - stats['moved'])
+        rows = pending
+        if after is not None:
+            rows = rows.filter(Q(**{f'{time_field}__gt': after[0]}) | Q(**{time_field: after[0], 'id__gt': after[1]}))
+        rows = list(rows[:size])
+        if not rows:
+            # Everything older than `before` has been moved or left behind on a conflict
+            _advance(cursor, before, stuck)
+            break
+        after = (getattr(rows[-1], time_field), rows[-1].id)
+        with transaction.atomic():
+            # A transaction_id already in the archive means the row was written
+            # again after it was archived (e.g. a settlement replay). Leave it
+            # where it is rather than lose either copy.
+            taken = set(archive_model.objects.filter(
+                transaction_id__in=[row.transaction_id for row in rows],
+            ).values_list('transaction_id', flat=True))
+            moving = [row for row in rows if row.transaction_id not in taken]
+            conflicts = [row for row in rows if row.transaction_id in taken]
+            archive_model.objects.bulk_create([_copy(archive_model, row) for row in moving])
+            primary.objects.filter(id__in=[row.id for row in moving]).delete()
+            if conflicts:
+                logger.error(
+                    f"Not archiving {len(conflicts)} {name} already in the archive: "
+                    f"{', '.join(row.transaction_id for row in conflicts)}"
+                )
+                oldest = getattr(conflicts[0], time_field)
+                stuck = oldest if stuck is None else min(stuck, oldest)
+            _advance(cursor, after[0], stuck)
+        stats['moved'] += len(moving)
+        stats['conflicts'] += len(conflicts)
+        stats['batches'] += 1
+        if pause:
+            time.sleep(pause)
+
+    logger.info(f"Archived {name}: {stats}")
+    return stats
@@ -0,0 +1,70 @@
+"""
+Declined and errored charge attempts.
+
+Failed charges are appended to ChargeAttempt through a process-wide
+write-behind buffer, so recording one never adds a database write to the
+request. Approved charges are still written to Transaction synchronously.
+"""
+import atexit
+import os
+import threading
+
+from django.conf import settings
+
+from .buffering import BufferedWriter
+from .models import ChargeAttempt
+
+
+def from_response(response, user_id, amount, source='charge'):
+    """Build the ChargeAttempt for a createTransaction response that was not approved."""
+    if not response or 'messages' not in response:
+        return ChargeAttempt(
+            user_id=user_id, amount=amount, source=source,
+            outcome='no_response', message="No response from gateway",
+        )
+    t_response = response.get('transactionResponse') or {}
+    message = (response['messages'].get('message') or [{}])[0]
+    error = (t_response.get('errors') or [{}])[0]
+    return ChargeAttempt(
+        user_id=user_id,
+        amount=amount,
+        source=source,
+        outcome='declined' if t_response.get('responseCode') in ('2', '3', '4') else 'error',
+        transaction_id=t_response.get('transId') or '',
+        response_code=t_response.get('responseCode') or '',
+        error_code=error.get('errorCode') or message.get('code') or '',
+        message=error.get('errorText') or message.get('text') or '',
+    )
+
+
+class AttemptWriter(BufferedWriter):
+    name = 'charge-attempt-writer'
+    description = 'charge attempts'
+
+    def __init__(self, batch_size=None, interval=None):
+        super().__init__(
+            batch_size or settings.CHARGE_ATTEMPT_BATCH_SIZE,
+            interval or settings.CHARGE_ATTEMPT_FLUSH_INTERVAL,
+        )
+
+    def apply(self, batch):
+        ChargeAttempt.objects.bulk_create(batch, batch_size=self.batch_size)
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer = AttemptWriter()
+            _writer_pid = os.getpid()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def record(response, user_id, amount, source='charge'):
+    get_writer().add(from_response(response, user_id, amount, source))
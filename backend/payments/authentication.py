@@ -0,0 +1,100 @@
+import hmac
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.permissions import BasePermission
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# The only user fields cached: what the checks below and the permission classes read
+CACHED_USER_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'auth:user-state:{user_id}'
+
+
+def _cache_entry(user):
+    entry = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+    entry[user._meta.pk.attname] = user.pk
+    # A digest of the password hash, as in the token's revoke claim; never the hash itself
+    entry['revoke_hash'] = get_md5_hash_password(user.password)
+    return entry
+
+
+def _lightweight_user(entry):
+    """A user with only the cached fields loaded; any other field is read from the database on first access."""
+    User = get_user_model()
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in entry]
+    return User.from_db(router.db_for_read(User), names, [entry[name] for name in names])
+
+
+def invalidate_user(user):
+    key = user_cache_key(getattr(user, api_settings.USER_ID_FIELD))
+    cache.delete(key)
+    # Again after commit, in case a request re-cached the old row in between
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the user from the token's user ID claim
+    through the cache, so only a miss costs a database query. Only the pk,
+    the flags in CACHED_USER_FIELDS and the revoke-claim digest are cached,
+    and a hit returns a user with just those fields loaded. Entries live for
+    AUTH_USER_CACHE_TTL seconds and are dropped when the user is saved or
+    deleted (see signals.py). Changes made with ``QuerySet.update()``
+    are only picked up when the entry expires.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = super().get_user(validated_token)
+            cache.set(key, _cache_entry(user), timeout=settings.AUTH_USER_CACHE_TTL)
+            return user
+
+        # Same checks JWTAuthentication applies to a freshly loaded user
+        if api_settings.CHECK_USER_IS_ACTIVE and not entry['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entry['revoke_hash']:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return _lightweight_user(entry)
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """
+    Lets a metrics scraper authenticate with GATEWAY_METRICS_TOKEN as a
+    bearer token. Any other Authorization header is left to the next class.
+    """
+
+    def authenticate(self, request):
+        token = settings.GATEWAY_METRICS_TOKEN
+        if not token:
+            return None
+        header = request.headers.get('Authorization', '').encode()
+        if hmac.compare_digest(header, f"Bearer {token}".encode()):
+            return AnonymousUser(), MetricsTokenAuthentication
+        return None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
+
+
+class HasMetricsToken(BasePermission):
+    def has_permission(self, request, view):
+        return request.auth is MetricsTokenAuthentication
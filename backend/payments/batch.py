@@ -0,0 +1,296 @@
+"""
+Batch charging: fan a list of charges out to the gateway with bounded
+concurrency, yield one result per charge, and persist approved charges with
+bulk inserts. A declined charge is reported as it completes and an approved
+one once its row is written, so its line can say whether the transId was
+already recorded for another charge.
+"""
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import attempts, follower_reads
+from .models import ChargeAttempt, CustomerProfile, Transaction
+from .services import AuthorizeNetService, AsyncAuthorizeNetService
+
+logger = logging.getLogger(__name__)
+
+
+def charge_owners(charges, default_user):
+    """Attribute profile charges to the profile's owner, nonce charges to the caller."""
+    profile_ids = {c['customer_profile_id'] for c in charges if 'customer_profile_id' in c}
+    owners = dict(
+        CustomerProfile.objects.filter(authorize_net_profile_id__in=profile_ids)
+        .values_list('authorize_net_profile_id', 'user_id')
+    )
+    return [
+        owners.get(c['customer_profile_id']) if 'customer_profile_id' in c else default_user.pk
+        for c in charges
+    ]
+
+
+def submit_charge(service, charge):
+    if 'nonce' in charge:
+        return service.create_transaction(charge['amount'], charge['nonce'], charge.get('descriptor'))
+    return service.charge_customer_profile(
+        charge['amount'], charge['customer_profile_id'], charge['payment_profile_id'], charge.get('descriptor')
+    )
+
+
+def charge_result(response):
+    """Reduce a createTransaction response to (approved, transaction_id, response_code, message)."""
+    if not response or 'messages' not in response:
+        return False, None, None, "No response from gateway"
+    t_response = response.get('transactionResponse') or {}
+    if response['messages']['resultCode'] == "Ok" and 'messages' in t_response:
+        return True, t_response.get('transId'), t_response.get('responseCode'), t_response['messages'][0].get('description')
+    if 'errors' in t_response:
+        message = t_response['errors'][0].get('errorText')
+    else:
+        message = response['messages']['message'][0]['text']
+    return False, t_response.get('transId'), t_response.get('responseCode'), message
+
+
+def _claim(transactions, batch_size):
+    """Attach approved charges to rows a webhook or settlement run created first for the same transId."""
+    now = timezone.now()
+    ours = {t.transaction_id: t for t in transactions}
+    claimed = Transaction.objects.filter(transaction_id__in=ours, user__isnull=True).only(
+        'pk', 'transaction_id', 'user_id', 'response_code', 'response_text',
+    )
+    for row in claimed:
+        # Keep the row's status: notifications only ever move it past 'authorized'
+        charge = ours[row.transaction_id]
+        row.user_id = charge.user_id
+        row.response_code = charge.response_code
+        row.response_text = charge.response_text
+        row.updated_at = now
+    Transaction.objects.bulk_update(claimed, ['user', 'response_code', 'response_text', 'updated_at'], batch_size=batch_size)
+
+
+def _record_conflicts(conflicts, owners, source):
+    for charge in conflicts:
+        logger.error(
+            f"Transaction {charge.transaction_id} is already recorded for user {owners[charge.transaction_id]}, "
+            f"keeping the charge for user {charge.user_id} as a conflict"
+        )
+    # Written now rather than through the attempt buffer: these customers were charged
+    ChargeAttempt.objects.bulk_create([
+        ChargeAttempt(
+            user_id=charge.user_id,
+            amount=charge.amount,
+            source=source,
+            outcome='conflict',
+            transaction_id=charge.transaction_id,
+            response_code=charge.response_code or '',
+            message=f"Approved, but transaction {charge.transaction_id} is already recorded "
+                    f"for user {owners[charge.transaction_id]}",
+        )
+        for charge in conflicts
+    ])
+
+
+def _save_resolving_conflicts(transactions, batch_size, source):
+    owners = dict(
+        Transaction.objects.filter(transaction_id__in={t.transaction_id for t in transactions})
+        .values_list('transaction_id', 'user_id')
+    )
+    new, ownerless, conflicts = [], [], []
+    for charge in transactions:
+        if charge.transaction_id not in owners:
+            new.append(charge)
+        elif owners[charge.transaction_id] is None:
+            ownerless.append(charge)
+        else:
+            conflicts.append(charge)
+            continue
+        # A later charge in this list with the same transId conflicts with this one
+        owners[charge.transaction_id] = charge.user_id
+    Transaction.objects.bulk_create(new, batch_size=batch_size)
+    _claim(ownerless, batch_size)
+    _record_conflicts(conflicts, owners, source)
+    return conflicts
+
+
+def save_approved(transactions, batch_size=None, source='charge'):
+    """
+    Insert approved charges and return the ones that could not be stored.
+    A transId that is already stored no longer fails the whole insert: an
+    ownerless row (from a webhook or settlement run) is claimed for the
+    charge's owner, and a charge whose transId is recorded for another
+    charge (e.g. a test-mode "0") is kept in ChargeAttempt as a conflict
+    and returned.
+    """
+    try:
+        with transaction.atomic():
+            Transaction.objects.bulk_create(transactions, batch_size=batch_size)
+        conflicts = []
+    except IntegrityError:
+        # Retried once, for a row inserted concurrently after the lookup
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    conflicts = _save_resolving_conflicts(transactions, batch_size, source)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+    follower_reads.mark_written({t.user_id for t in transactions})
+    return conflicts
+
+
+class TransactionWriter:
+    """
+    Buffers approved charges with their result lines and writes them with
+    bulk_create; a flush returns the lines, with conflicts flagged.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or settings.BATCH_CHARGE_WRITE_SIZE
+        self.pending = []
+
+    @property
+    def full(self):
+        return len(self.pending) >= self.size
+
+    def add(self, transaction, line):
+        self.pending.append((transaction, line))
+
+    def flush(self):
+        if not self.pending:
+            return []
+        conflicts = save_approved([t for t, _ in self.pending], self.size, source='batch')
+        conflicted = {id(t) for t in conflicts}
+        lines = []
+        for t, line in self.pending:
+            if id(t) in conflicted:
+                line = {
+                    **line,
+                    "status": "conflict",
+                    "message": f"Approved, but transaction {t.transaction_id} is already recorded for another charge",
+                }
+            lines.append(line)
+        self.pending = []
+        return lines
+
+
+class BatchRun:
+    def __init__(self, charges, owners):
+        self.charges = charges
+        self.owners = owners
+        self.writer = TransactionWriter()
+        self.succeeded = 0
+        self.conflicts = 0
+
+    def result_line(self, index, response):
+        """The line for a declined charge; an approved one is buffered and its line comes from ``flush``."""
+        charge = self.charges[index]
+        approved, transaction_id, response_code, message = charge_result(response)
+        line = {
+            "index": index,
+            "reference": charge.get('reference'),
+            "status": "success" if approved else "error",
+            "transaction_id": transaction_id,
+            "message": message,
+        }
+        if not approved:
+            attempts.record(response, self.owners[index], charge['amount'], source='batch')
+            return self.encode(line)
+        self.writer.add(Transaction(
+            user_id=self.owners[index],
+            transaction_id=transaction_id,
+            amount=charge['amount'],
+            status='authorized',
+            response_code=response_code,
+            response_text=message,
+        ), line)
+        return None
+
+    def flush(self):
+        lines = self.writer.flush()
+        for line in lines:
+            if line['status'] == 'conflict':
+                self.conflicts += 1
+            else:
+                self.succeeded += 1
+        return [self.encode(line) for line in lines]
+
+    def summary_line(self):
+        return self.encode({"summary": {
+            "total": len(self.charges),
+            "succeeded": self.succeeded,
+            "conflicts": self.conflicts,
+            "failed": len(self.charges) - self.succeeded - self.conflicts,
+        }})
+
+    def encode(self, line):
+        return json.dumps(line).encode() + b'\n'
+
+    def stream(self):
+        service = AuthorizeNetService()
+        with ThreadPoolExecutor(max_workers=settings.BATCH_CHARGE_CONCURRENCY) as pool:
+            futures = {pool.submit(submit_charge, service, charge): i for i, charge in enumerate(self.charges)}
+            reported = set()
+            try:
+                for future in as_completed(futures):
+                    reported.add(future)
+                    line = self.result_line(futures[future], future.result())
+                    if line is not None:
+                        yield line
+                    if self.writer.full:
+                        yield from self.flush()
+                yield from self.flush()
+            finally:
+                # If the client went away, stop dispatching but still record
+                # charges that were already sent to the gateway.
+                for future in futures:
+                    future.cancel()
+                for future, index in futures.items():
+                    if future not in reported and not future.cancelled():
+                        self.result_line(index, future.result())
+                self.flush()
+        yield self.summary_line()
+
+    async def astream(self):
+        service = AsyncAuthorizeNetService()
+        limit = asyncio.Semaphore(settings.BATCH_CHARGE_CONCURRENCY)
+        sent = set()
+        reported = set()
+
+        async def charge(index):
+            async with limit:
+                sent.add(index)
+                return index, await submit_charge(service, self.charges[index])
+
+        tasks = [asyncio.ensure_future(charge(i)) for i in range(len(self.charges))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, response = await next_done
+                reported.add(index)
+                line = self.result_line(index, response)
+                if line is not None:
+                    yield line
+                if self.writer.full:
+                    for line in await sync_to_async(self.flush)():
+                        yield line
+            for line in await sync_to_async(self.flush)():
+                yield line
+        finally:
+            in_flight = []
+            for index, task in enumerate(tasks):
+                if index in reported:
+                    continue
+                if index in sent:
+                    in_flight.append(task)
+                else:
+                    task.cancel()
+            for index, response in await asyncio.gather(*in_flight):
+                self.result_line(index, response)
+            await sync_to_async(self.flush)()
+        yield self.summary_line()
@@ -0,0 +1,89 @@
+"""
+Write-behind buffering shared by the webhook and charge attempt writers.
+
+Items are queued in memory and written by a background thread in batches,
+when ``batch_size`` items are waiting or ``interval`` seconds after the
+first one arrived. ``close`` (registered with atexit by the callers'
+``get_writer``) drains whatever is still buffered. A crash loses at most the
+unflushed batch.
+"""
+import logging
+import threading
+import time
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+MAX_WRITE_ATTEMPTS = 3
+
+
+class BufferedWriter:
+    name = 'buffered-writer'
+    description = 'items'
+
+    def __init__(self, batch_size, interval):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending = []
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def add(self, item):
+        with self.condition:
+            self.pending.append(item)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify()
+        return True
+
+    def _next_batch(self):
+        with self.condition:
+            while not self.pending and not self.closed:
+                self.condition.wait()
+            deadline = time.monotonic() + self.interval
+            while len(self.pending) < self.batch_size and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            batch = self.pending[:self.batch_size]
+            self.pending = self.pending[self.batch_size:]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self.write(batch)
+
+    def apply(self, batch):
+        raise NotImplementedError
+
+    def dropped(self, batch):
+        logger.error(f"Dropped {len(batch)} {self.description} after {MAX_WRITE_ATTEMPTS} attempts")
+
+    def write(self, batch):
+        for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+            close_old_connections()
+            try:
+                self.apply(batch)
+                return
+            except Exception:
+                logger.exception(f"Writing {len(batch)} {self.description} failed (attempt {attempt})")
+                time.sleep(attempt)
+            finally:
+                close_old_connections()
+        self.dropped(batch)
+
+    def close(self):
+        """Flush everything still buffered and stop the writer thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,94 @@
+"""
+Versioned cache for the public catalog (products and plans).
+
+The serialized list is stored as bytes, with its strong ETag, under a key
+that includes a catalog version number. Saving or deleting a Product or
+SubscriptionPlan bumps the version once the transaction commits (see
+signals.py), so stale entries are never read again and simply expire.
+Each process also keeps the bytes for the current version in memory, so
+a warm request costs one cache lookup for the version and no database
+query. Changes made with ``QuerySet.update()`` bypass the signals; call
+``invalidate()`` after those.
+
+With the default per-process LocMemCache a change only invalidates the
+process that made it; configure a shared CACHES backend in production.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
+
+from .models import Product, SubscriptionPlan
+from .serializers import ProductSerializer, SubscriptionPlanSerializer
+
+VERSION_KEY = 'catalog:version'
+
+RESOURCES = {
+    'products': (Product, ProductSerializer),
+    'plans': (SubscriptionPlan, SubscriptionPlanSerializer),
+}
+
+# resource -> (version, etag, body) for this process
+_local = {}
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock rather than 1 so a lost version key can never
+        # point back at entries cached before it was lost.
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _build(resource):
+    model, serializer_class = RESOURCES[resource]
+    body = JSONRenderer().render(serializer_class(model.objects.order_by('pk'), many=True).data)
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return etag, body
+
+
+def get(resource):
+    """Return ``(etag, body)`` for the current catalog version."""
+    version = current_version()
+    entry = _local.get(resource)
+    if entry is not None and entry[0] == version:
+        return entry[1], entry[2]
+
+    key = f'catalog:{resource}:{version}'
+    cached = cache.get(key)
+    if cached is None:
+        cached = _build(resource)
+        cache.set(key, cached, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    _local[resource] = (version, *cached)
+    return cached
+
+
+def _matches(if_none_match, etag):
+    # If-None-Match uses the weak comparison (RFC 9110, 13.1.2): W/ is ignored
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+def respond(request, resource):
+    etag, body = get(resource)
+    if _matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}"
+    return response
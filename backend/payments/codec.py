@@ -0,0 +1,69 @@
+"""
+JSON codecs for gateway traffic.
+
+Codecs encode request dicts to bytes and decode the raw response bytes.
+The UTF-8 BOM that Authorize.Net prepends is skipped without copying the
+body: orjson parses a memoryview slice past it, the stdlib decoder starts
+parsing after it. orjson is used when it is installed, the stdlib
+otherwise; AUTHORIZENET_JSON_CODEC can force one.
+"""
+import codecs
+import json
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _without_bom(body):
+    view = memoryview(body)
+    if view[:3] == codecs.BOM_UTF8:
+        return view[3:]
+    return view
+
+
+class StdlibCodec:
+    name = 'json'
+    decoder = json.JSONDecoder()
+
+    def dumps(self, data):
+        return json.dumps(data).encode()
+
+    def loads(self, body):
+        # json.loads rejects a leading BOM; raw_decode can start past it
+        # instead of copying the text without it. Unlike json.loads it does
+        # not skip leading whitespace itself.
+        text = str(body, 'utf-8')
+        start = json.decoder.WHITESPACE.match(text, 1 if text.startswith('\ufeff') else 0).end()
+        value, end = self.decoder.raw_decode(text, start)
+        if text[end:].strip():
+            raise json.JSONDecodeError("Extra data", text, end)
+        return value
+
+
+class OrjsonCodec:
+    name = 'orjson'
+
+    def dumps(self, data):
+        return orjson.dumps(data)
+
+    def loads(self, body):
+        return orjson.loads(_without_bom(body))
+
+
+CODECS = {
+    'json': StdlibCodec,
+    'orjson': OrjsonCodec,
+}
+
+
+def get_codec(name=None):
+    name = name or settings.AUTHORIZENET_JSON_CODEC
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name == 'orjson' and orjson is None:
+        raise ImportError("AUTHORIZENET_JSON_CODEC is 'orjson' but orjson is not installed")
+    return CODECS[name]()
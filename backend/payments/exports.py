@@ -0,0 +1,163 @@
+"""
+Streaming exports of Transaction and SubscriptionPayment for accounting.
+
+Rows are read in keyset-paginated chunks ordered by (time, id), each chunk
+in its own short follower-read query, so no long-lived cursor or
+transaction is held open and memory stays at one chunk however many rows
+there are. Older rows come from the archive tables when the requested
+range reaches them (see ``archival``). Rows go straight from
+``values_list`` tuples to CSV or NDJSON bytes, optionally gzip-compressed
+as they are produced.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import archival
+from .follower_reads import follower_reads
+from .models import SubscriptionPayment, Transaction
+
+EXPORTS = {
+    # name: (model, time field, [(column, lookup), ...])
+    'transactions': (Transaction, 'created_at', [
+        ('id', 'id'),
+        ('transaction_id', 'transaction_id'),
+        ('user_id', 'user_id'),
+        ('amount', 'amount'),
+        ('status', 'status'),
+        ('response_code', 'response_code'),
+        ('response_text', 'response_text'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ]),
+    'subscription-payments': (SubscriptionPayment, 'date', [
+        ('id', 'id'),
+        ('transaction_id', 'transaction_id'),
+        ('subscription_id', 'subscription__subscription_id'),
+        ('plan', 'subscription__name'),
+        ('user_id', 'subscription__user_id'),
+        ('amount', 'amount'),
+        ('status', 'status'),
+        ('date', 'date'),
+    ]),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def chunks(name, start=None, end=None, chunk_size=None):
+    """Yield lists of row tuples for ``name``, oldest first, ``chunk_size`` at a time."""
+    _, time_field, columns = EXPORTS[name]
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    lookups = [lookup for _, lookup in columns]
+    tiers = [rows.values_list(*lookups) for rows in archival.tiers(name, start, end)]
+    time_index = lookups.index(time_field)
+
+    last = None
+    while True:
+        pages = tiers
+        if last is not None:
+            after = (
+                Q(**{f'{time_field}__gt': last[time_index]}) |
+                Q(**{time_field: last[time_index], 'id__gt': last[0]})
+            )
+            pages = [rows.filter(after) for rows in tiers]
+        # Ranges reaching before the archive boundary read both tables
+        page = pages[0].union(*pages[1:], all=True) if len(pages) > 1 else pages[0]
+        with follower_reads():
+            chunk = list(page.order_by(time_field, 'id')[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+
+
+def encode_csv(name, row_chunks):
+    columns = [column for column, _ in EXPORTS[name][2]]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in row_chunks:
+        writer.writerows([_cell(value) for value in row] for row in chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _json_default(value):
+    # Decimals as strings keep amounts exact
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def encode_ndjson(name, row_chunks):
+    columns = [column for column, _ in EXPORTS[name][2]]
+    for chunk in row_chunks:
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + '\n'
+            for row in chunk
+        ).encode()
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+}
+
+
+def gzipped(parts):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for part in parts:
+        data = compressor.compress(part)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Whether an Accept-Encoding header allows gzip: listed (or matched by
+    ``*``) with a non-zero q-value. ``gzip;q=0`` refuses it.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def stream(name, output_format, start=None, end=None, compress=False, chunk_size=None):
+    """Bytes of the export, produced one chunk at a time."""
+    parts = ENCODERS[output_format](name, chunks(name, start, end, chunk_size))
+    return gzipped(parts) if compress else parts
@@ -0,0 +1,79 @@
+"""
+CockroachDB follower reads for read-only endpoints.
+
+``FollowerReadMixin`` runs a viewset's ``list``/``retrieve`` in a read-only
+transaction ``AS OF SYSTEM TIME`` a few seconds in the past, which any
+replica can serve, so history and catalog browsing does not queue behind
+payment writes on the leaseholders. Everything else keeps reading and
+writing at the present.
+
+Read-your-writes: saving a Transaction (including the batch charge bulk
+inserts) marks its owner in the cache for FOLLOWER_READ_RECENT_WRITE_WINDOW
+seconds, and that user's reads stay strongly consistent until the mark
+expires.
+
+Follower reads only apply on the ``cockroachdb`` backend; elsewhere (and
+inside an existing transaction) the mixin does nothing.
+"""
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+def recent_write_key(user_id):
+    return f'follower-reads:recent-write:{user_id}'
+
+
+def mark_written(user_ids):
+    """Keep reads strongly consistent for these users until the window passes."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    timeout = settings.FOLLOWER_READ_RECENT_WRITE_WINDOW
+    # After commit, so the window covers the moment the rows become visible
+    transaction.on_commit(
+        lambda: cache.set_many({recent_write_key(user_id): True for user_id in user_ids}, timeout)
+    )
+
+
+def wrote_recently(user):
+    return bool(user and user.is_authenticated and cache.get(recent_write_key(user.pk)))
+
+
+def as_of():
+    staleness = settings.FOLLOWER_READ_STALENESS
+    if staleness > 0:
+        return f"'-{staleness:g}s'"
+    return 'follower_read_timestamp()'
+
+
+@contextmanager
+def follower_reads(using=DEFAULT_DB_ALIAS):
+    """Run the block's queries as a historical read, when the backend supports it."""
+    connection = connections[using]
+    if not settings.FOLLOWER_READS or connection.vendor != 'cockroachdb' or connection.in_atomic_block:
+        yield
+        return
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET TRANSACTION AS OF SYSTEM TIME {as_of()}")
+        yield
+
+
+class FollowerReadMixin:
+    """Serve ``list`` and ``retrieve`` from follower reads unless the user has just written."""
+
+    def _follower_reads(self, request):
+        if wrote_recently(request.user):
+            return nullcontext()
+        return follower_reads()
+
+    def list(self, request, *args, **kwargs):
+        with self._follower_reads(request):
+            return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        with self._follower_reads(request):
+            return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,73 @@
+"""
+Structured, redacted, sampled tracing of gateway requests.
+
+Each exchange is logged as one JSON line on the ``payments.gateway`` logger
+at DEBUG. Nothing is copied or serialized unless that level is enabled
+and the exchange is sampled. Successful exchanges are sampled at
+GATEWAY_LOG_SAMPLE_RATE; gateway errors and transport failures at
+GATEWAY_LOG_ERROR_SAMPLE_RATE. Credentials and card data are masked.
+"""
+import json
+import logging
+import random
+
+from django.conf import settings
+
+logger = logging.getLogger('payments.gateway')
+
+REDACTED = '[REDACTED]'
+REDACTED_KEYS = frozenset({
+    'merchantAuthentication', 'opaqueData', 'creditCard', 'bankAccount', 'transactionKey', 'cardCode',
+})
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if k in REDACTED_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+class _Lazy:
+    """Defers building and serializing the log record until a handler formats it."""
+
+    def __init__(self, build):
+        self.build = build
+
+    def __str__(self):
+        return json.dumps(self.build(), default=str)
+
+
+def outcome(response):
+    if response is None:
+        return 'failure'
+    if response.get('messages', {}).get('resultCode') == 'Ok':
+        return 'ok'
+    return 'error'
+
+
+def _sampled(result):
+    rate = settings.GATEWAY_LOG_SAMPLE_RATE if result == 'ok' else settings.GATEWAY_LOG_ERROR_SAMPLE_RATE
+    return rate >= 1 or random.random() < rate
+
+
+def log_exchange(url, request, response, elapsed):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    result = outcome(response)
+    if not _sampled(result):
+        return
+
+    def build():
+        messages = (response or {}).get('messages', {}).get('message') or [{}]
+        return {
+            "request_type": next(iter(request), None),
+            "url": url,
+            "outcome": result,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "message_code": messages[0].get('code'),
+            "request": redact(request),
+            "response": redact(response),
+        }
+    logger.debug('%s', _Lazy(build))
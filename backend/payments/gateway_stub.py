@@ -0,0 +1,429 @@
+"""
+Local stand-in for the Authorize.Net JSON API.
+
+Answers the request types AuthorizeNetService sends with responses shaped
+like the real gateway's, keeping just enough in-memory state (customer
+profiles, subscriptions, settlement batches) for follow-up calls to be
+consistent. Call ``settle()`` to close a settlement batch. Latency,
+error rates, BOM prefixes and throttling are configurable so payment paths
+can be load-tested offline and repeatably. Point AUTHORIZENET_API_URL at it,
+or run it in-process with ``GatewayStub(...).start()``.
+"""
+import asyncio
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+
+OK = {"resultCode": "Ok", "message": [{"code": "I00001", "text": "Successful."}]}
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def _direct_response():
+    """A card validation direct response; field 51 is the masked card number, 52 the card type."""
+    fields = ['1', '1', '1', 'This transaction has been approved.', '000000', 'P', '0'] + [''] * 61
+    fields[50], fields[51] = 'XXXX1111', 'Visa'
+    return ','.join(fields)
+
+
+def _error(code, text):
+    return {"messages": {"resultCode": "Error", "message": [{"code": code, "text": text}]}}
+
+
+class Latency:
+    """
+    Latency distribution parsed from ``kind:args`` (seconds), e.g.
+    ``fixed:0.2``, ``uniform:0.05,0.3``, ``normal:0.2,0.05``,
+    ``lognormal:0.15,0.5`` (median, sigma) or ``exp:0.2`` (mean).
+    """
+
+    ARG_COUNTS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2, 'exp': 1}
+
+    def __init__(self, spec):
+        self.spec = spec
+        kind, _, args = spec.partition(':')
+        self.kind = kind
+        self.args = [float(a) for a in args.split(',')] if args else []
+        if kind not in self.ARG_COUNTS:
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        if len(self.args) != self.ARG_COUNTS[kind]:
+            raise ValueError(f"Latency '{kind}' takes {self.ARG_COUNTS[kind]} argument(s): {spec}")
+        # Checked here so a bad spec fails at startup, not inside a request
+        if kind in ('lognormal', 'exp') and self.args[0] <= 0:
+            raise ValueError(f"Latency '{kind}' needs a positive {'median' if kind == 'lognormal' else 'mean'}: {spec}")
+        if kind in ('normal', 'lognormal') and self.args[1] < 0:
+            raise ValueError(f"Latency '{kind}' needs a non-negative sigma: {spec}")
+        if kind == 'uniform' and self.args[0] > self.args[1]:
+            raise ValueError(f"Latency 'uniform' needs LO <= HI: {spec}")
+
+    def sample(self, rng):
+        if self.kind == 'fixed':
+            value = self.args[0]
+        elif self.kind == 'uniform':
+            value = rng.uniform(self.args[0], self.args[1])
+        elif self.kind == 'normal':
+            value = rng.gauss(self.args[0], self.args[1])
+        elif self.kind == 'lognormal':
+            value = rng.lognormvariate(math.log(self.args[0]), self.args[1])
+        else:
+            value = rng.expovariate(1 / self.args[0])
+        return max(value, 0.0)
+
+
+class GatewayStub:
+    def __init__(self, host='127.0.0.1', port=0, latency='fixed:0', latency_by_type=None,
+                 error_rate=0.0, http_error_rate=0.0, bom_rate=1.0, max_rps=None, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = Latency(latency)
+        self.latency_by_type = {k: Latency(v) for k, v in (latency_by_type or {}).items()}
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        self.bom_rate = bom_rate
+        self.max_rps = max_rps
+        self.rng = random.Random(seed)
+
+        self.calls = Counter()
+        self._ids = itertools.count(60000000001)
+        self.profiles = {}
+        self.subscriptions = {}
+        self.profile_subscriptions = {}
+        self.unsettled = []
+        self.batches = []
+        self._pay_nums = Counter()
+
+        self._tokens = max_rps or 0
+        self._refilled_at = time.monotonic()
+
+        self.handlers = {
+            'createTransactionRequest': self.create_transaction,
+            'createCustomerProfileRequest': self.create_customer_profile,
+            'createCustomerPaymentProfileRequest': self.create_customer_payment_profile,
+            'getCustomerProfileRequest': self.get_customer_profile,
+            'ARBCreateSubscriptionRequest': self.create_subscription,
+            'ARBCancelSubscriptionRequest': self.cancel_subscription,
+            'ARBGetSubscriptionStatusRequest': self.get_subscription_status,
+            'ARBGetSubscriptionListRequest': self.get_subscription_list,
+            'getSettledBatchListRequest': self.get_settled_batch_list,
+            'getTransactionListRequest': self.get_transaction_list,
+        }
+
+        self.loop = None
+        self.server = None
+        self._thread = None
+        self._connections = set()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/xml/v1/request.api"
+
+    # Request handlers
+
+    def next_id(self):
+        return str(next(self._ids))
+
+    def record(self, trans_id, amount, status='settledSuccessfully', **extra):
+        self.unsettled.append({
+            "transId": trans_id,
+            "submitTimeUTC": _utc_now(),
+            "transactionStatus": status,
+            "accountType": "Visa",
+            "accountNumber": "XXXX1111",
+            "settleAmount": float(amount or 0),
+            **extra,
+        })
+
+    def settle(self, bill_subscriptions=True):
+        """Close a settlement batch; optionally charge every active subscription first."""
+        if bill_subscriptions:
+            for subscription_id, status in self.subscriptions.items():
+                if status == 'active':
+                    self._pay_nums[subscription_id] += 1
+                    self.record(self.next_id(), 10, subscription={
+                        "id": subscription_id, "payNum": self._pay_nums[subscription_id]
+                    })
+        batch = {
+            "batchId": self.next_id(),
+            "settlementTimeUTC": _utc_now(),
+            "settlementState": "settledSuccessfully",
+            "paymentMethod": "creditCard",
+        }
+        self.batches.append((batch, self.unsettled))
+        self.unsettled = []
+        return batch["batchId"]
+
+    def create_transaction(self, body):
+        trans_id = self.next_id()
+        amount = body.get('transactionRequest', {}).get('amount')
+        profile = body.get('transactionRequest', {}).get('profile')
+        if self.rng.random() < self.error_rate:
+            return {
+                "transactionResponse": {
+                    "responseCode": "2",
+                    "transId": trans_id,
+                    "accountNumber": "XXXX0027",
+                    "accountType": "Visa",
+                    "errors": [{"errorCode": "2", "errorText": "This transaction has been declined."}],
+                },
+                **_error("E00027", "The transaction was unsuccessful."),
+            }
+        if profile:
+            self.record(trans_id, amount, profile={
+                "customerProfileId": profile.get('customerProfileId'),
+                "customerPaymentProfileId": profile.get('paymentProfile', {}).get('paymentProfileId'),
+            })
+        else:
+            self.record(trans_id, amount)
+        return {
+            "transactionResponse": {
+                "responseCode": "1",
+                "authCode": trans_id[-6:],
+                "avsResultCode": "Y",
+                "cvvResultCode": "P",
+                "transId": trans_id,
+                "accountNumber": "XXXX1111",
+                "accountType": "Visa",
+                "amount": amount,
+                "messages": [{"code": "1", "description": "This transaction has been approved."}],
+            },
+            "messages": OK,
+        }
+
+    def create_customer_profile(self, body):
+        if self.rng.random() < self.error_rate:
+            return _error("E00039", "A duplicate record with ID 0 already exists.")
+        profile_id = self.next_id()
+        payment_ids = [self.next_id()] if 'paymentProfiles' in body.get('profile', {}) else []
+        self.profiles[profile_id] = list(payment_ids)
+        return {
+            "customerProfileId": profile_id,
+            "customerPaymentProfileIdList": payment_ids,
+            "customerShippingAddressIdList": [],
+            "validationDirectResponseList": [_direct_response() for _ in payment_ids],
+            "messages": OK,
+        }
+
+    def create_customer_payment_profile(self, body):
+        profile_id = body.get('customerProfileId')
+        if self.rng.random() < self.error_rate:
+            return _error("E00013", "Card Code is invalid.")
+        if profile_id not in self.profiles:
+            # Profiles created before the stub started are accepted as-is
+            self.profiles[profile_id] = []
+        payment_id = self.next_id()
+        self.profiles[profile_id].append(payment_id)
+        return {
+            "customerProfileId": profile_id,
+            "customerPaymentProfileId": payment_id,
+            "validationDirectResponse": _direct_response(),
+            "messages": OK,
+        }
+
+    def get_customer_profile(self, body):
+        profile_id = body.get('customerProfileId')
+        if profile_id not in self.profiles:
+            return _error("E00040", "The record cannot be found.")
+        return {
+            "profile": {
+                "customerProfileId": profile_id,
+                "paymentProfiles": [{"customerPaymentProfileId": pid} for pid in self.profiles[profile_id]],
+            },
+            "subscriptionIds": self.profile_subscriptions.get(profile_id, []),
+            "messages": OK,
+        }
+
+    def create_subscription(self, body):
+        if self.rng.random() < self.error_rate:
+            return _error("E00012", "You have submitted a duplicate of Subscription.")
+        subscription = body.get('subscription', {})
+        subscription_id = self.next_id()
+        self.subscriptions[subscription_id] = 'active'
+        profile_id = subscription.get('profile', {}).get('customerProfileId')
+        self.profile_subscriptions.setdefault(profile_id, []).append(subscription_id)
+        return {
+            "subscriptionId": subscription_id,
+            "profile": subscription.get('profile', {}),
+            "messages": OK,
+        }
+
+    def cancel_subscription(self, body):
+        subscription_id = body.get('subscriptionId')
+        if self.rng.random() < self.error_rate:
+            return _error("E00001", "An error occurred during processing. Please try again.")
+        # Unknown IDs are treated as pre-existing so stubbed runs against a
+        # copied database still work.
+        self.subscriptions[subscription_id] = 'canceled'
+        return {"messages": OK}
+
+    def get_subscription_status(self, body):
+        subscription_id = body.get('subscriptionId')
+        if self.rng.random() < self.error_rate:
+            return _error("E00035", "The subscription cannot be found.")
+        return {"status": self.subscriptions.get(subscription_id, 'active'), "messages": OK}
+
+    def get_subscription_list(self, body):
+        if self.rng.random() < self.error_rate:
+            return _error("E00001", "An error occurred during processing. Please try again.")
+        active = body.get('searchType') == 'subscriptionActive'
+        # IDs are strings: cancel accepts any ID, not just ones this stub issued.
+        # Ordered by length first so numeric IDs sort numerically.
+        matches = sorted(
+            ((sid, status) for sid, status in self.subscriptions.items()
+             if (status in ('active', 'suspended')) == active),
+            key=lambda match: (len(match[0]), match[0]),
+        )
+        paging = body.get('paging', {})
+        limit = int(paging.get('limit', 1000))
+        start = (int(paging.get('offset', 1)) - 1) * limit
+        return {
+            "totalNumInResultSet": len(matches),
+            "subscriptionDetails": [
+                {"id": sid, "name": "Subscription", "status": status, "currencyCode": "USD"}
+                for sid, status in matches[start:start + limit]
+            ],
+            "messages": OK,
+        }
+
+    def get_settled_batch_list(self, body):
+        # Compare at the API's one-second precision
+        first = body.get('firstSettlementDate', '')[:19]
+        last = body.get('lastSettlementDate', '9999')[:19]
+        batches = [b for b, _ in self.batches if first <= b['settlementTimeUTC'][:19] <= last]
+        if not batches:
+            return {"messages": {"resultCode": "Ok", "message": [{"code": "I00004", "text": "No records found."}]}}
+        return {"batchList": batches, "messages": OK}
+
+    def get_transaction_list(self, body):
+        transactions = next((t for b, t in self.batches if b['batchId'] == body.get('batchId')), None)
+        if transactions is None:
+            return _error("E00001", "An error occurred during processing. Please try again.")
+        paging = body.get('paging', {})
+        limit = int(paging.get('limit', 1000))
+        start = (int(paging.get('offset', 1)) - 1) * limit
+        return {
+            "transactions": transactions[start:start + limit],
+            "totalNumInResultSet": len(transactions),
+            "messages": OK,
+        }
+
+    def dispatch(self, payload):
+        request_type = next(iter(payload), None) if isinstance(payload, dict) else None
+        self.calls[request_type] += 1
+        handler = self.handlers.get(request_type)
+        if handler is None:
+            return request_type, _error("E00045", "The root node does not reference a valid XML namespace.")
+        body = payload[request_type]
+        if not body.get('merchantAuthentication', {}).get('name'):
+            return request_type, _error("E00007", "User authentication failed due to invalid authentication values.")
+        return request_type, handler(body)
+
+    # HTTP plumbing
+
+    def _throttled(self):
+        if not self.max_rps:
+            return False
+        now = time.monotonic()
+        self._tokens = min(self.max_rps, self._tokens + (now - self._refilled_at) * self.max_rps)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    async def handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                keep_alive = True
+                for line in head.split(b'\r\n')[1:]:
+                    name, _, value = line.partition(b':')
+                    name = name.strip().lower()
+                    if name == b'content-length':
+                        length = int(value)
+                    elif name == b'connection' and value.strip().lower() == b'close':
+                        keep_alive = False
+                raw = await reader.readexactly(length)
+
+                status, headers, body = await self.respond(raw)
+                head_lines = [f"HTTP/1.1 {status}", "Content-Type: application/json; charset=utf-8",
+                              f"Content-Length: {len(body)}"]
+                head_lines += [f"{k}: {v}" for k, v in headers.items()]
+                writer.write(("\r\n".join(head_lines) + "\r\n\r\n").encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def respond(self, raw):
+        if self._throttled():
+            return "429 Too Many Requests", {"Retry-After": "1"}, b'{"message": "Too many requests"}'
+
+        try:
+            payload = json.loads(raw.decode('utf-8-sig'))
+        except ValueError:
+            payload = None
+        request_type, response = self.dispatch(payload)
+
+        latency = self.latency_by_type.get(request_type, self.latency).sample(self.rng)
+        if latency:
+            await asyncio.sleep(latency)
+
+        if self.rng.random() < self.http_error_rate:
+            return "500 Internal Server Error", {}, b'Internal Server Error'
+
+        body = json.dumps(response).encode()
+        if self.rng.random() < self.bom_rate:
+            body = b'\xef\xbb\xbf' + body
+        return "200 OK", {}, body
+
+    async def _start_server(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _shutdown(self):
+        self.server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def serve_forever(self, ready=None):
+        """Serve on this thread; ``ready(stub)`` is called once the port is bound."""
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self._start_server())
+        if ready is not None:
+            ready(self)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self._shutdown())
+            self.loop.close()
+
+    def start(self):
+        """Serve from a daemon thread and return once the port is bound."""
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self._start_server())
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop.close()
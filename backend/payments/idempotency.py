@@ -0,0 +1,201 @@
+"""
+Idempotency-Key handling for endpoints that call the gateway.
+
+The first request with a given key claims it and runs; its response is
+stored and replayed to any retry with the same key until the key expires.
+Retries that arrive while the first request is still running wait for it
+instead of calling the gateway a second time. A running request holds the
+key for IDEMPOTENCY_LEASE seconds; if its worker died before finishing, the
+key is failed once the lease runs out, so retries get an answer instead of
+waiting until the key expires.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+FAILED = Response(
+    {"status": "error", "message": "The original request failed. Retry with a new Idempotency-Key."},
+    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+)
+
+
+def _request_hash(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _step(user, endpoint, key, request_hash, deadline):
+    """
+    Try to claim the key once. Returns ``(record, None)`` when claimed,
+    ``(None, response)`` when the request should be answered without running,
+    or ``(None, None)`` when the caller should wait and try again.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user,
+                endpoint=endpoint,
+                key=key,
+                request_hash=request_hash,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                locked_until=now + timedelta(seconds=settings.IDEMPOTENCY_LEASE),
+            )
+        return record, None
+    except IntegrityError:
+        pass
+
+    existing = IdempotencyKey.objects.filter(user=user, endpoint=endpoint, key=key).first()
+    if existing is None:
+        # Expired and purged between the insert and the lookup; claim it on the next pass
+        return None, None
+    if existing.expires_at <= now:
+        IdempotencyKey.objects.filter(pk=existing.pk, expires_at__lte=now).delete()
+        return None, None
+    if existing.request_hash != request_hash:
+        return None, Response(
+            {"message": f"{HEADER} was already used with a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if existing.state == 'completed':
+        return None, _replay(existing)
+    if existing.locked_until is None or existing.locked_until <= now:
+        # The worker running the original request is gone, and it may have
+        # reached the gateway: fail the key rather than run the request again
+        stale = IdempotencyKey.objects.filter(pk=existing.pk, state='in_progress')
+        stale.filter(Q(locked_until__isnull=True) | Q(locked_until__lte=now)).update(
+            state='completed', response_status=FAILED.status_code, response_body=FAILED.data,
+        )
+        return None, None
+    if time.monotonic() >= deadline:
+        return None, Response(
+            {"message": "A request with this Idempotency-Key is still being processed."},
+            status=status.HTTP_409_CONFLICT
+        )
+    return None, None
+
+
+def _parse(request):
+    key = request.headers.get(HEADER)
+    if key is not None and not 0 < len(key) <= 255:
+        return None, Response({"message": f"{HEADER} must be 1-255 characters."}, status=status.HTTP_400_BAD_REQUEST)
+    return key, None
+
+
+def begin(request, endpoint):
+    key, error = _parse(request)
+    if not key:
+        return None, error
+
+    request_hash = _request_hash(request)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    delay = 0.05
+    while True:
+        record, response = _step(request.user, endpoint, key, request_hash, deadline)
+        if record is not None or response is not None:
+            return record, response
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+async def abegin(request, endpoint):
+    key, error = _parse(request)
+    if not key:
+        return None, error
+
+    request_hash = _request_hash(request)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    delay = 0.05
+    while True:
+        record, response = await sync_to_async(_step)(request.user, endpoint, key, request_hash, deadline)
+        if record is not None or response is not None:
+            return record, response
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def complete(record, response):
+    record.state = 'completed'
+    record.response_status = response.status_code
+    record.response_body = response.data
+    record.save(update_fields=['state', 'response_status', 'response_body'])
+
+
+def fail(record):
+    # The gateway may already have been called, so the key must not be
+    # released for a retry; later requests get this error replayed instead.
+    complete(record, FAILED)
+
+
+def idempotent(endpoint):
+    """
+    Decorate a view handler (sync or async) so requests carrying an
+    Idempotency-Key header are executed at most once per key.
+    """
+    def decorator(handler):
+        if iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def wrapper(view, request, *args, **kwargs):
+                record, response = await abegin(request, endpoint)
+                if response is not None:
+                    return response
+                try:
+                    response = await handler(view, request, *args, **kwargs)
+                except BaseException:
+                    if record is not None:
+                        await sync_to_async(fail)(record)
+                    raise
+                if record is not None:
+                    await sync_to_async(complete)(record, response)
+                return response
+        else:
+            @functools.wraps(handler)
+            def wrapper(view, request, *args, **kwargs):
+                record, response = begin(request, endpoint)
+                if response is not None:
+                    return response
+                try:
+                    response = handler(view, request, *args, **kwargs)
+                except BaseException:
+                    if record is not None:
+                        fail(record)
+                    raise
+                if record is not None:
+                    complete(record, response)
+                return response
+        return wrapper
+    return decorator
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired keys in batches; returns the number removed."""
+    removed = 0
+    while True:
+        pks = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return removed
+        removed += IdempotencyKey.objects.filter(pk__in=pks).delete()[0]
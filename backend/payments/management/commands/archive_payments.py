@@ -0,0 +1,46 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payments import archival
+
+
+def _date(value):
+    return timezone.make_aware(datetime.datetime.strptime(value, '%Y-%m-%d'), datetime.timezone.utc)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move old transactions and subscription payments to the archive tables "
+        "in small, paced batches. Safe to interrupt and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', choices=sorted(archival.TIERS), default=sorted(archival.TIERS),
+                            help="Tables to archive (default: all)")
+        parser.add_argument('--before', type=_date, default=None,
+                            help="Archive rows older than this date (YYYY-MM-DD, UTC)")
+        parser.add_argument('--days', type=int, default=None,
+                            help="Archive rows older than this many days (default: ARCHIVE_AFTER_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Rows moved per database transaction (default: ARCHIVE_BATCH_SIZE)")
+        parser.add_argument('--pause', type=float, default=None,
+                            help="Seconds to wait between batches (default: ARCHIVE_BATCH_PAUSE)")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Stop after moving this many rows per table")
+
+    def handle(self, *args, **options):
+        if options['before'] and options['days'] is not None:
+            raise CommandError("Pass --before or --days, not both.")
+        before = options['before']
+        if options['days'] is not None:
+            before = timezone.now() - datetime.timedelta(days=options['days'])
+        for name in options['names']:
+            stats = archival.archive(
+                name, before=before, batch_size=options['batch_size'],
+                pause=options['pause'], limit=options['limit'],
+            )
+            self.stdout.write(f"{name}: moved {stats['moved']} rows in {stats['batches']} batches")
+            if stats['conflicts']:
+                self.stderr.write(f"{name}: {stats['conflicts']} rows already archived were left in place, see the log")
@@ -0,0 +1,95 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+MODES = ('none', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request database latency against a configured database with a new "
+        "connection per request, persistent health-checked connections and the connection pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--queries', type=int, default=3, help="Queries per simulated request")
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+
+    def alias_for(self, mode, database):
+        base = connections.settings[database]
+        settings_dict = deepcopy(base)
+        pool_options = settings_dict['OPTIONS'].pop('pool', None)
+        if mode == 'none':
+            settings_dict['CONN_MAX_AGE'] = 0
+        elif mode == 'persistent':
+            settings_dict['CONN_MAX_AGE'] = 600
+            settings_dict['CONN_HEALTH_CHECKS'] = True
+        else:
+            settings_dict['CONN_MAX_AGE'] = 0
+            settings_dict['OPTIONS']['pool'] = pool_options or True
+        alias = f'bench_{mode}'
+        connections.settings[alias] = settings_dict
+        return alias
+
+    def simulate(self, alias, queries):
+        connection = connections[alias]
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        # What the request_finished handler does at the end of every request
+        connection.close_if_unusable_or_obsolete()
+        return time.perf_counter() - started
+
+    def worker(self, alias, count, queries):
+        try:
+            return [self.simulate(alias, queries) for _ in range(count)]
+        finally:
+            connections[alias].close()
+
+    def run(self, alias, options):
+        concurrency = options['concurrency']
+        counts = [options['requests'] // concurrency] * concurrency
+        counts[0] += options['requests'] % concurrency
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = pool.map(lambda count: self.worker(alias, count, options['queries']), counts)
+            return [latency for latencies in results for latency in latencies]
+
+    def handle(self, *args, **options):
+        if options['database'] not in connections.settings:
+            raise CommandError(f"Unknown database {options['database']!r}")
+        if options['concurrency'] < 1 or options['requests'] < options['concurrency']:
+            raise CommandError("--requests must be at least --concurrency, which must be positive")
+
+        vendor = connections[options['database']].vendor
+        self.stdout.write(
+            f"{vendor} {connections.settings[options['database']].get('HOST') or 'local'}: "
+            f"{options['requests']} requests x {options['queries']} queries, concurrency {options['concurrency']}"
+        )
+        for mode in options['modes']:
+            if mode == 'pool' and vendor not in ('postgresql', 'cockroachdb'):
+                self.stdout.write(f"  {mode:<10} skipped: pooling needs the PostgreSQL/CockroachDB backend")
+                continue
+            alias = self.alias_for(mode, options['database'])
+            try:
+                latencies = self.run(alias, options)
+            finally:
+                if mode == 'pool':
+                    connections[alias].close_pool()
+                    del connections[alias]
+                del connections.settings[alias]
+
+            ms = sorted(latency * 1000 for latency in latencies)
+            p95 = ms[min(int(len(ms) * 0.95), len(ms) - 1)]
+            self.stdout.write(
+                f"  {mode:<10} mean {statistics.fmean(ms):8.2f} ms  p50 {statistics.median(ms):8.2f} ms  "
+                f"p95 {p95:8.2f} ms  max {ms[-1]:8.2f} ms"
+            )
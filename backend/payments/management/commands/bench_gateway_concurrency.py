@@ -0,0 +1,63 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from payments.gateway_stub import GatewayStub
+from payments.services import AuthorizeNetService, AsyncAuthorizeNetService
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent createTransaction throughput of the sync service on a "
+        "fixed thread pool (WSGI worker model) against the async service on one "
+        "event loop (ASGI worker model), using a local gateway with fixed latency."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--latency', type=float, default=0.2, help="Simulated gateway latency in seconds")
+        parser.add_argument('--wsgi-threads', type=int, default=8, help="Threads available to the sync run")
+        parser.add_argument('--concurrency', type=int, default=200, help="In-flight calls for the async run")
+
+    def handle(self, *args, **options):
+        gateway = GatewayStub(latency=f"fixed:{options['latency']}").start()
+        total = options['requests']
+        try:
+            wsgi = self.run_sync(gateway.url, total, options['wsgi_threads'])
+            asgi = asyncio.run(self.run_async(gateway.url, total, options['concurrency']))
+        finally:
+            gateway.stop()
+
+        self.stdout.write(f"{total} charges, gateway latency {options['latency'] * 1000:.0f} ms")
+        self.report(f"WSGI ({options['wsgi_threads']} threads)", total, *wsgi)
+        self.report(f"ASGI (concurrency {options['concurrency']})", total, *asgi)
+
+    def report(self, label, total, elapsed, ok):
+        self.stdout.write(f"  {label:<28} {elapsed:8.2f} s  {total / elapsed:9.1f} charges/s  ok={ok}")
+
+    def run_sync(self, url, total, threads):
+        def charge(_):
+            service = AuthorizeNetService()
+            service.api_url = url
+            return service.create_transaction("1.00", "bench-nonce") is not None
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            ok = sum(pool.map(charge, range(total)))
+        return time.perf_counter() - started, ok
+
+    async def run_async(self, url, total, concurrency):
+        limit = asyncio.Semaphore(concurrency)
+
+        async def charge():
+            async with limit:
+                service = AsyncAuthorizeNetService()
+                service.api_url = url
+                return await service.create_transaction("1.00", "bench-nonce") is not None
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(charge() for _ in range(total)))
+        return time.perf_counter() - started, sum(results)
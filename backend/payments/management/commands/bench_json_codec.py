@@ -0,0 +1,94 @@
+import codecs
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.codec import CODECS, orjson
+from payments.gateway_stub import GatewayStub
+from payments.services import AuthorizeNetService
+
+
+def legacy_loads(body):
+    # What AuthorizeNetService did before the codec: decode, strip the BOM, parse
+    return json.loads(body.decode('utf-8').lstrip('\ufeff'))
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark gateway JSON encoding/decoding: the previous str-based path "
+        "against each available codec, on representative createTransaction and ARB payloads."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+        parser.add_argument('--list-size', type=int, default=1000,
+                            help="Entries in the ARBGetSubscriptionList page")
+
+    def payloads(self, list_size):
+        stub = GatewayStub(seed=1)
+        service = AuthorizeNetService.__new__(AuthorizeNetService)
+        service.api_login_id, service.transaction_key = 'login', 'key'
+        service.environment = 'sandbox'
+
+        charge = {"createTransactionRequest": {
+            **service._get_base_request(),
+            "transactionRequest": {
+                "transactionType": "authCaptureTransaction",
+                "amount": "19.99",
+                "payment": {"opaqueData": {"dataDescriptor": "COMMON.ACCEPT.INAPP.PAYMENT", "dataValue": "x" * 400}},
+                "order": {"description": "Payment Transaction"},
+            },
+        }}
+        subscribe = {"ARBCreateSubscriptionRequest": {
+            **service._get_base_request(),
+            "subscription": {
+                "name": "Pro", "amount": "9.99",
+                "paymentSchedule": {"interval": {"length": "1", "unit": "months"},
+                                    "startDate": "2026-01-01", "totalOccurrences": "9999"},
+                "profile": {"customerProfileId": "60000000001", "customerPaymentProfileId": "60000000002"},
+            },
+        }}
+        for i in range(list_size):
+            stub.subscriptions[str(70000000000 + i)] = 'active'
+
+        return [
+            ("createTransaction", charge,
+             stub.create_transaction(charge["createTransactionRequest"])),
+            ("ARBCreateSubscription", subscribe,
+             stub.create_subscription(subscribe["ARBCreateSubscriptionRequest"])),
+            (f"ARBGetSubscriptionList ({list_size})", None,
+             stub.get_subscription_list({"searchType": "subscriptionActive", "paging": {"limit": list_size}})),
+        ]
+
+    def timeit(self, fn, arg, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn(arg)
+        return (time.perf_counter() - started) / iterations * 1e6
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write("orjson is not installed; only the stdlib codec is measured.")
+        implementations = [('legacy', json.dumps, legacy_loads)]
+        for name, codec_class in CODECS.items():
+            if name == 'orjson' and orjson is None:
+                continue
+            codec = codec_class()
+            implementations.append((name, codec.dumps, codec.loads))
+
+        for label, request, response in self.payloads(options['list_size']):
+            body = codecs.BOM_UTF8 + json.dumps(response).encode()
+            # Keep large payloads from dominating the run time
+            iterations = max(options['iterations'] * 1000 // max(len(body), 1000), 50)
+            self.stdout.write(f"{label}: response {len(body)} bytes, {iterations} iterations")
+            baseline = None
+            for name, dumps, loads in implementations:
+                decode = self.timeit(loads, body, iterations)
+                encode = self.timeit(dumps, request, iterations) if request else None
+                baseline = baseline or decode
+                encoded = f"encode {encode:8.2f} us" if encode is not None else " " * 18
+                self.stdout.write(
+                    f"  {name:<8} decode {decode:9.2f} us ({baseline / decode:4.1f}x)  {encoded}"
+                )
@@ -0,0 +1,42 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments import exports
+
+
+def _date(value):
+    return timezone.make_aware(datetime.datetime.strptime(value, '%Y-%m-%d'), datetime.timezone.utc)
+
+
+class Command(BaseCommand):
+    help = "Stream Transaction or SubscriptionPayment rows to CSV or NDJSON with flat memory use."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(exports.EXPORTS))
+        parser.add_argument('--format', dest='output_format', choices=list(exports.FORMATS), default='csv')
+        parser.add_argument('--since', type=_date, default=None, help="First day to include (YYYY-MM-DD, UTC)")
+        parser.add_argument('--until', type=_date, default=None, help="Day to stop before (YYYY-MM-DD, UTC)")
+        parser.add_argument('--output', default='-', help="File to write; '-' for stdout. A .gz name turns on --gzip")
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        compress = options['gzip'] or options['output'].endswith('.gz')
+        parts = exports.stream(
+            options['name'], options['output_format'], options['since'], options['until'],
+            compress=compress, chunk_size=options['chunk_size'],
+        )
+        written = 0
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for part in parts:
+                output.write(part)
+                written += len(part)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        if options['output'] != '-':
+            self.stdout.write(f"Wrote {written} bytes to {options['output']}")
@@ -0,0 +1,33 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payments.settlement import SettlementError, ingest
+
+
+def _date(value):
+    return timezone.make_aware(datetime.datetime.strptime(value, '%Y-%m-%d'), datetime.timezone.utc)
+
+
+class Command(BaseCommand):
+    help = "Ingest settled batches from Authorize.Net. Resumes from where the last run stopped; safe to run from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=_date, default=None,
+                            help="Backfill from this date (YYYY-MM-DD, UTC) instead of the saved cursor")
+        parser.add_argument('--until', type=_date, default=None,
+                            help="Stop at this date (YYYY-MM-DD, UTC); defaults to now")
+        parser.add_argument('--page-size', type=int, default=None,
+                            help="Transactions per getTransactionList page (max 1000)")
+
+    def handle(self, *args, **options):
+        try:
+            stats = ingest(since=options['since'], until=options['until'], page_size=options['page_size'])
+        except SettlementError as e:
+            raise CommandError(f"{e}. Progress is saved; rerun to resume.")
+        self.stdout.write(
+            f"Ingested {stats['batches']} batches, {stats['transactions']} transactions "
+            f"({stats['created']} new, {stats['updated']} updated), "
+            f"{stats['subscription_payments']} subscription payments"
+        )
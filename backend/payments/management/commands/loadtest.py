@@ -0,0 +1,264 @@
+import datetime
+import json
+import random
+import subprocess
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+
+from payments.gateway_stub import GatewayStub
+from payments.models import Product, Subscription, SubscriptionPlan, Transaction
+
+User = get_user_model()
+
+SCENARIOS = ['token', 'products', 'plans', 'transactions', 'charge', 'subscribe', 'cancel']
+
+# Relative weights for the `mixed` scenario, roughly storefront traffic
+MIXED_WEIGHTS = {
+    'products': 30,
+    'plans': 20,
+    'transactions': 20,
+    'charge': 15,
+    'token': 5,
+    'subscribe': 5,
+    'cancel': 5,
+}
+
+PASSWORD = 'loadtest-password'
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run load scenarios against the payments API in-process, with the gateway "
+        "stand-in and a throwaway test database, and report throughput, latency "
+        "percentiles, DB queries and gateway calls per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', default=None,
+                            help=f"Scenarios to run (default: all). Choices: {', '.join(SCENARIOS + ['mixed'])}")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per scenario")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--history', type=int, default=50, help="Transactions pre-loaded per user")
+        parser.add_argument('--gateway-latency', default='fixed:0.05', help="Stand-in latency spec, see run_gateway_stub")
+        parser.add_argument('--gateway-error-rate', type=float, default=0.0)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', default='loadtest_results.json', help="Where to write JSON results")
+        parser.add_argument('--compare', default=None, help="Previous JSON results to diff against")
+        parser.add_argument('--keepdb', action='store_true', help="Keep the test database between runs")
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or SCENARIOS + ['mixed']
+        unknown = set(scenarios) - set(SCENARIOS + ['mixed'])
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.query_count = 0
+        self.query_lock = threading.Lock()
+
+        self.stdout.write(f"Database: {connection.vendor}. Creating test database...")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        self.stub = GatewayStub(
+            latency=options['gateway_latency'],
+            error_rate=options['gateway_error_rate'],
+            seed=options['seed'],
+        ).start()
+        settings.AUTHORIZENET_API_URL = self.stub.url
+
+        try:
+            self.setup_fixtures()
+            results = {name: self.run_scenario(name) for name in scenarios}
+        finally:
+            self.stub.stop()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        report = {
+            "commit": self.git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "config": {
+                key: options[key] for key in
+                ('requests', 'concurrency', 'users', 'history', 'gateway_latency', 'gateway_error_rate', 'seed')
+            },
+            "scenarios": results,
+        }
+        self.print_report(results)
+
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.print_comparison(json.load(f), report)
+
+    def git_commit(self):
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    # Fixtures
+
+    def setup_fixtures(self):
+        count = self.options['users']
+        self.users = []
+        for i in range(count):
+            user = User.objects.create_user(
+                username=f"loadtest{i}", email=f"loadtest{i}@example.com", password=PASSWORD
+            )
+            self.users.append(user)
+        self.tokens = {user.pk: str(AccessToken.for_user(user)) for user in self.users}
+
+        Product.objects.bulk_create([
+            Product(name=f"Product {i}", description="Load test product", price=f"{9 + i}.99")
+            for i in range(12)
+        ])
+        SubscriptionPlan.objects.bulk_create([
+            SubscriptionPlan(name=f"Plan {i}", description="Load test plan", amount=f"{9 + i}.99",
+                             features=["Feature A", "Feature B", "Feature C"])
+            for i in range(4)
+        ])
+
+        Transaction.objects.bulk_create([
+            Transaction(user=user, transaction_id=f"LT-{uuid.uuid4().hex[:20]}", amount="10.00",
+                        status='authorized', response_code='1', response_text="Approved")
+            for user in self.users
+            for _ in range(self.options['history'])
+        ], batch_size=500)
+
+        # Subscriptions for the cancel scenario, both standalone and in `mixed`
+        Subscription.objects.bulk_create([
+            Subscription(user=self.users[i % count], subscription_id=f"LT{i}-{uuid.uuid4().hex[:12]}",
+                         name="Load test", amount="9.99", interval_length=1, interval_unit='months',
+                         start_date=datetime.date.today(), next_billing_date=datetime.date.today())
+            for i in range(self.options['requests'] * 2)
+        ], batch_size=500)
+        self.cancelable = list(Subscription.objects.values_list('pk', 'user_id'))
+        self.cancel_lock = threading.Lock()
+
+    # Request builders: each returns (method, path, body, user)
+
+    def build_request(self, scenario, i):
+        user = self.users[i % len(self.users)]
+        if scenario == 'token':
+            return 'post', '/api/payments/token/', {"username": user.username, "password": PASSWORD}, None
+        if scenario == 'products':
+            return 'get', '/api/payments/products/', None, None
+        if scenario == 'plans':
+            return 'get', '/api/payments/plans/', None, None
+        if scenario == 'transactions':
+            return 'get', '/api/payments/transactions/', None, user
+        if scenario == 'charge':
+            return 'post', '/api/payments/charge/', {
+                "amount": "19.99", "nonce": f"nonce-{i}", "descriptor": "Load test"
+            }, user
+        if scenario == 'subscribe':
+            return 'post', '/api/payments/subscriptions/', {
+                "name": "Pro", "amount": "29.99", "interval_length": 1, "interval_unit": "months",
+                "nonce": f"nonce-{i}", "email": user.email, "first_name": "Load", "last_name": "Test",
+            }, user
+        if scenario == 'cancel':
+            with self.cancel_lock:
+                pk, user_id = self.cancelable.pop()
+            return 'delete', f'/api/payments/subscriptions/{pk}/', None, User(pk=user_id)
+        raise CommandError(f"Unknown scenario {scenario}")
+
+    # Execution
+
+    def count_query(self, execute, sql, params, many, context):
+        with self.query_lock:
+            self.query_count += 1
+        return execute(sql, params, many, context)
+
+    def send(self, scenario, i):
+        method, path, body, user = self.build_request(scenario, i)
+        client = Client()
+        extra = {}
+        if user is not None:
+            extra['HTTP_AUTHORIZATION'] = f"Bearer {self.tokens[user.pk]}"
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(self.count_query):
+            if body is None:
+                response = getattr(client, method)(path, **extra)
+            else:
+                response = getattr(client, method)(path, json.dumps(body), content_type='application/json', **extra)
+        return time.perf_counter() - started, response.status_code
+
+    def run_scenario(self, name):
+        total = self.options['requests']
+        if name == 'mixed':
+            names = list(MIXED_WEIGHTS)
+            plan = self.rng.choices(names, weights=[MIXED_WEIGHTS[n] for n in names], k=total)
+        else:
+            plan = [name] * total
+
+        self.query_count = 0
+        gateway_before = sum(self.stub.calls.values())
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as pool:
+            samples = list(pool.map(self.send, plan, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(sample[0] * 1000 for sample in samples)
+        statuses = Counter(sample[1] for sample in samples)
+        return {
+            "requests": total,
+            "errors": sum(n for code, n in statuses.items() if code >= 400),
+            "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+            "elapsed_s": round(elapsed, 3),
+            "rps": round(total / elapsed, 1),
+            "mean_ms": round(sum(latencies) / total, 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2),
+            "db_queries_per_request": round(self.query_count / total, 2),
+            "gateway_calls_per_request": round((sum(self.stub.calls.values()) - gateway_before) / total, 2),
+        }
+
+    # Reporting
+
+    def print_report(self, results):
+        header = f"{'scenario':<14}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'db q/req':>10}{'gw/req':>8}{'errors':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<14}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                f"{r['db_queries_per_request']:>10.2f}{r['gateway_calls_per_request']:>8.2f}{r['errors']:>8}"
+            )
+
+    def print_comparison(self, before, after):
+        self.stdout.write(f"\nCompared with {before.get('commit')} ({before.get('timestamp')}):")
+        for name, r in after['scenarios'].items():
+            old = before.get('scenarios', {}).get(name)
+            if not old:
+                continue
+            rps = (r['rps'] - old['rps']) / old['rps'] * 100 if old['rps'] else 0
+            p95 = (r['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0
+            queries = r['db_queries_per_request'] - old['db_queries_per_request']
+            self.stdout.write(f"  {name:<14} req/s {rps:+6.1f}%   p95 {p95:+6.1f}%   db q/req {queries:+.2f}")
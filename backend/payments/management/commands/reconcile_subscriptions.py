@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from payments.reconciliation import reconcile
+
+
+class Command(BaseCommand):
+    help = "Sync Subscription.status with Authorize.Net. Safe to run on a schedule."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-list', action='store_true',
+                            help="Skip ARBGetSubscriptionList and only use per-subscription status calls")
+        parser.add_argument('--max-age', type=int, default=None,
+                            help="Re-check subscriptions last synced more than this many seconds ago")
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Concurrent per-subscription status calls")
+        parser.add_argument('--page-size', type=int, default=None,
+                            help="Subscriptions per list page and per update batch (max 1000)")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Stop after this many per-subscription status calls")
+
+    def handle(self, *args, **options):
+        stats = reconcile(
+            use_list=not options['no_list'],
+            max_age=options['max_age'],
+            concurrency=options['concurrency'],
+            page_size=options['page_size'],
+            limit=options['limit'],
+        )
+        self.stdout.write(
+            f"Listed {stats['listed']}, checked {stats['checked']} individually "
+            f"({stats['errors']} errors), {stats['changed']} statuses changed"
+        )
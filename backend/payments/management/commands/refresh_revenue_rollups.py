@@ -0,0 +1,35 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments import rollups
+
+
+def _date(value):
+    return timezone.make_aware(datetime.datetime.strptime(value, '%Y-%m-%d'), datetime.timezone.utc)
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the revenue rollups from rows changed since the last run. "
+        "Safe to run from cron, or continuously with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=_date, default=None,
+                            help="Recompute days with rows changed since this date (YYYY-MM-DD, UTC)")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Recompute every day from the source tables")
+        parser.add_argument('--interval', type=float, default=None,
+                            help="Keep running, refreshing every this many seconds")
+
+    def handle(self, *args, **options):
+        stats = rollups.refresh(since=options['since'], rebuild=options['rebuild'])
+        self.stdout.write(f"Recomputed {stats['days']} days ({stats['rows']} day rows)")
+        while options['interval']:
+            time.sleep(options['interval'])
+            stats = rollups.refresh()
+            if stats['days']:
+                self.stdout.write(f"Recomputed {stats['days']} days ({stats['rows']} day rows)")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from payments import provisioning
+
+
+class Command(BaseCommand):
+    help = "Resume subscription provisioning runs that stopped part-way, e.g. after a worker restart."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-after', type=int, default=60,
+                            help="Only resume records untouched for this many seconds")
+
+    def handle(self, *args, **options):
+        pks = list(provisioning.resumable(options['stale_after']))
+        for pk in pks:
+            provisioning.run(pk)
+        self.stdout.write(f"Resumed {len(pks)} provisioning records")
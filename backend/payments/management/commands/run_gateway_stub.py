@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.gateway_stub import GatewayStub, Latency
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local Authorize.Net stand-in. Point the app at it with "
+        "AUTHORIZENET_API_URL=http://<host>:<port>/xml/v1/request.api"
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--latency', default='fixed:0',
+            help="Latency distribution: fixed:S, uniform:LO,HI, normal:MU,SIGMA, lognormal:MEDIAN,SIGMA or exp:MEAN"
+        )
+        parser.add_argument(
+            '--latency-for', action='append', default=[], metavar='REQUEST_TYPE=SPEC',
+            help="Override the latency for one request type, e.g. ARBCreateSubscriptionRequest=uniform:0.5,1.5"
+        )
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Fraction of requests answered with a gateway error (declines for charges)")
+        parser.add_argument('--http-error-rate', type=float, default=0.0,
+                            help="Fraction of requests answered with HTTP 500")
+        parser.add_argument('--bom-rate', type=float, default=1.0,
+                            help="Fraction of response bodies prefixed with a UTF-8 BOM")
+        parser.add_argument('--max-rps', type=float, default=None,
+                            help="Throttle above this many requests/second with HTTP 429")
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        latency_by_type = {}
+        try:
+            Latency(options['latency'])
+            for item in options['latency_for']:
+                request_type, _, spec = item.partition('=')
+                latency_by_type[request_type] = spec
+                Latency(spec)
+        except (ValueError, IndexError) as e:
+            raise CommandError(f"Invalid latency spec: {e}")
+
+        stub = GatewayStub(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            latency_by_type=latency_by_type,
+            error_rate=options['error_rate'],
+            http_error_rate=options['http_error_rate'],
+            bom_rate=options['bom_rate'],
+            max_rps=options['max_rps'],
+            seed=options['seed'],
+        )
+        try:
+            # Printed once bound, so --port 0 shows the port actually chosen
+            stub.serve_forever(ready=lambda stub: self.stdout.write(f"Authorize.Net stand-in listening on {stub.url}"))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Requests served: {dict(stub.calls)}")
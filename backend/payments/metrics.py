@@ -0,0 +1,90 @@
+"""
+In-process Authorize.Net request metrics, rendered in the Prometheus text
+exposition format by GatewayMetricsView.
+
+Recording a call is a bisect and a few integer increments under a lock;
+nothing is formatted until something scrapes. Values are per worker
+process, so with several workers each one must be scraped (or the series
+summed) to get totals.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+# Seconds; the gateway's p99 is usually well under 2 s, timeouts are 30 s
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_durations = {}                    # request_type -> [per-bucket counts..., +Inf count]
+_duration_sums = defaultdict(float)
+_counters = defaultdict(int)       # (metric, labels) -> value
+
+COUNTERS = (
+    ('authorizenet_requests_total', "Authorize.Net API calls by outcome (ok, error, failure)."),
+    ('authorizenet_result_codes_total', "Authorize.Net API calls by first result message code."),
+    ('authorizenet_transport_errors_total', "Authorize.Net API calls that raised, by exception type."),
+    ('authorizenet_request_bytes_total', "Request body bytes sent to Authorize.Net."),
+    ('authorizenet_response_bytes_total', "Response body bytes received from Authorize.Net."),
+)
+
+
+def observe(request_type, elapsed, outcome, code=None, error=None, bytes_out=0, bytes_in=0):
+    index = bisect.bisect_left(BUCKETS, elapsed)
+    with _lock:
+        buckets = _durations.get(request_type)
+        if buckets is None:
+            buckets = _durations[request_type] = [0] * (len(BUCKETS) + 1)
+        buckets[index] += 1
+        _duration_sums[request_type] += elapsed
+        _counters['authorizenet_requests_total', (('request_type', request_type), ('outcome', outcome))] += 1
+        if code:
+            _counters['authorizenet_result_codes_total', (('request_type', request_type), ('code', code))] += 1
+        if error:
+            _counters['authorizenet_transport_errors_total', (('request_type', request_type), ('error', error))] += 1
+        _counters['authorizenet_request_bytes_total', (('request_type', request_type),)] += bytes_out
+        _counters['authorizenet_response_bytes_total', (('request_type', request_type),)] += bytes_in
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def render(extra_counters=None):
+    """Prometheus text format for everything recorded so far in this process."""
+    with _lock:
+        durations = {k: list(v) for k, v in _durations.items()}
+        sums = dict(_duration_sums)
+        counters = dict(_counters)
+
+    lines = [
+        "# HELP authorizenet_request_duration_seconds Authorize.Net API call latency.",
+        "# TYPE authorizenet_request_duration_seconds histogram",
+    ]
+    for request_type, buckets in sorted(durations.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), buckets):
+            cumulative += count
+            lines.append(
+                f"authorizenet_request_duration_seconds_bucket"
+                f"{_labels([('request_type', request_type), ('le', bound)])} {cumulative}"
+            )
+        label = _labels([('request_type', request_type)])
+        lines.append(f"authorizenet_request_duration_seconds_sum{label} {sums[request_type]:.6f}")
+        lines.append(f"authorizenet_request_duration_seconds_count{label} {cumulative}")
+
+    for name, help_text in COUNTERS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+    for name, help_text, value in extra_counters or ():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-17 01:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='subscription',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('active', 'Active'), ('canceled', 'Canceled'), ('expired', 'Expired'), ('suspended', 'Suspended'), ('failed', 'Failed')], default='active', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='subscription',
+            name='subscription_id',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='SubscriptionProvisioning',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('step', models.CharField(choices=[('customer_profile', 'Customer profile'), ('subscription', 'Subscription'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='customer_profile', max_length=20)),
+                ('nonce', models.CharField(blank=True, help_text='Accept.js nonce, cleared once used', max_length=500)),
+                ('email', models.EmailField(max_length=254)),
+                ('first_name', models.CharField(max_length=50)),
+                ('last_name', models.CharField(max_length=50)),
+                ('customer_profile_id', models.CharField(blank=True, max_length=50)),
+                ('customer_payment_profile_id', models.CharField(blank=True, max_length=50)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subscription', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='provisioning', to='payments.subscription')),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-17 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_transaction_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='subscriptionprovisioning',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='subscriptionprovisioning',
+            name='first_name',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='subscriptionprovisioning',
+            name='last_name',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.CreateModel(
+            name='PaymentProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_profile_id', models.CharField(max_length=50, unique=True)),
+                ('card_type', models.CharField(blank=True, max_length=20)),
+                ('card_last4', models.CharField(blank=True, max_length=4)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_profiles', to='payments.customerprofile')),
+            ],
+        ),
+    ]
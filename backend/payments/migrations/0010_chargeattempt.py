@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-17 02:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_paymentprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChargeAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('outcome', models.CharField(choices=[('declined', 'Declined'), ('error', 'Error'), ('no_response', 'No response')], max_length=20)),
+                ('source', models.CharField(choices=[('charge', 'Charge'), ('batch', 'Batch charge')], default='charge', max_length=20)),
+                ('transaction_id', models.CharField(blank=True, max_length=50)),
+                ('response_code', models.CharField(blank=True, max_length=10)),
+                ('error_code', models.CharField(blank=True, max_length=20)),
+                ('message', models.TextField(blank=True)),
+                ('attempted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-attempted_at'], name='chargeattempt_user_time_idx')],
+            },
+        ),
+    ]
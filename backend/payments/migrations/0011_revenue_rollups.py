@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-17 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0010_chargeattempt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('source', models.CharField(choices=[('transaction', 'Transaction'), ('subscription', 'Subscription payment')], max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('plan', models.CharField(blank=True, max_length=100)),
+                ('interval', models.CharField(blank=True, max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='subscriptionpayment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='subscriptionpayment',
+            index=models.Index(fields=['updated_at'], name='subpayment_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscriptionpayment',
+            index=models.Index(fields=['date'], name='subpayment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['updated_at'], name='transaction_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['created_at'], name='transaction_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('period', 'source', 'period_start', 'status', 'plan', 'interval'), name='revenue_rollup_unique'),
+        ),
+    ]
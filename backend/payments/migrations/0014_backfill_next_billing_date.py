@@ -0,0 +1,68 @@
+# Generated by Django 6.0 on 2026-10-17 02:09
+
+from calendar import monthrange
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Max, Q
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+# Copies of payments.renewals.billing_date / billing_date_after as of this
+# migration, so later changes to that module cannot change what it does
+
+def billing_date(start_date, interval_length, interval_unit, occurrence):
+    if interval_unit == 'days':
+        return start_date + timedelta(days=interval_length * occurrence)
+    months = start_date.month - 1 + interval_length * occurrence
+    year, month = start_date.year + months // 12, months % 12 + 1
+    return start_date.replace(year=year, month=month, day=min(start_date.day, monthrange(year, month)[1]))
+
+
+def billing_date_after(start_date, interval_length, interval_unit, day):
+    if day < start_date:
+        return start_date
+    if interval_unit == 'days':
+        occurrence = (day - start_date).days // interval_length + 1
+    else:
+        months = (day.year - start_date.year) * 12 + day.month - start_date.month
+        occurrence = max(months // interval_length, 0)
+    while billing_date(start_date, interval_length, interval_unit, occurrence) <= day:
+        occurrence += 1
+    return billing_date(start_date, interval_length, interval_unit, occurrence)
+
+
+def backfill(apps, schema_editor):
+    Subscription = apps.get_model('payments', 'Subscription')
+    subscriptions = Subscription.objects.filter(next_billing_date__isnull=True).annotate(
+        last_paid=Max('payments__date', filter=Q(payments__status='Success')),
+    ).order_by('pk')
+    batch = []
+    for subscription in subscriptions.iterator(chunk_size=BATCH_SIZE):
+        if subscription.last_paid is None:
+            subscription.next_billing_date = subscription.start_date
+        else:
+            subscription.next_billing_date = billing_date_after(
+                subscription.start_date, subscription.interval_length, subscription.interval_unit,
+                timezone.localdate(subscription.last_paid),
+            )
+        batch.append(subscription)
+        if len(batch) == BATCH_SIZE:
+            Subscription.objects.bulk_update(batch, ['next_billing_date'])
+            batch = []
+    Subscription.objects.bulk_update(batch, ['next_billing_date'])
+
+
+class Migration(migrations.Migration):
+    # Kept apart from the AddField: CockroachDB won't write to a column in
+    # the transaction that added it
+
+    dependencies = [
+        ('payments', '0013_subscription_next_billing_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
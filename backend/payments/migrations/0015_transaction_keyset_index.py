@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 02:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0014_backfill_next_billing_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivedtransaction',
+            name='archived_txn_user_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='transaction_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='archivedtransaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='archived_txn_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='transaction_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0015_transaction_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, help_text="End of the running request's lease on the key", null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0016_idempotencykey_locked_until'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chargeattempt',
+            name='outcome',
+            field=models.CharField(choices=[('declined', 'Declined'), ('error', 'Error'), ('no_response', 'No response'), ('conflict', 'Conflict')], max_length=20),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 
 User = get_user_model()
 
@@ -12,6 +14,17 @@ class CustomerProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.authorize_net_profile_id}"
 
+class PaymentProfile(models.Model):
+    """A card saved on Authorize.Net as a customer payment profile."""
+    customer_profile = models.ForeignKey(CustomerProfile, on_delete=models.CASCADE, related_name='payment_profiles')
+    payment_profile_id = models.CharField(max_length=50, unique=True) # Auth.Net customerPaymentProfileId
+    card_type = models.CharField(max_length=20, blank=True)
+    card_last4 = models.CharField(max_length=4, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.card_type} {self.card_last4} - {self.payment_profile_id}"
+
 class Transaction(models.Model):
     STATUS_CHOICES = [
         ('authorized', 'Authorized'),
@@ -20,6 +33,9 @@ class Transaction(models.Model):
         ('refunded', 'Refunded'),
         ('failed', 'Failed'),
     ]
+    # Money taken from the customer. Refunds are their own 'refunded' rows
+    # with a positive amount, so net amounts subtract those.
+    CHARGED_STATUSES = ['authorized', 'captured']
 
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     transaction_id = models.CharField(max_length=50, unique=True)
@@ -30,37 +46,126 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves the per-user, newest-first keyset pagination on /transactions/
+            models.Index(fields=['user', '-created_at', '-id'], name='transaction_user_created_idx'),
+            # Revenue rollups: rows changed since the watermark, then per-day aggregation
+            models.Index(fields=['updated_at'], name='transaction_updated_idx'),
+            models.Index(fields=['created_at'], name='transaction_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.transaction_id} - {self.status}"
 
+class ChargeAttempt(models.Model):
+    """
+    Append-only log of declined and errored charges, written in batches by
+    attempts.AttemptWriter, and of approved charges whose transId was
+    already recorded for another charge (written by batch.save_approved).
+    """
+    OUTCOME_CHOICES = [
+        ('declined', 'Declined'), # The gateway processed the card and refused it
+        ('error', 'Error'), # The request was rejected before reaching the card networks
+        ('no_response', 'No response'), # Transport failure or unreadable response
+        ('conflict', 'Conflict'), # Approved, but the transId is already recorded for another charge
+    ]
+    SOURCE_CHOICES = [
+        ('charge', 'Charge'),
+        ('batch', 'Batch charge'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='charge')
+    transaction_id = models.CharField(max_length=50, blank=True) # Not unique: declines often report 0
+    response_code = models.CharField(max_length=10, blank=True)
+    error_code = models.CharField(max_length=20, blank=True)
+    message = models.TextField(blank=True)
+    attempted_at = models.DateTimeField(default=timezone.now) # Set when buffered, not when written
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-attempted_at'], name='chargeattempt_user_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.outcome} - {self.amount} - {self.attempted_at}"
+
 class Subscription(models.Model):
     STATUS_CHOICES = [
+        ('pending', 'Pending'),
         ('active', 'Active'),
         ('canceled', 'Canceled'),
         ('expired', 'Expired'),
         ('suspended', 'Suspended'),
+        ('terminated', 'Terminated'),
+        ('failed', 'Failed'),
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='subscriptions')
-    subscription_id = models.CharField(max_length=50, unique=True) # Auth.Net Subscription ID
+    subscription_id = models.CharField(max_length=50, unique=True, null=True, blank=True) # Auth.Net Subscription ID, set once provisioned
     name = models.CharField(max_length=100)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     interval_length = models.IntegerField(help_text="Length of the interval (e.g. 1)")
     interval_unit = models.CharField(max_length=10, choices=[('months', 'Months'), ('days', 'Days')])
     start_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    last_synced_at = models.DateTimeField(null=True, blank=True, db_index=True) # Last status reconciliation with Auth.Net
+    next_billing_date = models.DateField(null=True, blank=True) # Advanced by payments.renewals when a payment posts
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Upcoming renewals and dunning: one range per status, in billing order
+            models.Index(fields=['status', 'next_billing_date', 'id'], name='subscription_billing_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.subscription_id}"
 
+class SubscriptionProvisioning(models.Model):
+    """Resumable gateway state for a subscription created with `Prefer: respond-async`."""
+    STEP_CHOICES = [
+        ('customer_profile', 'Customer profile'),
+        ('subscription', 'Subscription'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    subscription = models.OneToOneField(Subscription, on_delete=models.CASCADE, related_name='provisioning')
+    step = models.CharField(max_length=20, choices=STEP_CHOICES, default='customer_profile', db_index=True)
+    nonce = models.CharField(max_length=500, blank=True, help_text="Accept.js nonce, cleared once used")
+    email = models.EmailField(blank=True)
+    first_name = models.CharField(max_length=50, blank=True)
+    last_name = models.CharField(max_length=50, blank=True)
+    customer_profile_id = models.CharField(max_length=50, blank=True)
+    customer_payment_profile_id = models.CharField(max_length=50, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.subscription} - {self.step}"
+
 class SubscriptionPayment(models.Model):
     subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='payments')
-    transaction_id = models.CharField(max_length=50)
+    transaction_id = models.CharField(max_length=50, unique=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20) # Success/Failed
-    date = models.DateTimeField(auto_now_add=True)
+    date = models.DateTimeField(default=timezone.now) # Gateway submit time when ingested from settlements
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Revenue rollups: rows changed since the watermark, then per-day aggregation
+            models.Index(fields=['updated_at'], name='subpayment_updated_idx'),
+            models.Index(fields=['date'], name='subpayment_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subscription.name} - {self.amount} - {self.date}"
@@ -88,3 +193,120 @@ class SubscriptionPlan(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.amount}/{self.interval_unit}"
+
+class IdempotencyKey(models.Model):
+    STATE_CHOICES = [
+        ('in_progress', 'In progress'),
+        ('completed', 'Completed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    endpoint = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64, help_text="SHA-256 of the request payload")
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='in_progress')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="End of the running request's lease on the key")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'endpoint', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} - {self.key} - {self.state}"
+
+class SyncCursor(models.Model):
+    """Resume point for an incremental job that reads from the gateway, keyed by job name."""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField(null=True, blank=True) # Everything up to here has been ingested
+    batch_id = models.CharField(max_length=50, blank=True) # Batch in progress, if any
+    page = models.IntegerField(default=0) # Pages of batch_id already ingested
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.position}"
+
+class WebhookEvent(models.Model):
+    """Authorize.Net webhook notifications already applied, for deduplication and audit."""
+    notification_id = models.CharField(max_length=64, unique=True)
+    event_type = models.CharField(max_length=100)
+    event_date = models.DateTimeField(null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_type} - {self.notification_id}"
+
+class RevenueRollup(models.Model):
+    """
+    Revenue totals per day or month, maintained by ``rollups.refresh``.
+    ``transaction`` rows break Transaction down by status; ``subscription``
+    rows break SubscriptionPayment down by status, plan and billing interval.
+    """
+    PERIOD_CHOICES = [('day', 'Day'), ('month', 'Month')]
+    SOURCE_CHOICES = [('transaction', 'Transaction'), ('subscription', 'Subscription payment')]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    status = models.CharField(max_length=20)
+    plan = models.CharField(max_length=100, blank=True) # Subscription.name
+    interval = models.CharField(max_length=20, blank=True) # e.g. "1 months"
+    count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'source', 'period_start', 'status', 'plan', 'interval'],
+                name='revenue_rollup_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.period_start} {self.source} {self.status} - {self.amount}"
+
+class ArchivedTransaction(models.Model):
+    """Transaction rows moved out of the primary table by ``archival.archive``; ids are preserved."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    transaction_id = models.CharField(max_length=50, unique=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Transaction.STATUS_CHOICES)
+    response_code = models.CharField(max_length=10, blank=True, null=True)
+    response_text = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='archived_txn_user_created_idx'),
+            models.Index(fields=['created_at'], name='archived_txn_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_id} - {self.status} (archived)"
+
+class ArchivedSubscriptionPayment(models.Model):
+    """SubscriptionPayment rows moved out of the primary table by ``archival.archive``; ids are preserved."""
+    id = models.BigIntegerField(primary_key=True)
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='+')
+    transaction_id = models.CharField(max_length=50, unique=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20)
+    date = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='archived_subpayment_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subscription_id} - {self.amount} - {self.date} (archived)"
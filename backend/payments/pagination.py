@@ -0,0 +1,100 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination on (``field``, id). The cursor carries
+    the last row's value and id, so each page is one index range scan and
+    rows sharing a value are neither repeated nor skipped. (DRF's
+    CursorPagination keys on the first ordering field only and falls back
+    to an offset, capped at 1000, for ties.)
+    """
+    field = None
+    descending = False
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return model._meta.get_field(self.field).to_python(value), int(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row):
+        value = getattr(row, self.field)
+        position = json.dumps([value.isoformat() if value is not None else None, row.pk])
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, base64.urlsafe_b64encode(position.encode()).decode(),
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        size = self.get_page_size(request)
+        sign, op = ('-', 'lt') if self.descending else ('', 'gt')
+        queryset = queryset.order_by(f'{sign}{self.field}', f'{sign}id')
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'id__{op}': pk}))
+        rows = list(queryset[:size + 1])
+        self.page = rows[:size]
+        self.has_next = len(rows) > size
+        return self.page
+
+    def get_next_link(self):
+        return self.encode_cursor(self.page[-1]) if self.has_next else None
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class BillingDateCursorPagination(KeysetPagination):
+    """Keyset pagination in billing order, along subscription_billing_idx."""
+    field = 'next_billing_date'
+    page_size = 100
+    max_page_size = 1000
+
+
+class TransactionCursorPagination(KeysetPagination):
+    """
+    Keyset pagination over (user, created_at, id), newest first: every page
+    is an index range scan starting at the cursor, so page N costs the same
+    as page 1, and rows inserted in one batch with the same created_at are
+    all listed once.
+    """
+    field = 'created_at'
+    descending = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.continuation = getattr(view, 'archive_continuation', None)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_next_link(self):
+        link = super().get_next_link()
+        if link is None and self.continuation is not None:
+            # The recent rows are exhausted: carry on from the top of the archive
+            url = remove_query_param(self.base_url, self.cursor_query_param)
+            return replace_query_param(url, 'created_before', self.continuation.isoformat())
+        return link
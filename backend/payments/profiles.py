@@ -0,0 +1,40 @@
+"""Saved payment profiles (cards stored on Authorize.Net under a customer profile)."""
+from .models import PaymentProfile
+
+DUPLICATE_PAYMENT_PROFILE = 'E00039'
+
+# Positions in the comma-delimited validation direct response
+ACCOUNT_NUMBER_FIELD = 50
+CARD_TYPE_FIELD = 51
+
+
+def card_details(direct_response):
+    """Return ``(card_type, last4)`` from a validation direct response, or blanks if absent."""
+    fields = (direct_response or '').split(',')
+    if len(fields) <= CARD_TYPE_FIELD:
+        return '', ''
+    return fields[CARD_TYPE_FIELD][:20], fields[ACCOUNT_NUMBER_FIELD][-4:]
+
+
+def payment_profile_id(response):
+    """
+    The payment profile ID from a createCustomerPaymentProfile response. A
+    card already stored on the profile comes back as E00039 with the
+    existing ID, which is reused rather than treated as a failure.
+    """
+    if not response:
+        return None
+    if response['messages']['resultCode'] == "Ok":
+        return response.get('customerPaymentProfileId')
+    if response['messages']['message'][0]['code'] == DUPLICATE_PAYMENT_PROFILE:
+        return response.get('customerPaymentProfileId')
+    return None
+
+
+def remember(customer_profile, payment_profile_id, direct_response=None):
+    card_type, last4 = card_details(direct_response)
+    saved, created = PaymentProfile.objects.get_or_create(
+        payment_profile_id=payment_profile_id,
+        defaults={'customer_profile': customer_profile, 'card_type': card_type, 'card_last4': last4},
+    )
+    return saved
@@ -0,0 +1,226 @@
+"""
+Background subscription provisioning.
+
+`SubscriptionViewSet.create` with ``Prefer: respond-async`` stores a pending
+Subscription plus a SubscriptionProvisioning record and returns 202. The
+gateway steps then run on a per-process worker pool. Each step persists
+its result before the next one starts, so a run that dies part-way can be
+resumed from the last completed step (see ``manage.py resume_provisioning``).
+Any failure counts as an attempt, and a record is failed after
+SUBSCRIPTION_PROVISIONING_MAX_ATTEMPTS. A retried subscription step first
+looks for a subscription an earlier attempt created before its response
+was lost, so a read timeout does not bill the customer twice.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import profiles
+from .models import CustomerProfile, Subscription, SubscriptionProvisioning
+from .services import AuthorizeNetService, gateway_error
+
+logger = logging.getLogger(__name__)
+
+
+class ProvisioningError(Exception):
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        self.transient = transient
+
+
+def _check(response, action):
+    if response is None:
+        raise ProvisioningError(f"{action}: No response from gateway", transient=True)
+    if response['messages']['resultCode'] != "Ok":
+        raise ProvisioningError(f"{action}: {gateway_error(response)}")
+
+
+def _customer_profile_step(service, record):
+    subscription = record.subscription
+    profile, created = CustomerProfile.objects.get_or_create(user_id=subscription.user_id)
+
+    if created or not profile.authorize_net_profile_id:
+        response = service.create_customer_profile(
+            email=record.email,
+            nonce=record.nonce,
+            first_name=record.first_name,
+            last_name=record.last_name
+        )
+        _check(response, "Failed to create customer profile")
+        profile.authorize_net_profile_id = response['customerProfileId']
+        profile.save()
+        payment_profile_ids = response.get('customerPaymentProfileIdList') or [None]
+        payment_profile_id = payment_profile_ids[0]
+        direct_response = (response.get('validationDirectResponseList') or [None])[0]
+    else:
+        response = service.create_customer_payment_profile(
+            customer_profile_id=profile.authorize_net_profile_id,
+            nonce=record.nonce,
+            first_name=record.first_name,
+            last_name=record.last_name
+        )
+        payment_profile_id = profiles.payment_profile_id(response)
+        if not payment_profile_id:
+            _check(response, "Failed to create payment profile")
+        direct_response = response.get('validationDirectResponse')
+
+    if not payment_profile_id:
+        raise ProvisioningError("Payment profile ID not found.")
+    profiles.remember(profile, payment_profile_id, direct_response)
+
+    record.customer_profile_id = profile.authorize_net_profile_id
+    record.customer_payment_profile_id = payment_profile_id
+    record.nonce = ''
+    record.step = 'subscription'
+    record.save()
+
+
+def _existing_subscription(service, record):
+    """
+    The ARB subscription on the record's customer profile that no local
+    Subscription holds, i.e. one an earlier attempt created before its
+    response was lost; None if there is none.
+    """
+    response = service.get_customer_profile(record.customer_profile_id)
+    _check(response, "Failed to look up customer profile")
+    ids = [str(subscription_id) for subscription_id in response.get('subscriptionIds') or []]
+    known = set(Subscription.objects.filter(subscription_id__in=ids).values_list('subscription_id', flat=True))
+    unknown = [subscription_id for subscription_id in ids if subscription_id not in known]
+    if len(unknown) > 1:
+        raise ProvisioningError(
+            f"Customer profile {record.customer_profile_id} has several unknown subscriptions: {', '.join(unknown)}"
+        )
+    return unknown[0] if unknown else None
+
+
+def _subscription_step(service, record):
+    subscription = record.subscription
+    subscription_id = _existing_subscription(service, record) if record.attempts else None
+    if subscription_id is None:
+        response = service.create_subscription(
+            name=subscription.name,
+            amount=subscription.amount,
+            interval_length=subscription.interval_length,
+            interval_unit=subscription.interval_unit,
+            start_date=subscription.start_date.isoformat(),
+            customer_profile_id=record.customer_profile_id,
+            customer_payment_profile_id=record.customer_payment_profile_id
+        )
+        _check(response, "Failed to create subscription")
+        subscription_id = response['subscriptionId']
+    else:
+        logger.warning(f"Adopting subscription {subscription_id} created by an earlier attempt for {subscription.pk}")
+
+    with transaction.atomic():
+        subscription.subscription_id = subscription_id
+        subscription.status = 'active'
+        subscription.save()
+        record.step = 'done'
+        record.error = ''
+        record.save()
+
+
+STEPS = {
+    'customer_profile': _customer_profile_step,
+    'subscription': _subscription_step,
+}
+
+
+def _claim(pk):
+    now = timezone.now()
+    return SubscriptionProvisioning.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        pk=pk,
+        step__in=list(STEPS),
+    ).update(locked_until=now + timedelta(seconds=settings.SUBSCRIPTION_PROVISIONING_LEASE)) == 1
+
+
+def _fail(record):
+    with transaction.atomic():
+        record.step = 'failed'
+        record.nonce = ''
+        record.save()
+        record.subscription.status = 'failed'
+        record.subscription.save()
+
+
+def run(pk):
+    """Drive one provisioning record to 'done' or 'failed'. Safe to call concurrently."""
+    close_old_connections()
+    try:
+        if not _claim(pk):
+            return
+        record = SubscriptionProvisioning.objects.select_related('subscription').get(pk=pk)
+        service = AuthorizeNetService()
+
+        while record.step in STEPS:
+            try:
+                STEPS[record.step](service, record)
+            except ProvisioningError as e:
+                record.attempts += 1
+                record.error = str(e)
+                if e.transient and record.attempts < settings.SUBSCRIPTION_PROVISIONING_MAX_ATTEMPTS:
+                    record.save()
+                    time.sleep(2 ** record.attempts)
+                    continue
+                logger.error(f"Provisioning failed for subscription {record.subscription.pk}: {e}")
+                _fail(record)
+            except Exception as e:
+                # An unexpected payload or a database error. Count it, then leave
+                # the record for `resume_provisioning` once the lease runs out.
+                logger.exception(f"Provisioning step {record.step} crashed for record {pk}")
+                SubscriptionProvisioning.objects.filter(pk=pk).update(
+                    attempts=F('attempts') + 1, error=f"{record.step}: {e!r}",
+                )
+                record.refresh_from_db()
+                if record.attempts < settings.SUBSCRIPTION_PROVISIONING_MAX_ATTEMPTS:
+                    return
+                _fail(record)
+
+        SubscriptionProvisioning.objects.filter(pk=pk).update(locked_until=None)
+    except Exception:
+        # Claiming or loading the record failed; the lease runs out and
+        # `resume_provisioning` picks it up again
+        logger.exception(f"Provisioning crashed for record {pk}")
+    finally:
+        close_old_connections()
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.SUBSCRIPTION_PROVISIONING_WORKERS,
+                thread_name_prefix='provisioning',
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def enqueue(pk):
+    """Start provisioning once the surrounding transaction (if any) commits."""
+    transaction.on_commit(lambda: get_executor().submit(run, pk))
+
+
+def resumable(stale_after):
+    """Unfinished records nobody is working on, e.g. after a worker restart."""
+    now = timezone.now()
+    return SubscriptionProvisioning.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        step__in=list(STEPS),
+        updated_at__lt=now - timedelta(seconds=stale_after),
+    ).values_list('pk', flat=True)
@@ -0,0 +1,142 @@
+"""
+Subscription status reconciliation against Authorize.Net.
+
+Statuses are pulled in pages with ARBGetSubscriptionList and written back
+with one UPDATE per status per page. Every subscription the listing covers
+gets ``last_synced_at`` stamped with the run's start time; that stamp is
+the watermark. Open subscriptions the listing missed (paging drift while
+statuses change, list errors, or ``use_list=False``) and that have not been
+synced within ``max_age`` are then checked with per-ID status calls, a
+bounded number at a time.
+
+Updates are idempotent, so overlapping or interrupted runs are harmless.
+"""
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Subscription
+from .services import AuthorizeNetService, gateway_error
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TYPES = ('subscriptionActive', 'subscriptionInactive')
+
+# ARB status -> Subscription.status
+GATEWAY_STATUSES = {
+    'active': 'active',
+    'suspended': 'suspended',
+    'canceled': 'canceled',
+    'cancelled': 'canceled',
+    'expired': 'expired',
+    'terminated': 'terminated',
+}
+
+# Local statuses ARB can still move a subscription away from
+OPEN_STATUSES = ('active', 'suspended')
+
+
+def apply_statuses(statuses, synced_at):
+    """
+    Write ``{subscription_id: status}`` back in one transaction.
+    Returns the number of subscriptions whose status changed.
+    """
+    by_status = defaultdict(list)
+    for subscription_id, status in statuses.items():
+        by_status[status].append(subscription_id)
+
+    changed = 0
+    with transaction.atomic():
+        for status, ids in by_status.items():
+            matching = Subscription.objects.filter(subscription_id__in=ids)
+            changed += matching.exclude(status=status).update(
+                status=status, last_synced_at=synced_at, updated_at=timezone.now()
+            )
+            matching.exclude(last_synced_at=synced_at).update(last_synced_at=synced_at)
+    return changed
+
+
+def listed_pages(service, page_size):
+    """Yield ``{subscription_id: status}`` per ARBGetSubscriptionList page."""
+    for search_type in SEARCH_TYPES:
+        page = 1
+        while True:
+            response = service.get_subscription_list(search_type, page, limit=page_size)
+            if not response or response['messages']['resultCode'] != "Ok":
+                # Anything left unlisted is picked up by the per-ID pass
+                logger.warning(f"ARBGetSubscriptionList {search_type} page {page} failed: {gateway_error(response)}")
+                break
+            details = response.get('subscriptionDetails') or []
+            yield {
+                str(d['id']): GATEWAY_STATUSES[d['status'].lower()]
+                for d in details if d.get('status', '').lower() in GATEWAY_STATUSES
+            }
+            if len(details) < page_size or page * page_size >= int(response.get('totalNumInResultSet', 0)):
+                break
+            page += 1
+
+
+def stale_batches(synced_before, batch_size):
+    """Yield lists of subscription IDs for open subscriptions not synced since ``synced_before``."""
+    pending = Subscription.objects.filter(
+        Q(last_synced_at__isnull=True) | Q(last_synced_at__lt=synced_before),
+        status__in=OPEN_STATUSES,
+        subscription_id__isnull=False,
+    ).order_by('pk')
+    last_pk = None
+    while True:
+        page = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+        rows = list(page.values_list('pk', 'subscription_id')[:batch_size])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        yield [subscription_id for _, subscription_id in rows]
+
+
+def _status_of(service, subscription_id):
+    response = service.get_subscription_status(subscription_id)
+    if not response or response['messages']['resultCode'] != "Ok":
+        logger.warning(f"ARBGetSubscriptionStatus {subscription_id} failed: {gateway_error(response)}")
+        return None
+    return GATEWAY_STATUSES.get(str(response.get('status', '')).lower())
+
+
+def reconcile(use_list=True, max_age=None, concurrency=None, page_size=None, limit=None):
+    """Bring Subscription.status in line with the gateway. Returns run counters."""
+    max_age = settings.SUBSCRIPTION_RECONCILE_MAX_AGE if max_age is None else max_age
+    concurrency = concurrency or settings.SUBSCRIPTION_RECONCILE_CONCURRENCY
+    page_size = page_size or settings.SUBSCRIPTION_RECONCILE_PAGE_SIZE
+
+    started = timezone.now()
+    service = AuthorizeNetService()
+    stats = {'listed': 0, 'checked': 0, 'errors': 0, 'changed': 0}
+
+    if use_list:
+        for statuses in listed_pages(service, page_size):
+            stats['listed'] += len(statuses)
+            stats['changed'] += apply_statuses(statuses, started)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for ids in stale_batches(started - timedelta(seconds=max_age), page_size):
+            if limit is not None:
+                ids = ids[:limit - stats['checked']]
+            results = pool.map(lambda subscription_id: _status_of(service, subscription_id), ids)
+            statuses = {}
+            for subscription_id, status in zip(ids, results):
+                if status is None:
+                    stats['errors'] += 1
+                else:
+                    statuses[subscription_id] = status
+            stats['checked'] += len(ids)
+            stats['changed'] += apply_statuses(statuses, timezone.now())
+            if limit is not None and stats['checked'] >= limit:
+                break
+
+    logger.info(f"Subscription reconciliation finished: {stats}")
+    return stats
@@ -0,0 +1,104 @@
+"""
+Subscription billing dates.
+
+Subscription.next_billing_date is the next date the gateway will charge.
+It starts at ``start_date`` and ``advance`` moves it past each successful
+payment as settlements and webhooks post them, so renewal forecasts and
+dunning lists are index range scans on (status, next_billing_date)
+instead of date arithmetic over every subscription.
+
+Dates follow ARB scheduling: every ``interval_length`` days, or the same
+day of the month as ``start_date`` every ``interval_length`` months,
+falling back to the last day of shorter months.
+"""
+from calendar import monthrange
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Subscription
+
+BULK_BATCH_SIZE = 500
+# Statuses that need attention whatever the date
+DUNNING_STATUSES = ['failed', 'suspended']
+
+
+def billing_date(start_date, interval_length, interval_unit, occurrence):
+    """Date of the ``occurrence``-th charge; occurrence 0 is ``start_date``."""
+    if interval_unit == 'days':
+        return start_date + timedelta(days=interval_length * occurrence)
+    months = start_date.month - 1 + interval_length * occurrence
+    year, month = start_date.year + months // 12, months % 12 + 1
+    return start_date.replace(year=year, month=month, day=min(start_date.day, monthrange(year, month)[1]))
+
+
+def billing_date_after(start_date, interval_length, interval_unit, day):
+    """First billing date strictly after ``day``."""
+    if day < start_date:
+        return start_date
+    if interval_unit == 'days':
+        occurrence = (day - start_date).days // interval_length + 1
+    else:
+        months = (day.year - start_date.year) * 12 + day.month - start_date.month
+        occurrence = max(months // interval_length, 0)
+    while billing_date(start_date, interval_length, interval_unit, occurrence) <= day:
+        occurrence += 1
+    return billing_date(start_date, interval_length, interval_unit, occurrence)
+
+
+def advance(payments):
+    """
+    Move next_billing_date past the successful SubscriptionPayments in
+    ``payments``. Never moves it backwards, so replays are harmless.
+    Returns the number of subscriptions updated.
+    """
+    paid = {}
+    for payment in payments:
+        if payment.status != 'Success':
+            continue
+        day = timezone.localdate(payment.date)
+        if payment.subscription_id not in paid or day > paid[payment.subscription_id]:
+            paid[payment.subscription_id] = day
+    if not paid:
+        return 0
+
+    now = timezone.now()
+    changed = []
+    subscriptions = Subscription.objects.filter(pk__in=paid).only(
+        'pk', 'start_date', 'interval_length', 'interval_unit', 'next_billing_date',
+    )
+    for subscription in subscriptions:
+        due = billing_date_after(
+            subscription.start_date, subscription.interval_length, subscription.interval_unit,
+            paid[subscription.pk],
+        )
+        if subscription.next_billing_date is None or due > subscription.next_billing_date:
+            subscription.next_billing_date = due
+            subscription.updated_at = now
+            changed.append(subscription)
+    Subscription.objects.bulk_update(changed, ['next_billing_date', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+    return len(changed)
+
+
+def upcoming(start, end):
+    """Active subscriptions billing between ``start`` and ``end`` (dates, inclusive)."""
+    return Subscription.objects.filter(
+        status='active', next_billing_date__gte=start, next_billing_date__lte=end,
+    ).order_by('next_billing_date', 'id')
+
+
+def dunning(today=None):
+    """
+    Subscriptions whose last charge failed, plus active ones whose billing
+    date passed more than DUNNING_GRACE_DAYS ago without a payment posting.
+    """
+    today = today or timezone.localdate()
+    overdue = today - timedelta(days=settings.DUNNING_GRACE_DAYS)
+    # Rows without a billing date (only bulk_create can still skip it)
+    # would break the billing-order cursor
+    return Subscription.objects.filter(
+        Q(status__in=DUNNING_STATUSES) | Q(status='active', next_billing_date__lt=overdue),
+        next_billing_date__isnull=False,
+    ).order_by('next_billing_date', 'id')
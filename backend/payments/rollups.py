@@ -0,0 +1,217 @@
+"""
+Revenue rollups.
+
+RevenueRollup holds per-day and per-month totals, so reports read a few
+rows per period however large Transaction and SubscriptionPayment grow.
+
+``refresh`` is incremental. It finds the days that have rows changed
+since the ``revenue-rollups`` SyncCursor watermark, recomputes those days
+from the source tables and re-derives the affected months from the day
+rows. Each recompute replaces whole days, so status changes and late
+settlement rows converge on the right totals and reruns are harmless.
+Days older than the archive boundary are read from the archive tables.
+The watermark is moved back by OVERLAP on each run so rows committed
+late by long transactions are not missed. ``since`` recomputes every day
+with rows changed after that time; ``rebuild`` recomputes every day.
+
+Run it from one place (cron or ``--interval``): concurrent runs conflict
+on the unique constraint and one of them fails.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import archival
+from .models import RevenueRollup, SyncCursor, Transaction
+
+logger = logging.getLogger(__name__)
+
+CURSOR = 'revenue-rollups'
+OVERLAP = timedelta(minutes=5)
+# Longest span of days recomputed in one query and one database transaction
+WINDOW_DAYS = 31
+BULK_BATCH_SIZE = 250
+
+
+def _transaction_rows(start, end):
+    for tier in archival.tiers('transactions', start, end):
+        rows = (
+            tier.annotate(day=TruncDate('created_at'))
+            .values('day', 'status')
+            .annotate(count=Count('id'), amount=Sum('amount'))
+        )
+        for row in rows:
+            yield row['day'], (row['status'], '', ''), row['count'], row['amount']
+
+
+def _subscription_rows(start, end):
+    for tier in archival.tiers('subscription-payments', start, end):
+        rows = (
+            tier.annotate(day=TruncDate('date'), plan=F('subscription__name'),
+                          unit=F('subscription__interval_unit'), length=F('subscription__interval_length'))
+            .values('day', 'status', 'plan', 'unit', 'length')
+            .annotate(count=Count('id'), amount=Sum('amount'))
+        )
+        for row in rows:
+            yield row['day'], (row['status'], row['plan'], f"{row['length']} {row['unit']}"), row['count'], row['amount']
+
+
+# source: (statuses counted as revenue, status of separate refund rows subtracted from it)
+REVENUE_STATUSES = {
+    'transaction': (Transaction.CHARGED_STATUSES, 'refunded'),
+    # A refunded subscription payment changes status in place rather than adding a row
+    'subscription': (['Success'], None),
+}
+
+SOURCES = {
+    # source: (archival tier, changed-at field, day field, aggregation)
+    'transaction': ('transactions', 'updated_at', 'created_at', _transaction_rows),
+    'subscription': ('subscription-payments', 'updated_at', 'date', _subscription_rows),
+}
+
+
+def _bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _month(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def changed_days(source, since):
+    tier, changed_field, day_field, _ = SOURCES[source]
+    if since is None:
+        tiers = archival.tiers(tier)
+    else:
+        # Archived rows only change by moving, which leaves the totals alone
+        tiers = [archival.TIERS[tier][0].objects.filter(**{f'{changed_field}__gte': since})]
+    days = set()
+    for rows in tiers:
+        days.update(rows.annotate(day=TruncDate(day_field)).values_list('day', flat=True).distinct())
+    return sorted(days - {None})
+
+
+def windows(days):
+    """Group sorted days into (first, last) spans of at most WINDOW_DAYS."""
+    first = last = None
+    for day in days:
+        if first is not None and (day - first).days >= WINDOW_DAYS:
+            yield first, last
+            first = None
+        if first is None:
+            first = day
+        last = day
+    if first is not None:
+        yield first, last
+
+
+def _replace(period, source, first, last, totals):
+    RevenueRollup.objects.filter(
+        period=period, source=source, period_start__gte=first, period_start__lte=last,
+    ).delete()
+    RevenueRollup.objects.bulk_create([
+        RevenueRollup(
+            period=period, period_start=day, source=source,
+            status=status, plan=plan, interval=interval, count=count, amount=amount,
+        )
+        for (day, (status, plan, interval)), (count, amount) in totals.items()
+    ], batch_size=BULK_BATCH_SIZE)
+
+
+def rebuild_days(source, first, last):
+    """Recompute day rollups for ``first``..``last`` and the months containing them."""
+    aggregate = SOURCES[source][3]
+    totals = {}
+    for day, key, count, amount in aggregate(_bounds(first)[0], _bounds(last)[1]):
+        # A day straddling the archive boundary has rows in both tiers
+        if (day, key) in totals:
+            count, amount = count + totals[day, key][0], amount + totals[day, key][1]
+        totals[day, key] = (count, amount)
+
+    month_first, month_last = _month(first), _month(last)
+    with transaction.atomic():
+        _replace('day', source, first, last, totals)
+        months = defaultdict(lambda: [0, 0])
+        day_rows = RevenueRollup.objects.filter(
+            period='day', source=source,
+            period_start__gte=month_first, period_start__lt=_next_month(month_last),
+        ).values_list('period_start', 'status', 'plan', 'interval', 'count', 'amount')
+        for day, status, plan, interval, count, amount in day_rows:
+            entry = months[_month(day), (status, plan, interval)]
+            entry[0] += count
+            entry[1] += amount
+        _replace('month', source, month_first, month_last, {k: tuple(v) for k, v in months.items()})
+    return len(totals)
+
+
+def refresh(since=None, rebuild=False):
+    """Bring the rollups up to date. Returns run counters."""
+    cursor, _ = SyncCursor.objects.get_or_create(name=CURSOR)
+    started = timezone.now()
+    if rebuild:
+        since = None
+    elif since is None and cursor.position is not None:
+        since = cursor.position - OVERLAP
+
+    stats = {'days': 0, 'rows': 0}
+    for source in SOURCES:
+        for first, last in windows(changed_days(source, since)):
+            stats['rows'] += rebuild_days(source, first, last)
+            stats['days'] += (last - first).days + 1
+
+    if cursor.position is None or started > cursor.position:
+        cursor.position = started
+        cursor.save()
+    logger.info(f"Revenue rollup refresh finished: {stats}")
+    return stats
+
+
+def _report_rows(period, start, end, group_by, statuses):
+    source = 'transaction' if group_by == 'status' else 'subscription'
+    if period == 'month':
+        start = _month(start)
+    rows = RevenueRollup.objects.filter(
+        period=period, source=source, period_start__gte=start, period_start__lte=end,
+    )
+    if statuses:
+        rows = rows.filter(status__in=statuses)
+    return source, rows
+
+
+def report(period, start, end, group_by, statuses=None):
+    """
+    Totals per period between ``start`` and ``end`` (dates, inclusive) from
+    the rollups. ``group_by`` is 'status' (all transactions) or 'plan' /
+    'interval' (subscription payments).
+    """
+    _, rows = _report_rows(period, start, end, group_by, statuses)
+    return (
+        rows.values('period_start', group_by)
+        .annotate(count=Sum('count'), amount=Sum('amount'))
+        .order_by('period_start', group_by)
+    )
+
+
+def net_revenue(period, start, end, group_by, statuses=None):
+    """
+    Net revenue over the rows ``report`` returns: charged statuses minus
+    refunds. Failed and voided rows count towards neither.
+    """
+    source, rows = _report_rows(period, start, end, group_by, statuses)
+    charged, refunded = REVENUE_STATUSES[source]
+    sums = {'charged': Sum('amount', filter=Q(status__in=charged))}
+    if refunded:
+        sums['refunded'] = Sum('amount', filter=Q(status=refunded))
+    totals = rows.aggregate(**sums)
+    return (totals['charged'] or Decimal('0')) - (totals.get('refunded') or Decimal('0'))
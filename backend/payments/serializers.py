@@ -1,5 +1,6 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Transaction, Subscription, SubscriptionPayment, Product, SubscriptionPlan
+from .models import Transaction, Subscription, SubscriptionPayment, Product, SubscriptionPlan, PaymentProfile
 
 class TransactionSerializer(serializers.ModelSerializer):
     id = serializers.CharField(read_only=True)
@@ -8,27 +9,105 @@ class TransactionSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('transaction_id', 'status', 'response_code', 'response_text', 'user')
 
+class TransactionFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the transactions list."""
+    DATE_FORMATS = ['iso-8601', '%Y-%m-%d']
+
+    status = serializers.MultipleChoiceField(choices=Transaction.STATUS_CHOICES, required=False)
+    min_amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    created_after = serializers.DateTimeField(input_formats=DATE_FORMATS, required=False)
+    created_before = serializers.DateTimeField(input_formats=DATE_FORMATS, required=False)
+
+class RevenueReportFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the revenue report."""
+    MAX_DAYS = {'day': 366, 'month': 3660}
+
+    period = serializers.ChoiceField(choices=['day', 'month'], default='day')
+    group_by = serializers.ChoiceField(choices=['status', 'plan', 'interval'], default='status')
+    start = serializers.DateField()
+    end = serializers.DateField()
+    status = serializers.ListField(child=serializers.CharField(max_length=20), required=False)
+
+    def validate(self, attrs):
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must not be after end.")
+        if (attrs['end'] - attrs['start']).days >= self.MAX_DAYS[attrs['period']]:
+            raise serializers.ValidationError(
+                f"At most {self.MAX_DAYS[attrs['period']]} days per request for period={attrs['period']}."
+            )
+        return attrs
+
+class ExportFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the exports."""
+    DATE_FORMATS = ['iso-8601', '%Y-%m-%d']
+
+    start = serializers.DateTimeField(input_formats=DATE_FORMATS, required=False)
+    end = serializers.DateTimeField(input_formats=DATE_FORMATS, required=False)
+
+class RenewalFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the upcoming renewals list."""
+    days = serializers.IntegerField(min_value=1, max_value=366, default=7)
+
 class CreatePaymentSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=10, decimal_places=2)
     nonce = serializers.CharField(max_length=500, help_text="Accept.js Opaque Data Value")
     descriptor = serializers.CharField(max_length=255, required=False)
 
+class BatchChargeItemSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    nonce = serializers.CharField(max_length=500, required=False, help_text="Accept.js Opaque Data Value")
+    customer_profile_id = serializers.CharField(max_length=50, required=False)
+    payment_profile_id = serializers.CharField(max_length=50, required=False)
+    descriptor = serializers.CharField(max_length=255, required=False)
+    reference = serializers.CharField(max_length=100, required=False, help_text="Caller's ID, echoed back in the result")
+
+    def validate(self, attrs):
+        has_profile = 'customer_profile_id' in attrs and 'payment_profile_id' in attrs
+        if ('nonce' in attrs) == has_profile:
+            raise serializers.ValidationError(
+                "Provide either a nonce or both customer_profile_id and payment_profile_id."
+            )
+        return attrs
+
+class BatchChargeSerializer(serializers.Serializer):
+    charges = BatchChargeItemSerializer(many=True, allow_empty=False, max_length=settings.BATCH_CHARGE_MAX_ITEMS)
+
 class SubscriptionSerializer(serializers.ModelSerializer):
     id = serializers.CharField(read_only=True)
     class Meta:
         model = Subscription
         fields = '__all__'
-        read_only_fields = ('subscription_id', 'status', 'user')
+        read_only_fields = ('subscription_id', 'status', 'user', 'next_billing_date')
 
 class CreateSubscriptionSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=100)
     amount = serializers.DecimalField(max_digits=10, decimal_places=2)
     interval_length = serializers.IntegerField(min_value=1)
     interval_unit = serializers.ChoiceField(choices=[('months', 'Months'), ('days', 'Days')])
-    nonce = serializers.CharField(max_length=500, help_text="Accept.js Opaque Data Value (required for new profile)")
-    email = serializers.EmailField()
-    first_name = serializers.CharField(max_length=50)
-    last_name = serializers.CharField(max_length=50)
+    nonce = serializers.CharField(max_length=500, required=False, help_text="Accept.js Opaque Data Value (required for new profile)")
+    payment_profile = serializers.IntegerField(min_value=1, required=False, help_text="ID of a saved payment profile, instead of a nonce")
+    email = serializers.EmailField(required=False)
+    first_name = serializers.CharField(max_length=50, required=False)
+    last_name = serializers.CharField(max_length=50, required=False)
+
+    def validate(self, attrs):
+        if ('nonce' in attrs) == ('payment_profile' in attrs):
+            raise serializers.ValidationError("Provide either a nonce or a saved payment_profile.")
+        if 'nonce' in attrs:
+            missing = {
+                field: "This field is required when paying with a nonce."
+                for field in ('email', 'first_name', 'last_name') if field not in attrs
+            }
+            if missing:
+                raise serializers.ValidationError(missing)
+        return attrs
+
+class PaymentProfileSerializer(serializers.ModelSerializer):
+    id = serializers.CharField(read_only=True)
+    class Meta:
+        model = PaymentProfile
+        fields = ('id', 'card_type', 'card_last4', 'created_at')
 
 class UpdateSubscriptionSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
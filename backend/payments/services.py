@@ -1,20 +1,34 @@
 from django.conf import settings
-import requests
-import json
+from authorizednet import profiling
+from .transport import get_transport, get_async_transport
+from . import gateway_log, metrics
+from .codec import get_codec
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+def gateway_error(response):
+    """First error message of a gateway response, or a placeholder when there was none."""
+    details = "Unknown Error"
+    if response:
+        details = response['messages']['message'][0]['text']
+    return details
+
 class AuthorizeNetService:
     def __init__(self):
         self.api_login_id = settings.AUTHORIZENET_API_LOGIN_ID
         self.transaction_key = settings.AUTHORIZENET_TRANSACTION_KEY
         self.environment = settings.AUTHORIZENET_ENVIRONMENT
+        self.transport = get_transport()
+        self.codec = get_codec()
         
         if self.environment == 'production':
             self.api_url = "https://api2.authorize.net/xml/v1/request.api"
         else:
             self.api_url = "https://apitest.authorize.net/xml/v1/request.api"
+        if settings.AUTHORIZENET_API_URL:
+            self.api_url = settings.AUTHORIZENET_API_URL
 
     def _get_base_request(self):
         return {
@@ -24,27 +38,48 @@ class AuthorizeNetService:
             }
         }
 
+    def _encode_request(self, data):
+        return self.codec.dumps(data)
+
+    def _decode_response(self, response):
+        response.raise_for_status()
+        # The API prefixes the body with a UTF-8 BOM; the codec skips it
+        return self.codec.loads(response.content)
+
+    def _log_error(self, e):
+        logger.error(f"Authorize.Net API Error: {str(e)}")
+        if hasattr(e, 'response') and e.response:
+            logger.error(f"Response content: {e.response.text}")
+
+    def _observe(self, data, json_data, response, response_json, error, elapsed):
+        gateway_log.log_exchange(self.api_url, data, response_json, elapsed)
+        profiling.record('gateway', elapsed)
+        messages = (response_json or {}).get('messages', {}).get('message') or [{}]
+        metrics.observe(
+            request_type=next(iter(data), 'unknown').removesuffix('Request'),
+            elapsed=elapsed,
+            outcome=gateway_log.outcome(response_json),
+            code=messages[0].get('code'),
+            error=type(error).__name__ if error is not None else None,
+            bytes_out=len(json_data) if json_data else 0,
+            bytes_in=len(response.content) if response is not None else 0,
+        )
+
     def _send_request(self, data):
         headers = {'Content-Type': 'application/json'}
+        started = time.perf_counter()
+        json_data = response = response_json = error = None
         try:
-            json_data = json.dumps(data)
-            logger.debug(f"Authorize.Net Request URL: {self.api_url}")
-            logger.debug(f"Authorize.Net Request Data: {json_data}")
-            
-            response = requests.post(self.api_url, data=json_data, headers=headers)
-            response.raise_for_status()
-            
-            # The API returns a byte string with BOM sometimes, strip it
-            content = response.text.lstrip('\ufeff')
-            response_json = json.loads(content)
-            
-            logger.debug(f"Authorize.Net Response: {json.dumps(response_json)}")
+            json_data = self._encode_request(data)
+            response = self.transport.post(self.api_url, json_data, headers=headers)
+            response_json = self._decode_response(response)
             return response_json
         except Exception as e:
-            logger.error(f"Authorize.Net API Error: {str(e)}")
-            if hasattr(e, 'response') and e.response:
-                logger.error(f"Response content: {e.response.text}")
+            error = e
+            self._log_error(e)
             return None
+        finally:
+            self._observe(data, json_data, response, response_json, error, time.perf_counter() - started)
 
     def create_transaction(self, amount, nonce, descriptor=None):
         req = {
@@ -67,6 +102,27 @@ class AuthorizeNetService:
         }
         return self._send_request(req)
 
+    def charge_customer_profile(self, amount, customer_profile_id, payment_profile_id, descriptor=None):
+        req = {
+            "createTransactionRequest": {
+                **self._get_base_request(),
+                "transactionRequest": {
+                    "transactionType": "authCaptureTransaction",
+                    "amount": str(amount),
+                    "profile": {
+                        "customerProfileId": customer_profile_id,
+                        "paymentProfile": {
+                            "paymentProfileId": payment_profile_id
+                        }
+                    },
+                    "order": {
+                        "description": descriptor or "Payment Transaction"
+                    }
+                }
+            }
+        }
+        return self._send_request(req)
+
     def create_customer_profile(self, email, nonce=None, **kwargs):
         if 'merchant_customer_id' in kwargs:
              merchant_customer_id = kwargs['merchant_customer_id']
@@ -104,6 +160,16 @@ class AuthorizeNetService:
         }
         return self._send_request(req)
 
+    def get_customer_profile(self, customer_profile_id):
+        """The profile with its payment profiles and the IDs of its ARB subscriptions."""
+        req = {
+            "getCustomerProfileRequest": {
+                **self._get_base_request(),
+                "customerProfileId": customer_profile_id
+            }
+        }
+        return self._send_request(req)
+
     def create_customer_payment_profile(self, customer_profile_id, nonce, **kwargs):
         req = {
             "createCustomerPaymentProfileRequest": {
@@ -168,3 +234,78 @@ class AuthorizeNetService:
             }
         }
          return self._send_request(req)
+
+    def get_subscription_list(self, search_type, page, limit=1000):
+        """One page (1-based) of ARBGetSubscriptionList, ordered by subscription ID."""
+        req = {
+            "ARBGetSubscriptionListRequest": {
+                **self._get_base_request(),
+                "searchType": search_type,
+                "sorting": {
+                    "orderBy": "id",
+                    "orderDescending": False
+                },
+                "paging": {
+                    "limit": limit,
+                    "offset": page
+                }
+            }
+        }
+        return self._send_request(req)
+
+    def get_settled_batch_list(self, first_settlement_date, last_settlement_date):
+        """Settled batches in a window of at most 31 days; dates are ISO 8601 UTC strings."""
+        req = {
+            "getSettledBatchListRequest": {
+                **self._get_base_request(),
+                "includeStatistics": False,
+                "firstSettlementDate": first_settlement_date,
+                "lastSettlementDate": last_settlement_date
+            }
+        }
+        return self._send_request(req)
+
+    def get_transaction_list(self, batch_id, page, limit=1000):
+        """One page (1-based) of a settled batch's transactions, oldest first."""
+        req = {
+            "getTransactionListRequest": {
+                **self._get_base_request(),
+                "batchId": batch_id,
+                "sorting": {
+                    "orderBy": "submitTimeUTC",
+                    "orderDescending": False
+                },
+                "paging": {
+                    "limit": limit,
+                    "offset": page
+                }
+            }
+        }
+        return self._send_request(req)
+
+
+class AsyncAuthorizeNetService(AuthorizeNetService):
+    """
+    Same API as AuthorizeNetService, but every request method returns an
+    awaitable. Must be instantiated inside a running event loop.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.transport = get_async_transport()
+
+    async def _send_request(self, data):
+        headers = {'Content-Type': 'application/json'}
+        started = time.perf_counter()
+        json_data = response = response_json = error = None
+        try:
+            json_data = self._encode_request(data)
+            response = await self.transport.post(self.api_url, json_data, headers=headers)
+            response_json = self._decode_response(response)
+            return response_json
+        except Exception as e:
+            error = e
+            self._log_error(e)
+            return None
+        finally:
+            self._observe(data, json_data, response, response_json, error, time.perf_counter() - started)
@@ -0,0 +1,186 @@
+"""
+Settlement ingestion.
+
+Walks getSettledBatchList in windows of at most 31 days and each batch's
+getTransactionList one page at a time. Every page is applied in a single
+database transaction together with the ``settlements`` SyncCursor, so memory
+stays bounded by the page size and an interrupted run resumes at the next
+unread page. Re-applying a page is harmless.
+"""
+import logging
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import renewals
+from .models import CustomerProfile, Subscription, SubscriptionPayment, SyncCursor, Transaction
+from .services import AuthorizeNetService, gateway_error
+
+logger = logging.getLogger(__name__)
+
+CURSOR = 'settlements'
+MAX_WINDOW = timedelta(days=31)
+BULK_BATCH_SIZE = 250
+
+# getTransactionList transactionStatus -> Transaction.status
+TRANSACTION_STATUSES = {
+    'settledSuccessfully': 'captured',
+    'capturedPendingSettlement': 'captured',
+    'voided': 'voided',
+    'refundSettledSuccessfully': 'refunded',
+    'refundPendingSettlement': 'refunded',
+    'declined': 'failed',
+    'generalError': 'failed',
+    'settlementError': 'failed',
+    'communicationError': 'failed',
+    'expired': 'failed',
+}
+
+
+class SettlementError(Exception):
+    pass
+
+
+def _check(response, action):
+    if not response or response['messages']['resultCode'] != "Ok":
+        raise SettlementError(f"{action} failed: {gateway_error(response)}")
+
+
+def _format(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def settled_batches(service, start, end):
+    """Yield settled batches between ``start`` and ``end``, oldest first."""
+    window_start = start
+    while window_start < end:
+        window_end = min(window_start + MAX_WINDOW, end)
+        response = service.get_settled_batch_list(_format(window_start), _format(window_end))
+        _check(response, "getSettledBatchList")
+        batches = response.get('batchList') or []
+        yield from sorted(batches, key=lambda b: parse_datetime(b['settlementTimeUTC']))
+        window_start = window_end
+
+
+def apply_page(transactions, stats):
+    """Upsert one getTransactionList page into Transaction and SubscriptionPayment."""
+    rows = {}
+    for t in transactions:
+        status = TRANSACTION_STATUSES.get(t.get('transactionStatus'))
+        if status:
+            rows[str(t['transId'])] = (t, status)
+    if not rows:
+        return
+
+    subscription_ids = {str(t['subscription']['id']) for t, _ in rows.values() if t.get('subscription')}
+    subscriptions = {
+        subscription_id: (pk, user_id)
+        for subscription_id, pk, user_id in Subscription.objects.filter(subscription_id__in=subscription_ids)
+        .values_list('subscription_id', 'pk', 'user_id')
+    }
+    profile_ids = {t['profile']['customerProfileId'] for t, _ in rows.values() if t.get('profile')}
+    profile_owners = dict(
+        CustomerProfile.objects.filter(authorize_net_profile_id__in=profile_ids)
+        .values_list('authorize_net_profile_id', 'user_id')
+    )
+    existing = {
+        t.transaction_id: t
+        for t in Transaction.objects.filter(transaction_id__in=rows).only('pk', 'transaction_id', 'status')
+    }
+
+    now = timezone.now()
+    to_update = []
+    to_create = []
+    payments = []
+    for transaction_id, (t, status) in rows.items():
+        amount = Decimal(str(t.get('settleAmount', 0)))
+        subscription = subscriptions.get(str(t['subscription']['id'])) if t.get('subscription') else None
+
+        current = existing.get(transaction_id)
+        if current is None:
+            if subscription:
+                user_id = subscription[1]
+            else:
+                user_id = profile_owners.get((t.get('profile') or {}).get('customerProfileId'))
+            to_create.append(Transaction(
+                user_id=user_id,
+                transaction_id=transaction_id,
+                amount=amount,
+                status=status,
+                response_text=t.get('transactionStatus'),
+            ))
+        elif current.status != status:
+            current.status = status
+            current.updated_at = now
+            to_update.append(current)
+
+        if subscription and status in ('captured', 'failed'):
+            payments.append(SubscriptionPayment(
+                subscription_id=subscription[0],
+                transaction_id=transaction_id,
+                amount=amount,
+                status='Success' if status == 'captured' else 'Failed',
+                date=parse_datetime(t['submitTimeUTC']) or now,
+            ))
+
+    Transaction.objects.bulk_update(to_update, ['status', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+    Transaction.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+    SubscriptionPayment.objects.bulk_create(payments, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+    renewals.advance(payments)
+    stats['transactions'] += len(rows)
+    stats['updated'] += len(to_update)
+    stats['created'] += len(to_create)
+    stats['subscription_payments'] += len(payments)
+
+
+def ingest(since=None, until=None, page_size=None):
+    """
+    Ingest settled batches from the cursor (or ``since``) up to ``until``.
+    Returns run counters. Raises SettlementError on gateway failures; the
+    cursor keeps the progress made so far.
+    """
+    page_size = page_size or settings.SETTLEMENT_PAGE_SIZE
+    cursor, _ = SyncCursor.objects.get_or_create(name=CURSOR)
+    end = until or timezone.now()
+    start = since or cursor.position or end - timedelta(days=settings.SETTLEMENT_INITIAL_LOOKBACK_DAYS)
+    # An explicit `since` is a backfill: revisit batches the cursor has already passed
+    skip_through = None if since else cursor.position
+
+    service = AuthorizeNetService()
+    stats = {'batches': 0, 'transactions': 0, 'updated': 0, 'created': 0, 'subscription_payments': 0}
+
+    for batch in settled_batches(service, start, end):
+        batch_id = str(batch['batchId'])
+        settled_at = parse_datetime(batch['settlementTimeUTC'])
+        resuming = batch_id == cursor.batch_id
+        if not resuming and skip_through and settled_at <= skip_through:
+            continue
+
+        page = cursor.page + 1 if resuming else 1
+        while True:
+            response = service.get_transaction_list(batch_id, page, limit=page_size)
+            _check(response, f"getTransactionList for batch {batch_id}")
+            transactions = response.get('transactions') or []
+            with transaction.atomic():
+                apply_page(transactions, stats)
+                cursor.batch_id = batch_id
+                cursor.page = page
+                cursor.save()
+            if len(transactions) < page_size or page * page_size >= int(response.get('totalNumInResultSet', 0)):
+                break
+            page += 1
+
+        if cursor.position is None or settled_at > cursor.position:
+            cursor.position = settled_at
+        cursor.batch_id = ''
+        cursor.page = 0
+        cursor.save()
+        skip_through = cursor.position if not since else None
+        stats['batches'] += 1
+
+    logger.info(f"Settlement ingestion finished: {stats}")
+    return stats
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import catalog, follower_reads
+from .authentication import invalidate_user
+from .models import Product, Subscription, SubscriptionPlan, Transaction
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=SubscriptionPlan)
+def invalidate_catalog(sender, **kwargs):
+    # After commit, so a concurrent rebuild cannot cache the pre-change rows under the new version
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance)
+
+
+# post_save only: a delete receiver would stop the archival job's batch
+# deletes from taking Django's single-statement fast path
+@receiver(post_save, sender=Transaction)
+def mark_owner_written(sender, instance, **kwargs):
+    follower_reads.mark_written([instance.user_id])
+
+
+@receiver(pre_save, sender=Subscription)
+def default_next_billing_date(sender, instance, **kwargs):
+    # Subscriptions created outside the API (admin, shell) bill first on start_date
+    if instance.next_billing_date is None and instance.start_date:
+        instance.next_billing_date = instance.start_date
@@ -0,0 +1,21 @@
+"""Canned Authorize.Net responses shared by the tests."""
+
+APPROVED = {
+    "messages": {"resultCode": "Ok", "message": [{"code": "I00001", "text": "Successful."}]},
+    "transactionResponse": {
+        "responseCode": "1", "transId": "60001",
+        "messages": [{"code": "1", "description": "This transaction has been approved."}],
+    },
+}
+DECLINED = {
+    "messages": {"resultCode": "Error", "message": [{"code": "E00027", "text": "The transaction was unsuccessful."}]},
+    "transactionResponse": {
+        "responseCode": "2", "transId": "0",
+        "errors": [{"errorCode": "2", "errorText": "This transaction has been declined."}],
+    },
+}
+
+
+def approved(trans_id):
+    response = {**APPROVED, "transactionResponse": {**APPROVED["transactionResponse"], "transId": trans_id}}
+    return response
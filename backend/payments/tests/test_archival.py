@@ -0,0 +1,47 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from payments import archival
+from payments.models import ArchivedTransaction, Transaction
+
+User = get_user_model()
+
+
+class ArchivalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='archived', password='pw')
+        self.old = timezone.now() - timedelta(days=400)
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, transaction_id=f'T{i}', amount=Decimal('5.00'), status='captured')
+            for i in range(5)
+        ])
+        Transaction.objects.filter(transaction_id__in=['T0', 'T1', 'T2']).update(created_at=self.old)
+
+    def test_old_rows_move_to_the_archive(self):
+        stats = archival.archive('transactions', batch_size=2, pause=0)
+        self.assertEqual(stats['moved'], 3)
+        self.assertEqual(set(ArchivedTransaction.objects.values_list('transaction_id', flat=True)), {'T0', 'T1', 'T2'})
+        self.assertEqual(set(Transaction.objects.values_list('transaction_id', flat=True)), {'T3', 'T4'})
+        self.assertEqual(len(archival.tiers('transactions', start=timezone.now() - timedelta(days=1))), 1)
+        self.assertEqual(sum(rows.count() for rows in archival.tiers('transactions')), 5)
+
+        archived = ArchivedTransaction.objects.get(transaction_id='T0')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(reverse('transaction-detail', args=[archived.pk])).json()['transaction_id'], 'T0')
+        self.assertEqual(client.get(reverse('transaction-detail', args=['abc'])).status_code, 404)
+
+    def test_rewritten_row_is_kept_not_dropped(self):
+        archival.archive('transactions', pause=0)
+        replay = Transaction.objects.create(transaction_id='T0', amount=Decimal('5.00'), status='captured')
+        Transaction.objects.filter(pk=replay.pk).update(created_at=self.old)
+        stats = archival.archive('transactions', pause=0)
+        self.assertEqual((stats['moved'], stats['conflicts']), (0, 1))
+        self.assertTrue(Transaction.objects.filter(pk=replay.pk).exists())
+        self.assertLessEqual(archival.boundary('transactions'), self.old)
@@ -0,0 +1,59 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from payments.gateway_stub import GatewayStub
+from payments.models import Transaction
+from payments.services import AsyncAuthorizeNetService
+from payments.views import AsyncPaymentView
+
+User = get_user_model()
+
+
+class AsyncPaymentViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='pw')
+        self.stub = GatewayStub(seed=1).start()
+        self.addCleanup(self.stub.stop)
+        settings = override_settings(AUTHORIZENET_API_URL=self.stub.url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def charge(self, body, **headers):
+        request = APIRequestFactory().post('/api/payments/charge/', body, format='json', **headers)
+        force_authenticate(request, self.user)
+        return async_to_sync(AsyncPaymentView.as_view())(request)
+
+    def test_charge_is_approved_and_stored(self):
+        response = self.charge({"amount": "10.00", "nonce": "n"})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Transaction.objects.filter(user=self.user, transaction_id=response.data['transaction_id']).exists())
+
+    def test_idempotency_key_replays_without_a_second_gateway_call(self):
+        first = self.charge({"amount": "10.00", "nonce": "n"}, HTTP_IDEMPOTENCY_KEY='k1')
+        second = self.charge({"amount": "10.00", "nonce": "n"}, HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.stub.calls['createTransactionRequest'], 1)
+
+    def test_decline(self):
+        self.stub.error_rate = 1.0
+        response = self.charge({"amount": "10.00", "nonce": "n"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_async_service_calls_share_the_loop_client(self):
+        async def charge_twice():
+            service = AsyncAuthorizeNetService()
+            first = await service.create_transaction('1.00', 'n')
+            second = await AsyncAuthorizeNetService().create_transaction('2.00', 'n')
+            same_client = service.transport is AsyncAuthorizeNetService().transport
+            await service.transport.close()
+            return first, second, same_client
+
+        first, second, same_client = async_to_sync(charge_twice)()
+        self.assertEqual(first['transactionResponse']['responseCode'], '1')
+        self.assertNotEqual(first['transactionResponse']['transId'], second['transactionResponse']['transId'])
+        self.assertTrue(same_client)
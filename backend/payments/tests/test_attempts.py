@@ -0,0 +1,45 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from payments import attempts
+from payments.models import ChargeAttempt, Transaction
+
+from .responses import DECLINED
+
+User = get_user_model()
+
+
+class ChargeAttemptTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @mock.patch('payments.views.attempts.record')
+    @mock.patch('payments.views.AuthorizeNetService.create_transaction', return_value=DECLINED)
+    def test_declines_in_a_row_are_recorded_as_attempts(self, create_transaction, record):
+        for _ in range(2):
+            response = self.client.post(reverse('payment-charge'), {"amount": "10.00", "nonce": "n"}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(record.call_count, 2)
+
+        # Both declines carry transId "0"; neither may collide with the other
+        attempts.AttemptWriter().apply([attempts.from_response(DECLINED, self.user.pk, Decimal('10.00'))] * 2)
+        self.assertEqual(ChargeAttempt.objects.filter(outcome='declined', user=self.user).count(), 2)
+
+    def test_missing_response_is_recorded_as_no_response(self):
+        attempt = attempts.from_response(None, self.user.pk, Decimal('1.00'))
+        self.assertEqual(attempt.outcome, 'no_response')
+
+    def test_writer_flushes_on_close(self):
+        writer = attempts.AttemptWriter(batch_size=10, interval=60)
+        with mock.patch.object(writer, 'apply') as apply:
+            writer.add(attempts.from_response(DECLINED, self.user.pk, Decimal('1.00')))
+            writer.close()
+        self.assertEqual(len(apply.call_args[0][0]), 1)
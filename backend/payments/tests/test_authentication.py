@@ -0,0 +1,53 @@
+import pickle
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from payments.authentication import CachedJWTAuthentication, user_cache_key
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='pw', email='buyer@example.com')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.url = reverse('transaction-list')
+
+    def test_cache_holds_no_password_hash(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        entry = cache.get(user_cache_key(self.user.pk))
+        self.assertEqual(set(entry), {'id', 'is_active', 'is_staff', 'is_superuser', 'revoke_hash'})
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(entry))
+
+    def test_hit_skips_the_user_query_and_loads_other_fields_lazily(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            user = CachedJWTAuthentication().get_user(AccessToken.for_user(self.user))
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertFalse(user.is_staff)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'buyer@example.com')
+
+    @mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True)
+    def test_password_change_revokes_cached_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.user.set_password('new')
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deactivation_is_checked_on_a_hit(self):
+        self.client.get(self.url)
+        entry = cache.get(user_cache_key(self.user.pk))
+        cache.set(user_cache_key(self.user.pk), {**entry, 'is_active': False})
+        self.assertEqual(self.client.get(self.url).status_code, 401)
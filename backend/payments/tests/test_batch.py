@@ -0,0 +1,66 @@
+import json
+from collections import Counter
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from payments.models import ChargeAttempt, Transaction
+
+from .responses import DECLINED, approved
+
+User = get_user_model()
+
+RESPONSES = {
+    'n1': approved('7001'),
+    'n2': approved('0'),  # test mode: every charge reports transId "0"
+    'n3': approved('0'),
+    'n4': DECLINED,
+    'n5': approved('7002'),  # already recorded for another user
+    'n6': approved('7003'),  # stored first, without an owner, by a webhook
+}
+
+
+@override_settings(BATCH_CHARGE_WRITE_SIZE=2)
+@mock.patch('payments.batch.attempts.record')
+@mock.patch('payments.batch.AuthorizeNetService')
+class BatchChargeTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pw', is_staff=True)
+        self.other = User.objects.create_user(username='other', password='pw')
+        Transaction.objects.create(user=self.other, transaction_id='7002', amount=Decimal('3.00'), status='captured')
+        Transaction.objects.create(transaction_id='7003', amount=Decimal('1.00'), status='captured')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _run(self):
+        response = self.client.post(reverse('payment-charge-batch'), {"charges": [
+            {"amount": "1.00", "nonce": nonce, "reference": nonce} for nonce in RESPONSES
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_every_charge_is_reported_and_conflicts_are_kept(self, service, record):
+        service.return_value.create_transaction.side_effect = lambda amount, nonce, descriptor: RESPONSES[nonce]
+        *results, summary = self._run()
+
+        self.assertEqual(sorted(line['reference'] for line in results), sorted(RESPONSES))
+        statuses = {line['reference']: line['status'] for line in results}
+        self.assertEqual(statuses['n1'], 'success')
+        self.assertEqual(statuses['n4'], 'error')
+        self.assertEqual(statuses['n5'], 'conflict')
+        self.assertEqual(statuses['n6'], 'success')
+        self.assertEqual(sorted([statuses['n2'], statuses['n3']]), ['conflict', 'success'])
+        self.assertEqual(summary['summary'], {"total": 6, "succeeded": 3, "conflicts": 2, "failed": 1})
+
+        self.assertEqual(
+            set(Transaction.objects.filter(user=self.admin).values_list('transaction_id', flat=True)),
+            {'7001', '0', '7003'},
+        )
+        self.assertEqual(Transaction.objects.get(transaction_id='7002').user, self.other)
+        conflicts = ChargeAttempt.objects.filter(outcome='conflict', user=self.admin, source='batch')
+        self.assertEqual(Counter(conflicts.values_list('transaction_id', flat=True)), {'0': 1, '7002': 1})
+        self.assertEqual(record.call_count, 1)
@@ -0,0 +1,38 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from payments import catalog
+from payments.models import Product
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog._local.clear()
+        Product.objects.create(name='Mug', price=Decimal('8.00'))
+        self.url = reverse('product-list')
+
+    def test_etag_revalidation(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()[0]['name'], 'Mug')
+        etag = first['ETag']
+
+        for header in (etag, f'W/{etag}', f'"other", W/{etag}', '*'):
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_change_serves_a_new_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Cap', price=Decimal('12.00'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
@@ -0,0 +1,38 @@
+import codecs
+import io
+import json
+from unittest import skipIf
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from payments import codec
+from payments.management.commands.bench_json_codec import legacy_loads
+
+BODY = {"messages": {"resultCode": "Ok", "message": [{"code": "I00001", "text": "Successful."}]}, "id": "é"}
+
+
+class CodecTests(SimpleTestCase):
+    def check_round_trip(self, name):
+        gateway_codec = codec.get_codec(name)
+        raw = json.dumps(BODY).encode()
+        self.assertEqual(gateway_codec.loads(raw), BODY)
+        self.assertEqual(gateway_codec.loads(codecs.BOM_UTF8 + b' \n' + raw), BODY)
+        self.assertEqual(json.loads(gateway_codec.dumps(BODY)), BODY)
+        with self.assertRaises(ValueError):
+            gateway_codec.loads(raw + b'{}')
+
+    def test_stdlib(self):
+        self.check_round_trip('json')
+
+    @skipIf(codec.orjson is None, "orjson is not installed")
+    def test_orjson(self):
+        self.check_round_trip('orjson')
+
+    def test_bench_command_runs(self):
+        out = io.StringIO()
+        call_command('bench_json_codec', iterations=5, list_size=10, stdout=out)
+        self.assertIn('json', out.getvalue())
+
+    def test_legacy_path_strips_the_bom(self):
+        self.assertEqual(legacy_loads(codecs.BOM_UTF8 + json.dumps(BODY).encode()), BODY)
@@ -0,0 +1,55 @@
+import csv
+import gzip
+import io
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from payments import exports
+from payments.models import Transaction
+
+User = get_user_model()
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    def test_q_values_are_honoured(self):
+        self.assertTrue(exports.accepts_gzip('gzip, deflate, br'))
+        self.assertTrue(exports.accepts_gzip('br;q=1.0, gzip;q=0.5'))
+        self.assertTrue(exports.accepts_gzip('*'))
+        self.assertFalse(exports.accepts_gzip(''))
+        self.assertFalse(exports.accepts_gzip('gzip;q=0'))
+        self.assertFalse(exports.accepts_gzip('GZIP; q=0.000, *'))
+        self.assertFalse(exports.accepts_gzip('deflate, *;q=0'))
+        self.assertFalse(exports.accepts_gzip('identity'))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='pw', is_staff=True))
+        Transaction.objects.bulk_create([
+            Transaction(transaction_id=f'T{i}', amount=Decimal('2.50'), status='captured') for i in range(3)
+        ])
+        self.url = reverse('export', args=['transactions', 'csv'])
+
+    def _rows(self, body):
+        return list(csv.DictReader(io.StringIO(body.decode())))
+
+    def test_gzipped_when_accepted(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        rows = self._rows(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual([row['transaction_id'] for row in rows], ['T0', 'T1', 'T2'])
+
+    def test_plain_when_gzip_is_refused(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(self._rows(b''.join(response.streaming_content))), 3)
+
+    def test_unknown_export(self):
+        self.assertEqual(self.client.get(reverse('export', args=['users', 'csv'])).status_code, 404)
@@ -0,0 +1,74 @@
+from contextlib import nullcontext
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from payments import batch, follower_reads
+from payments.models import Transaction
+
+User = get_user_model()
+
+
+class RecentWriteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', password='pw')
+
+    def test_saving_a_transaction_marks_its_owner_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(user=self.user, transaction_id='F1', amount=Decimal('5.00'), status='captured')
+            self.assertFalse(follower_reads.wrote_recently(self.user))
+        self.assertTrue(follower_reads.wrote_recently(self.user))
+
+    def test_batch_inserts_mark_owners(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            batch.save_approved([
+                Transaction(user=self.user, transaction_id='F2', amount=Decimal('5.00'), status='captured'),
+            ])
+        self.assertTrue(follower_reads.wrote_recently(self.user))
+
+
+class FollowerReadRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_use_follower_reads_until_the_user_writes(self):
+        with mock.patch('payments.follower_reads.follower_reads', return_value=nullcontext()) as historical:
+            self.assertEqual(self.client.get(reverse('transaction-list')).status_code, 200)
+            self.assertEqual(historical.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                follower_reads.mark_written([self.user.pk])
+            self.assertEqual(self.client.get(reverse('transaction-list')).status_code, 200)
+            self.assertEqual(historical.call_count, 1)
+
+    @override_settings(FOLLOWER_READ_STALENESS=0.0)
+    def test_statement_on_cockroachdb(self):
+        connection = mock.MagicMock(vendor='cockroachdb', in_atomic_block=False)
+        with mock.patch.object(follower_reads, 'connections', {'default': connection}), \
+                mock.patch.object(follower_reads.transaction, 'atomic', return_value=nullcontext()):
+            with follower_reads.follower_reads():
+                pass
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with("SET TRANSACTION AS OF SYSTEM TIME follower_read_timestamp()")
+
+        with override_settings(FOLLOWER_READ_STALENESS=4.8):
+            self.assertEqual(follower_reads.as_of(), "'-4.8s'")
+
+    def test_noop_outside_cockroachdb_or_when_disabled(self):
+        connection = mock.MagicMock(vendor='postgresql', in_atomic_block=False)
+        with mock.patch.object(follower_reads, 'connections', {'default': connection}):
+            with follower_reads.follower_reads():
+                pass
+            connection.vendor = 'cockroachdb'
+            with override_settings(FOLLOWER_READS=False), follower_reads.follower_reads():
+                pass
+        connection.cursor.assert_not_called()
@@ -0,0 +1,46 @@
+import json
+import logging
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from payments import gateway_log
+
+REQUEST = {"createTransactionRequest": {
+    "merchantAuthentication": {"name": "login", "transactionKey": "secret"},
+    "transactionRequest": {"amount": "5.00", "payment": {"opaqueData": {"dataValue": "nonce"}}},
+}}
+OK = {"messages": {"resultCode": "Ok", "message": [{"code": "I00001", "text": "Successful."}]}}
+
+
+@override_settings(GATEWAY_LOG_SAMPLE_RATE=1.0, GATEWAY_LOG_ERROR_SAMPLE_RATE=1.0)
+class GatewayLogTests(SimpleTestCase):
+    def test_credentials_and_card_data_are_masked(self):
+        with self.assertLogs('payments.gateway', level='DEBUG') as logs:
+            gateway_log.log_exchange('https://gateway', REQUEST, OK, 0.0123)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['request_type'], record['outcome'], record['elapsed_ms']), ('createTransactionRequest', 'ok', 12.3))
+        body = record['request']['createTransactionRequest']
+        self.assertEqual(body['merchantAuthentication'], gateway_log.REDACTED)
+        self.assertEqual(body['transactionRequest']['payment']['opaqueData'], gateway_log.REDACTED)
+        self.assertEqual(body['transactionRequest']['amount'], '5.00')
+        self.assertNotIn('secret', logs.output[0])
+        self.assertNotIn('nonce', logs.output[0])
+
+    def test_nothing_is_built_unless_debug_is_enabled(self):
+        logger = logging.getLogger('payments.gateway')
+        with mock.patch.object(logger, 'isEnabledFor', return_value=False), \
+                mock.patch('payments.gateway_log.redact') as redact, mock.patch.object(logger, 'debug') as debug:
+            gateway_log.log_exchange('https://gateway', REQUEST, OK, 0.01)
+        self.assertFalse(redact.called)
+        self.assertFalse(debug.called)
+
+    @override_settings(GATEWAY_LOG_SAMPLE_RATE=0.0)
+    def test_successes_and_failures_are_sampled_separately(self):
+        logger = logging.getLogger('payments.gateway')
+        with mock.patch.object(logger, 'isEnabledFor', return_value=True), mock.patch.object(logger, 'debug') as debug:
+            gateway_log.log_exchange('https://gateway', REQUEST, OK, 0.01)
+            self.assertFalse(debug.called)
+            gateway_log.log_exchange('https://gateway', REQUEST, None, 0.01)
+        self.assertEqual(debug.call_count, 1)
+        self.assertEqual(json.loads(str(debug.call_args.args[1]))['outcome'], 'failure')
@@ -0,0 +1,66 @@
+import asyncio
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+
+from payments.gateway_stub import GatewayStub, Latency
+from payments.services import AuthorizeNetService
+
+
+class LatencyTests(SimpleTestCase):
+    def test_specs(self):
+        self.assertEqual(Latency('fixed:0.25').sample(None), 0.25)
+        for spec in ('uniform:0.1,0.2', 'normal:0.2,0', 'lognormal:0.15,0.5', 'exp:0.2'):
+            Latency(spec)
+
+    def test_bad_specs_are_rejected_when_parsed(self):
+        for spec in ('exp:0', 'exp:-1', 'lognormal:0,0.5', 'normal:0.2,-1', 'uniform:0.3,0.1', 'fixed', 'pareto:1'):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                Latency(spec)
+
+    def test_command_rejects_bad_spec(self):
+        with self.assertRaises(CommandError):
+            call_command('run_gateway_stub', latency='exp:0')
+
+
+class RunGatewayStubTests(SimpleTestCase):
+    def test_prints_the_bound_port(self):
+        def serve(stub, ready):
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(stub._start_server())
+            ready(stub)
+            loop.run_until_complete(stub._shutdown())
+            loop.close()
+
+        out = io.StringIO()
+        with mock.patch.object(GatewayStub, 'serve_forever', autospec=True, side_effect=serve):
+            call_command('run_gateway_stub', port=0, stdout=out)
+        port = int(out.getvalue().split('http://127.0.0.1:')[1].split('/')[0])
+        self.assertNotEqual(port, 0)
+
+
+class GatewayStubTests(SimpleTestCase):
+    def setUp(self):
+        self.stub = GatewayStub(seed=1).start()
+        self.addCleanup(self.stub.stop)
+        settings = override_settings(AUTHORIZENET_API_URL=self.stub.url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_follow_up_calls_see_earlier_state(self):
+        service = AuthorizeNetService()
+        charge = service.create_transaction('10.00', 'nonce')
+        self.assertEqual(charge['transactionResponse']['responseCode'], '1')
+
+        profile = service.create_customer_profile(email='a@example.com', nonce='nonce')
+        profile_id = profile['customerProfileId']
+        subscription = service.create_subscription(
+            'Pro', '9.99', 1, 'months', '2026-11-01', profile_id, profile['customerPaymentProfileIdList'][0],
+        )
+        looked_up = service.get_customer_profile(profile_id)
+        self.assertEqual(looked_up['subscriptionIds'], [subscription['subscriptionId']])
+        self.assertEqual(service.get_subscription_status(subscription['subscriptionId'])['status'], 'active')
+        self.assertEqual(self.stub.calls['createTransactionRequest'], 1)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from payments import idempotency
+from payments.models import IdempotencyKey
+
+from .responses import APPROVED
+
+User = get_user_model()
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('payment-charge')
+        self.body = {"amount": "10.00", "nonce": "n"}
+
+    @mock.patch('payments.views.AuthorizeNetService.create_transaction', return_value=APPROVED)
+    def test_key_replays_the_first_response(self, create_transaction):
+        first = self.client.post(self.url, self.body, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        second = self.client.post(self.url, self.body, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(create_transaction.call_count, 1)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+        other = self.client.post(self.url, {"amount": "20.00", "nonce": "n"}, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(other.status_code, 422)
+
+    def _claimed(self, locked_until):
+        # A key claimed by a request whose worker never finished
+        return IdempotencyKey.objects.create(
+            user=self.user, endpoint='charge', key='k1',
+            request_hash=idempotency._request_hash(mock.Mock(data=self.body)),
+            expires_at=timezone.now() + timedelta(days=1), locked_until=locked_until,
+        )
+
+    @mock.patch('payments.views.AuthorizeNetService.create_transaction', return_value=APPROVED)
+    def test_expired_lease_fails_the_key_without_charging(self, create_transaction):
+        self._claimed(timezone.now() - timedelta(seconds=1))
+        response = self.client.post(self.url, self.body, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertFalse(create_transaction.called)
+        self.assertEqual(IdempotencyKey.objects.get().state, 'completed')
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    @mock.patch('payments.views.AuthorizeNetService.create_transaction', return_value=APPROVED)
+    def test_live_lease_makes_retries_wait(self, create_transaction):
+        self._claimed(timezone.now() + timedelta(minutes=1))
+        response = self.client.post(self.url, self.body, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(create_transaction.called)
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from payments import metrics
+
+User = get_user_model()
+
+
+class MetricsRenderTests(TestCase):
+    def test_histogram_and_counters(self):
+        metrics.observe('metricsTest', 0.3, 'ok', code='I00001', bytes_out=100, bytes_in=40)
+        metrics.observe('metricsTest', 45.0, 'failure', error='ReadTimeout')
+        body = metrics.render()
+        self.assertIn('authorizenet_request_duration_seconds_bucket{request_type="metricsTest",le="0.25"} 0', body)
+        self.assertIn('authorizenet_request_duration_seconds_bucket{request_type="metricsTest",le="0.5"} 1', body)
+        self.assertIn('authorizenet_request_duration_seconds_bucket{request_type="metricsTest",le="+Inf"} 2', body)
+        self.assertIn('authorizenet_requests_total{request_type="metricsTest",outcome="failure"} 1', body)
+        self.assertIn('authorizenet_transport_errors_total{request_type="metricsTest",error="ReadTimeout"} 1', body)
+        self.assertIn('authorizenet_request_bytes_total{request_type="metricsTest"} 100', body)
+
+
+@override_settings(GATEWAY_METRICS_TOKEN='scrape-token')
+class MetricsEndpointTests(TestCase):
+    url = reverse('gateway-metrics')
+
+    def get(self, authorization=None):
+        client = APIClient()
+        if authorization:
+            client.credentials(HTTP_AUTHORIZATION=authorization)
+        return client.get(self.url)
+
+    def test_scraper_token(self):
+        response = self.get('Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'authorizenet_pool_requests_total', response.content)
+
+    def test_admin_jwt(self):
+        admin = User.objects.create_user(username='admin', password='pw', is_staff=True)
+        self.assertEqual(self.get(f'Bearer {AccessToken.for_user(admin)}').status_code, 200)
+
+    def test_others_are_refused(self):
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.get('Bearer wrong-token').status_code, 401)
+        user = User.objects.create_user(username='buyer', password='pw')
+        self.assertEqual(self.get(f'Bearer {AccessToken.for_user(user)}').status_code, 403)
+
+    @override_settings(GATEWAY_METRICS_TOKEN='')
+    def test_no_token_configured_means_no_token_access(self):
+        self.assertEqual(self.get('Bearer ').status_code, 401)
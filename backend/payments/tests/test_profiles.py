@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from payments import profiles
+from payments.gateway_stub import GatewayStub, _direct_response
+from payments.models import PaymentProfile, Subscription
+
+User = get_user_model()
+
+NEW_CARD = {
+    "name": "Pro", "amount": "9.99", "interval_length": 1, "interval_unit": "months",
+    "nonce": "n", "email": "buyer@example.com", "first_name": "Ann", "last_name": "Lee",
+}
+
+
+class DirectResponseTests(SimpleTestCase):
+    def test_card_details(self):
+        self.assertEqual(profiles.card_details(_direct_response()), ('Visa', '1111'))
+        self.assertEqual(profiles.card_details(''), ('', ''))
+        self.assertEqual(profiles.card_details(None), ('', ''))
+
+    def test_duplicate_card_reuses_the_existing_id(self):
+        duplicate = {
+            "customerPaymentProfileId": "900",
+            "messages": {"resultCode": "Error", "message": [{"code": "E00039", "text": "A duplicate record already exists."}]},
+        }
+        self.assertEqual(profiles.payment_profile_id(duplicate), "900")
+        self.assertIsNone(profiles.payment_profile_id({**duplicate, "messages": {
+            "resultCode": "Error", "message": [{"code": "E00013", "text": "Card Code is invalid."}],
+        }}))
+
+
+class SavedPaymentProfileTests(TestCase):
+    def setUp(self):
+        self.stub = GatewayStub(seed=1).start()
+        self.addCleanup(self.stub.stop)
+        settings = override_settings(AUTHORIZENET_API_URL=self.stub.url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username='buyer', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_second_subscription_reuses_the_saved_card(self):
+        self.assertEqual(self.client.post(reverse('subscription-list'), NEW_CARD, format='json').status_code, 201)
+        cards = self.client.get(reverse('payment-profile-list')).json()
+        self.assertEqual([(card['card_type'], card['card_last4']) for card in cards], [('Visa', '1111')])
+
+        calls_before = sum(self.stub.calls.values())
+        saved = {key: NEW_CARD[key] for key in ('name', 'amount', 'interval_length', 'interval_unit')}
+        response = self.client.post(
+            reverse('subscription-list'), {**saved, "payment_profile": cards[0]['id']}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sum(self.stub.calls.values()) - calls_before, 1)
+        self.assertEqual(self.stub.calls['createCustomerPaymentProfileRequest'], 0)
+        self.assertEqual(Subscription.objects.filter(user=self.user, status='active').count(), 2)
+        self.assertEqual(PaymentProfile.objects.count(), 1)
+
+    def test_another_users_card_is_refused(self):
+        other = User.objects.create_user(username='other', password='pw')
+        client = APIClient()
+        client.force_authenticate(other)
+        client.post(reverse('subscription-list'), NEW_CARD, format='json')
+        card = PaymentProfile.objects.get()
+        response = self.client.post(reverse('subscription-list'), {
+            "name": "Pro", "amount": "9.99", "interval_length": 1, "interval_unit": "months", "payment_profile": card.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscription.objects.filter(user=self.user).exists())
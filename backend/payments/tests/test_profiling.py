@@ -0,0 +1,45 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='profiled', password='pw'))
+        self.url = reverse('transaction-list')
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_request_gets_server_timing(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        timing = dict(
+            (name, (float(dur), desc))
+            for name, dur, desc in re.findall(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response['Server-Timing'])
+        )
+        self.assertEqual(list(timing), ['db', 'gateway', 'serialize', 'total'])
+        self.assertNotEqual(timing['db'][1], 'SQL (0)')
+        self.assertEqual(timing['gateway'], (0.0, 'Authorize.Net (0)'))
+        self.assertEqual(timing['serialize'][1], 'DRF rendering (1)')
+        self.assertGreaterEqual(timing['total'][0], timing['db'][0])
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_request_has_no_header(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1.0, REQUEST_PROFILING_LOG=True)
+    def test_profile_is_logged_as_json(self):
+        with self.assertLogs('authorizednet.profiling', level='INFO') as logs:
+            self.client.get(self.url)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['method'], entry['status'], entry['view']), ('GET', 200, 'transaction-list'))
+        self.assertGreater(entry['db_count'], 0)
+        self.assertEqual(entry['gateway_count'], 0)
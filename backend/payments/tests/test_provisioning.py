@@ -0,0 +1,78 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from payments import provisioning
+from payments.models import Subscription, SubscriptionProvisioning
+
+User = get_user_model()
+
+OK = {"resultCode": "Ok", "message": [{"code": "I00001", "text": "Successful."}]}
+
+
+@override_settings(SUBSCRIPTION_PROVISIONING_MAX_ATTEMPTS=3)
+@mock.patch('payments.provisioning.time.sleep')
+@mock.patch('payments.provisioning.AuthorizeNetService')
+class ProvisioningTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='subscriber', password='pw')
+        subscription = Subscription.objects.create(
+            user=user, name='Pro', amount=Decimal('9.99'), interval_length=1, interval_unit='months',
+            start_date=date(2026, 11, 1), status='pending',
+        )
+        self.record = SubscriptionProvisioning.objects.create(
+            subscription=subscription, step='subscription',
+            customer_profile_id='P1', customer_payment_profile_id='PP1',
+        )
+
+    def _run(self):
+        provisioning.run(self.record.pk)
+        self.record.refresh_from_db()
+        self.record.subscription.refresh_from_db()
+
+    def test_subscription_created(self, service, sleep):
+        service.return_value.create_subscription.return_value = {"subscriptionId": "S1", "messages": OK}
+        self._run()
+        self.assertEqual(self.record.step, 'done')
+        self.assertEqual(self.record.subscription.subscription_id, 'S1')
+        self.assertEqual(self.record.subscription.status, 'active')
+        self.assertFalse(service.return_value.get_customer_profile.called)
+
+    def test_timed_out_create_is_adopted_not_repeated(self, service, sleep):
+        # The first create reaches the gateway but its response is lost
+        gateway = service.return_value
+        gateway.create_subscription.return_value = None
+        gateway.get_customer_profile.return_value = {"subscriptionIds": ["S9"], "messages": OK}
+        self._run()
+        self.assertEqual(gateway.create_subscription.call_count, 1)
+        self.assertEqual(self.record.step, 'done')
+        self.assertEqual(self.record.subscription.subscription_id, 'S9')
+
+    def test_subscriptions_stored_locally_are_not_adopted(self, service, sleep):
+        Subscription.objects.create(
+            user=self.record.subscription.user, name='Basic', amount=Decimal('1.00'), interval_length=1,
+            interval_unit='months', start_date=date(2026, 1, 1), subscription_id='S8',
+        )
+        gateway = service.return_value
+        gateway.create_subscription.side_effect = [None, {"subscriptionId": "S2", "messages": OK}]
+        gateway.get_customer_profile.return_value = {"subscriptionIds": ["S8"], "messages": OK}
+        self._run()
+        self.assertEqual(gateway.create_subscription.call_count, 2)
+        self.assertEqual(self.record.subscription.subscription_id, 'S2')
+
+    def test_unexpected_errors_count_as_attempts(self, service, sleep):
+        gateway = service.return_value
+        gateway.create_subscription.return_value = {"messages": OK}  # no subscriptionId
+        gateway.get_customer_profile.return_value = {"subscriptionIds": [], "messages": OK}
+        for attempt in range(1, 4):
+            self._run()
+            self.assertEqual(self.record.attempts, attempt)
+            self.assertIn('KeyError', self.record.error)
+            # The lease ran out: `resume_provisioning` hands the record to a new run
+            SubscriptionProvisioning.objects.filter(pk=self.record.pk).update(locked_until=None)
+        self.assertEqual(self.record.step, 'failed')
+        self.assertEqual(self.record.subscription.status, 'failed')
+        self.assertNotIn(self.record.pk, provisioning.resumable(0))
@@ -0,0 +1,52 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from payments import reconciliation
+from payments.gateway_stub import GatewayStub
+from payments.models import Subscription
+
+User = get_user_model()
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.stub = GatewayStub(seed=1).start()
+        self.addCleanup(self.stub.stop)
+        settings = override_settings(AUTHORIZENET_API_URL=self.stub.url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        user = User.objects.create_user(username='subscriber', password='pw')
+        local = {'101': 'active', '102': 'active', '103': 'suspended', '104': 'canceled'}
+        Subscription.objects.bulk_create([
+            Subscription(
+                user=user, name='Pro', amount=Decimal('9.99'), interval_length=1, interval_unit='months',
+                start_date=date(2026, 1, 1), subscription_id=subscription_id, status=status,
+            )
+            for subscription_id, status in local.items()
+        ])
+        self.stub.subscriptions.update({'101': 'active', '102': 'canceled', '103': 'active'})
+
+    def statuses(self):
+        return dict(Subscription.objects.values_list('subscription_id', 'status'))
+
+    def test_listing_updates_changed_statuses(self):
+        stats = reconciliation.reconcile(page_size=2)
+        self.assertEqual((stats['listed'], stats['changed'], stats['checked']), (3, 2, 0))
+        self.assertEqual(self.statuses(), {'101': 'active', '102': 'canceled', '103': 'active', '104': 'canceled'})
+        self.assertFalse(Subscription.objects.filter(subscription_id__in=['101', '102', '103'], last_synced_at=None).exists())
+
+    def test_per_id_checks_cover_open_subscriptions_only(self):
+        stats = reconciliation.reconcile(use_list=False, max_age=0)
+        self.assertEqual((stats['listed'], stats['checked'], stats['changed'], stats['errors']), (0, 3, 2, 0))
+        self.assertEqual(self.stub.calls['ARBGetSubscriptionStatusRequest'], 3)
+        self.assertEqual(self.statuses()['102'], 'canceled')
+
+    def test_gateway_errors_leave_rows_alone(self):
+        self.stub.error_rate = 1.0
+        stats = reconciliation.reconcile(max_age=0)
+        self.assertEqual((stats['changed'], stats['errors']), (0, 3))
+        self.assertEqual(self.statuses()['102'], 'active')
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from payments import renewals
+from payments.models import Subscription, SubscriptionPayment
+
+User = get_user_model()
+
+
+class BillingDateTests(TestCase):
+    def test_month_end_start_clamps_without_drifting(self):
+        start = date(2026, 1, 31)
+        self.assertEqual(renewals.billing_date_after(start, 1, 'months', date(2026, 1, 31)), date(2026, 2, 28))
+        self.assertEqual(renewals.billing_date_after(start, 1, 'months', date(2026, 2, 28)), date(2026, 3, 31))
+        self.assertEqual(renewals.billing_date_after(start, 1, 'months', date(2028, 1, 31)), date(2028, 2, 29))
+        self.assertEqual(renewals.billing_date_after(start, 3, 'months', date(2026, 5, 1)), date(2026, 7, 31))
+
+    def test_day_intervals_and_dates_before_start(self):
+        self.assertEqual(renewals.billing_date_after(date(2026, 1, 1), 10, 'days', date(2026, 1, 11)), date(2026, 1, 21))
+        self.assertEqual(renewals.billing_date_after(date(2026, 3, 5), 1, 'months', date(2026, 1, 1)), date(2026, 3, 5))
+
+    def test_payment_advances_billing_date_once(self):
+        user = User.objects.create_user(username='subscriber', password='pw')
+        start = timezone.localdate() - timedelta(days=3)
+        subscription = Subscription.objects.create(
+            user=user, name='Pro', amount=Decimal('9.99'), interval_length=1, interval_unit='months',
+            start_date=start, subscription_id='S1',
+        )
+        self.assertEqual(subscription.next_billing_date, start)
+        payment = SubscriptionPayment.objects.create(
+            subscription=subscription, transaction_id='P1', amount=Decimal('9.99'), status='Success',
+        )
+        self.assertEqual(renewals.advance([payment]), 1)
+        self.assertEqual(renewals.advance([payment]), 0)
+        subscription.refresh_from_db()
+        expected = renewals.billing_date_after(start, 1, 'months', timezone.localdate(payment.date))
+        self.assertEqual(subscription.next_billing_date, expected)
+        self.assertNotIn(subscription, renewals.dunning())
+
+
+class UpcomingRenewalsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='pw', is_staff=True))
+        user = User.objects.create_user(username='subscriber', password='pw')
+        self.today = timezone.localdate()
+        Subscription.objects.bulk_create([
+            Subscription(
+                user=user, name='Pro', amount=Decimal('1.00'), interval_length=1, interval_unit='months',
+                start_date=self.today, next_billing_date=self.today, subscription_id=f'S{i}', status='active',
+            )
+            for i in range(1300)
+        ])
+
+    def test_pages_walk_every_row_once_when_billing_dates_tie(self):
+        seen = []
+        url = reverse('upcoming-renewals') + '?page_size=100'
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['subscription_id'] for row in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        self.assertEqual(pages, 13)
+        self.assertEqual(len(seen), 1300)
+        self.assertEqual(len(set(seen)), 1300)
+        self.assertEqual(response.data['total'], {"count": 1300, "amount": "1300.00"})
+
+    def test_bad_cursor_is_not_found(self):
+        response = self.client.get(reverse('upcoming-renewals') + '?cursor=nope')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from payments import rollups
+from payments.models import Transaction
+
+User = get_user_model()
+
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='revenue', password='pw')
+        rows = [('captured', '10.00')] * 6 + [('captured', '5.00')] * 4 + [('refunded', '5.00'), ('failed', '7.00')]
+        Transaction.objects.bulk_create([
+            Transaction(user=user, transaction_id=f'R{i}', amount=Decimal(amount), status=status)
+            for i, (status, amount) in enumerate(rows)
+        ])
+        self.today = timezone.localdate()
+
+    def test_rollups_match_source_and_total_is_net(self):
+        rollups.refresh(rebuild=True)
+        report = {row['status']: row for row in rollups.report('day', self.today, self.today, 'status')}
+        self.assertEqual(report['captured']['count'], 10)
+        self.assertEqual(report['captured']['amount'], Decimal('80.00'))
+        self.assertEqual(rollups.net_revenue('day', self.today, self.today, 'status'), Decimal('75.00'))
+
+        # Incremental refresh picks up a status change
+        Transaction.objects.filter(transaction_id='R11').update(status='captured', updated_at=timezone.now())
+        rollups.refresh()
+        self.assertEqual(rollups.net_revenue('month', self.today, self.today, 'status'), Decimal('82.00'))
+
+    def test_report_view(self):
+        rollups.refresh(rebuild=True)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin', password='pw', is_staff=True))
+        response = client.get(reverse('revenue-report'), {
+            "start": self.today.isoformat(), "end": self.today.isoformat(), "group_by": "status",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], {"count": 12, "amount": "75.00"})
+        self.assertIsNotNone(response.data['as_of'])
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from payments import settlement
+from payments.gateway_stub import GatewayStub
+from payments.models import Subscription, SubscriptionPayment, Transaction
+from payments.services import AuthorizeNetService
+
+User = get_user_model()
+
+
+class SettlementIngestTests(TestCase):
+    def setUp(self):
+        self.stub = GatewayStub(seed=1).start()
+        self.addCleanup(self.stub.stop)
+        settings = override_settings(AUTHORIZENET_API_URL=self.stub.url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username='buyer', password='pw')
+
+    def test_batch_is_applied_once(self):
+        charge = AuthorizeNetService().create_transaction('25.00', 'nonce')
+        trans_id = charge['transactionResponse']['transId']
+        Transaction.objects.create(user=self.user, transaction_id=trans_id, amount=Decimal('25.00'), status='authorized')
+        subscription = Subscription.objects.create(
+            user=self.user, name='Pro', amount=Decimal('10.00'), interval_length=1, interval_unit='months',
+            start_date=timezone.localdate() - timedelta(days=3), subscription_id='S1',
+        )
+        self.stub.subscriptions['S1'] = 'active'
+        self.stub.settle()
+
+        stats = settlement.ingest(since=timezone.now() - timedelta(days=1), page_size=1)
+        self.assertEqual((stats['batches'], stats['transactions'], stats['updated'], stats['created']), (1, 2, 1, 1))
+        self.assertEqual(Transaction.objects.get(transaction_id=trans_id).status, 'captured')
+        payment = SubscriptionPayment.objects.get(subscription=subscription)
+        self.assertEqual((payment.amount, payment.status), (Decimal('10.00'), 'Success'))
+        self.assertEqual(Transaction.objects.get(transaction_id=payment.transaction_id).user, self.user)
+        subscription.refresh_from_db()
+        self.assertGreater(subscription.next_billing_date, timezone.localdate())
+
+        # The cursor has passed the batch
+        self.assertEqual(settlement.ingest()['batches'], 0)
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_gateway_failure_raises(self):
+        self.stub.http_error_rate = 1.0
+        with self.assertRaises(settlement.SettlementError):
+            settlement.ingest()
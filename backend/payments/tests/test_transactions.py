@@ -0,0 +1,64 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from payments import archival
+from payments.models import Transaction
+
+User = get_user_model()
+
+
+class TransactionListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url):
+        seen, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['transaction_id'] for row in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        return seen, pages
+
+    def test_rows_inserted_together_are_listed_once(self):
+        # One batch run: every row shares created_at
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, transaction_id=f'T{i}', amount=Decimal('1.00'), status='captured')
+            for i in range(1100)
+        ])
+        Transaction.objects.update(created_at=timezone.now())
+        seen, pages = self._walk(reverse('transaction-list') + '?page_size=500')
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(seen), 1100)
+        self.assertEqual(len(set(seen)), 1100)
+
+    def test_newest_first_then_the_archive(self):
+        now = timezone.now()
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, transaction_id=f'T{i}', amount=Decimal('10.00'), status='captured')
+            for i in range(4)
+        ])
+        for i in range(4):
+            Transaction.objects.filter(transaction_id=f'T{i}').update(created_at=now - timedelta(days=400 * (i > 1), hours=i))
+        Transaction.objects.create(user=self.user, transaction_id='R1', amount=Decimal('5.00'), status='refunded')
+        archival.archive('transactions', pause=0)
+
+        seen, _ = self._walk(reverse('transaction-list') + '?page_size=2')
+        self.assertEqual(seen, ['R1', 'T0', 'T1', 'T2', 'T3'])
+
+        response = self.client.get(reverse('transaction-summary'))
+        self.assertEqual(response.data, {"count": 5, "total_spent": "35.00"})
+
+        self.assertEqual(Transaction.objects.count(), 3)
+        archived = archival.tiers('transactions')[-1].get(transaction_id='T3')
+        response = self.client.get(reverse('transaction-detail', args=[archived.id]))
+        self.assertEqual(response.data['transaction_id'], 'T3')
@@ -0,0 +1,37 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from payments import transport
+from payments.gateway_stub import GatewayStub
+from payments.services import AuthorizeNetService
+
+
+class GatewayTransportTests(SimpleTestCase):
+    def setUp(self):
+        self.stub = GatewayStub(seed=1).start()
+        self.addCleanup(self.stub.stop)
+
+    def test_keep_alive_connection_is_reused(self):
+        gateway = transport.GatewayTransport(pool_maxsize=2)
+        self.addCleanup(gateway.close)
+        body = json.dumps({"createTransactionRequest": {"merchantAuthentication": {"name": "login"}}})
+        for _ in range(5):
+            self.assertEqual(gateway.post(self.stub.url, body).status_code, 200)
+        stats = gateway.stats()
+        self.assertEqual((stats['requests'], stats['connections_opened'], stats['connections_reused']), (5, 1, 4))
+
+    def test_one_transport_per_process(self):
+        self.assertIs(transport.get_transport(), transport.get_transport())
+        parent = transport.get_transport()
+        with mock.patch('payments.transport.os.getpid', return_value=-1):
+            child = transport.get_transport()
+        self.addCleanup(child.close)
+        self.assertIsNot(child, parent)
+        self.assertEqual(child.pid, -1)
+
+    def test_http_errors_are_reported_as_no_response(self):
+        self.stub.http_error_rate = 1.0
+        with override_settings(AUTHORIZENET_API_URL=self.stub.url):
+            self.assertIsNone(AuthorizeNetService().create_transaction('1.00', 'nonce'))
@@ -0,0 +1,95 @@
+import hashlib
+import hmac
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from payments import webhooks
+from payments.models import ChargeAttempt, Transaction, WebhookEvent
+
+from .responses import APPROVED
+
+User = get_user_model()
+
+
+class RecordingWebhookWriter(webhooks.WebhookWriter):
+    def __init__(self):
+        super().__init__(batch_size=100, interval=0.01)
+        self.applied = []
+
+    def apply(self, batch):
+        self.applied.extend(batch)
+
+
+def _notification(notification_id, event_type='net.authorize.payment.authcapture.created', trans_id='7001'):
+    return {
+        "notificationId": notification_id,
+        "eventType": event_type,
+        "eventDate": "2026-01-05T10:00:00Z",
+        "payload": {"id": trans_id, "responseCode": 1, "authAmount": 12.5},
+    }
+
+
+@override_settings(AUTHORIZENET_SIGNATURE_KEY='A1B2C3')
+class WebhookTests(TestCase):
+    url = reverse('authorizenet-webhook')
+
+    def post(self, event, signature=None):
+        body = json.dumps(event).encode()
+        if signature is None:
+            signature = 'sha512=' + hmac.new(b'A1B2C3', body, hashlib.sha512).hexdigest().upper()
+        return self.client.post(self.url, body, content_type='application/json', HTTP_X_ANET_SIGNATURE=signature)
+
+    def test_signature_is_required(self):
+        writer = RecordingWebhookWriter()
+        with mock.patch('payments.views.webhooks.get_writer', return_value=writer):
+            self.assertEqual(self.post(_notification('n1'), signature='sha512=00').status_code, 401)
+            self.assertEqual(self.post(_notification('n1')).status_code, 200)
+        writer.close()
+        self.assertEqual([e['notificationId'] for e in writer.applied], ['n1'])
+
+    def test_duplicate_notification_is_applied_once(self):
+        writer = RecordingWebhookWriter()
+        with mock.patch('payments.views.webhooks.get_writer', return_value=writer):
+            self.assertEqual(self.post(_notification('n1')).status_code, 200)
+            self.assertEqual(self.post(_notification('n1')).status_code, 200)
+        writer.close()
+        self.assertEqual(len(writer.applied), 1)
+
+        # Redelivered after a restart: the WebhookEvent row catches it
+        self.assertEqual(webhooks.apply_events([_notification('n1'), _notification('n1')]), 1)
+        self.assertEqual(webhooks.apply_events([_notification('n1')]), 0)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.assertEqual(Transaction.objects.get(transaction_id='7001').status, 'captured')
+
+
+@mock.patch('payments.views.AuthorizeNetService.create_transaction', return_value=APPROVED)
+class ChargeAfterWebhookTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('payment-charge')
+
+    def test_charge_claims_row_a_webhook_stored_first(self, create_transaction):
+        Transaction.objects.create(transaction_id='60001', amount=Decimal('10.00'), status='captured')
+        response = self.client.post(self.url, {"amount": "10.00", "nonce": "n"}, format='json')
+        self.assertEqual(response.status_code, 201)
+        transaction = Transaction.objects.get(transaction_id='60001')
+        self.assertEqual(transaction.user, self.user)
+        self.assertEqual(transaction.status, 'captured')
+
+    def test_charge_whose_trans_id_belongs_to_another_user_is_kept(self, create_transaction):
+        other = User.objects.create_user(username='other', password='pw')
+        Transaction.objects.create(user=other, transaction_id='60001', amount=Decimal('5.00'), status='captured')
+        response = self.client.post(self.url, {"amount": "10.00", "nonce": "n"}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['status'], 'conflict')
+        self.assertEqual(Transaction.objects.get(transaction_id='60001').user, other)
+        attempt = ChargeAttempt.objects.get(user=self.user)
+        self.assertEqual((attempt.outcome, attempt.transaction_id, attempt.amount), ('conflict', '60001', Decimal('10.00')))
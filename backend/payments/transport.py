@@ -0,0 +1,111 @@
+"""
+Shared HTTP transport for Authorize.Net API calls.
+
+A single pooled ``requests.Session`` is kept per worker process so that
+keep-alive connections to the gateway are reused across
+``AuthorizeNetService`` instances instead of paying a TCP+TLS handshake on
+every call. ``AsyncAuthorizeNetService`` gets the equivalent ``httpx``
+client, one per event loop.
+"""
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class GatewayTransport:
+    def __init__(self, pool_maxsize=10, connect_timeout=3.05, read_timeout=30):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.pid = os.getpid()
+        self.session = requests.Session()
+
+        # pool_connections is the number of hosts kept; pool_maxsize is the
+        # number of idle keep-alive connections retained per host.
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, url, data, headers=None):
+        return self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+
+    def stats(self):
+        requests_sent = 0
+        connections_opened = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+        return {
+            "pid": self.pid,
+            "pool_maxsize": self.pool_maxsize,
+            "requests": requests_sent,
+            "connections_opened": connections_opened,
+            "connections_reused": max(requests_sent - connections_opened, 0),
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Return this process's transport, rebuilding it after a fork."""
+    global _transport
+    transport = _transport
+    if transport is None or transport.pid != os.getpid():
+        with _transport_lock:
+            if _transport is None or _transport.pid != os.getpid():
+                _transport = GatewayTransport(
+                    pool_maxsize=settings.AUTHORIZENET_POOL_MAXSIZE,
+                    connect_timeout=settings.AUTHORIZENET_CONNECT_TIMEOUT,
+                    read_timeout=settings.AUTHORIZENET_READ_TIMEOUT,
+                )
+            transport = _transport
+    return transport
+
+
+class AsyncGatewayTransport:
+    def __init__(self, max_connections=200, pool_maxsize=10, connect_timeout=3.05, read_timeout=30):
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=pool_maxsize,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+
+    async def post(self, url, data, headers=None):
+        return await self.client.post(url, content=data, headers=headers)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+# Clients are bound to the loop they were created on. ASGI servers run one
+# long-lived loop per worker, so in practice this holds a single entry.
+_async_transports = weakref.WeakKeyDictionary()
+
+
+def get_async_transport():
+    loop = asyncio.get_running_loop()
+    transport = _async_transports.get(loop)
+    if transport is None:
+        transport = AsyncGatewayTransport(
+            max_connections=settings.AUTHORIZENET_ASYNC_MAX_CONNECTIONS,
+            pool_maxsize=settings.AUTHORIZENET_POOL_MAXSIZE,
+            connect_timeout=settings.AUTHORIZENET_CONNECT_TIMEOUT,
+            read_timeout=settings.AUTHORIZENET_READ_TIMEOUT,
+        )
+        _async_transports[loop] = transport
+    return transport
@@ -1,20 +1,39 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PaymentView, TransactionViewSet, SubscriptionViewSet, register, ProductViewSet, SubscriptionPlanViewSet
+from .views import (
+    PaymentView, AsyncPaymentView, BatchChargeView, AsyncBatchChargeView, GatewayTransportStatsView, GatewayMetricsView, RevenueReportView, UpcomingRenewalsView, DunningView, ExportView, AuthorizeNetWebhookView,
+    TransactionViewSet,
+    SubscriptionViewSet, AsyncSubscriptionViewSet, PaymentProfileViewSet, register, ProductViewSet, SubscriptionPlanViewSet
+)
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
+if settings.PAYMENTS_ASYNC_VIEWS:
+    charge_view, batch_charge_view, subscription_viewset = AsyncPaymentView, AsyncBatchChargeView, AsyncSubscriptionViewSet
+else:
+    charge_view, batch_charge_view, subscription_viewset = PaymentView, BatchChargeView, SubscriptionViewSet
+
 router = DefaultRouter()
 router.register(r'transactions', TransactionViewSet, basename='transaction')
-router.register(r'subscriptions', SubscriptionViewSet, basename='subscription')
+router.register(r'subscriptions', subscription_viewset, basename='subscription')
+router.register(r'payment-profiles', PaymentProfileViewSet, basename='payment-profile')
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'plans', SubscriptionPlanViewSet, basename='plan')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('charge/', PaymentView.as_view(), name='payment-charge'),
+    path('charge/', charge_view.as_view(), name='payment-charge'),
+    path('charge/batch/', batch_charge_view.as_view(), name='payment-charge-batch'),
+    path('gateway/transport/', GatewayTransportStatsView.as_view(), name='gateway-transport-stats'),
+    path('gateway/metrics/', GatewayMetricsView.as_view(), name='gateway-metrics'),
+    path('reports/revenue/', RevenueReportView.as_view(), name='revenue-report'),
+    path('reports/renewals/', UpcomingRenewalsView.as_view(), name='upcoming-renewals'),
+    path('reports/dunning/', DunningView.as_view(), name='dunning'),
+    path('exports/<slug:name>.<slug:extension>', ExportView.as_view(), name='export'),
+    path('webhooks/authorizenet/', AuthorizeNetWebhookView.as_view(), name='authorizenet-webhook'),
     path('register/', register, name='register'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
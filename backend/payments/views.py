@@ -3,22 +3,48 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from .models import Transaction, Subscription, CustomerProfile, SubscriptionPayment, Product, SubscriptionPlan
+from .models import Transaction, ArchivedTransaction, Subscription, CustomerProfile, SubscriptionPayment, Product, SubscriptionPlan, SubscriptionProvisioning, PaymentProfile, SyncCursor
 from .serializers import (
-    TransactionSerializer, CreatePaymentSerializer, 
-    SubscriptionSerializer, CreateSubscriptionSerializer,
+    TransactionSerializer, TransactionFilterSerializer, RevenueReportFilterSerializer, RenewalFilterSerializer, ExportFilterSerializer,
+    CreatePaymentSerializer, BatchChargeSerializer,
+    SubscriptionSerializer, CreateSubscriptionSerializer, PaymentProfileSerializer,
     ProductSerializer, SubscriptionPlanSerializer
 )
-from .services import AuthorizeNetService
+from .services import AuthorizeNetService, AsyncAuthorizeNetService, gateway_error
+from .transport import get_transport
+from .mixins import AsyncDispatchMixin
+from .pagination import BillingDateCursorPagination, TransactionCursorPagination
+from .idempotency import idempotent
+from .batch import BatchRun, charge_owners, save_approved
+from .provisioning import enqueue as enqueue_provisioning
+from . import archival, attempts, catalog, exports, metrics, profiles, renewals, rollups, webhooks
+from .follower_reads import FollowerReadMixin
+from .authentication import CachedJWTAuthentication, HasMetricsToken, MetricsTokenAuthentication
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.reverse import reverse
+from asgiref.sync import sync_to_async
 from decimal import Decimal
 import uuid
 import datetime
+import logging
+import asyncio
+import json
+import time
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
 class PaymentView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent('charge')
     def post(self, request):
         serializer = CreatePaymentSerializer(data=request.data)
         if serializer.is_valid():
@@ -28,54 +54,299 @@ class PaymentView(APIView):
 
             service = AuthorizeNetService()
             response = service.create_transaction(amount, nonce, descriptor)
+            return self._charge_response(request, amount, response)
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            if response and 'messages' in response:
-                if response['messages']['resultCode'] == "Ok":
-                    t_response = response.get('transactionResponse', {})
-                    if t_response and 'messages' in t_response:
-                        # Success
-                        Transaction.objects.create(
-                            user=request.user,
-                            transaction_id=t_response.get('transId'),
-                            amount=amount,
-                            status='authorized',
-                            response_code=t_response.get('responseCode'),
-                            response_text=t_response['messages'][0].get('description')
-                        )
+    def _charge_response(self, request, amount, response):
+        if response and 'messages' in response:
+            if response['messages']['resultCode'] == "Ok":
+                t_response = response.get('transactionResponse', {})
+                if t_response and 'messages' in t_response:
+                    # Success. A webhook may already have stored this transId
+                    # without an owner; save_approved claims that row.
+                    conflicts = save_approved([Transaction(
+                        user=request.user,
+                        transaction_id=t_response.get('transId'),
+                        amount=amount,
+                        status='authorized',
+                        response_code=t_response.get('responseCode'),
+                        response_text=t_response['messages'][0].get('description')
+                    )])
+                    if conflicts:
+                        # Charged, but recorded only as a conflict ChargeAttempt for review
                         return Response({
-                            "status": "success",
+                            "status": "conflict",
                             "transaction_id": t_response.get('transId'),
-                            "message": t_response['messages'][0].get('description')
-                        }, status=status.HTTP_201_CREATED)
-                    else:
-                        # Failed to get transaction response
-                        error_text = "Unknown error"
-                        if t_response and 'errors' in t_response:
-                             error_text = t_response['errors'][0].get('errorText')
-                            
-                        Transaction.objects.create(
-                             user=request.user,
-                             transaction_id="FAILED",
-                             amount=amount,
-                             status='failed',
-                             response_text=error_text
-                        )
-                        return Response({"status": "error", "message": error_text}, status=status.HTTP_400_BAD_REQUEST)
+                            "message": "The charge was approved, but its transaction ID is already "
+                                       "recorded for another charge. It has been kept for review."
+                        }, status=status.HTTP_409_CONFLICT)
+                    return Response({
+                        "status": "success",
+                        "transaction_id": t_response.get('transId'),
+                        "message": t_response['messages'][0].get('description')
+                    }, status=status.HTTP_201_CREATED)
                 else:
-                    # Transaction Failed or Error
-                    error_text = response['messages']['message'][0]['text']
+                    # Failed to get transaction response
+                    error_text = "Unknown error"
+                    if t_response and 'errors' in t_response:
+                         error_text = t_response['errors'][0].get('errorText')
+
+                    attempts.record(response, request.user.pk, amount)
                     return Response({"status": "error", "message": error_text}, status=status.HTTP_400_BAD_REQUEST)
-            
-            return Response({"status": "error", "message": "No response from gateway"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+            else:
+                # Transaction Failed or Error
+                error_text = response['messages']['message'][0]['text']
+                attempts.record(response, request.user.pk, amount)
+                return Response({"status": "error", "message": error_text}, status=status.HTTP_400_BAD_REQUEST)
+
+        attempts.record(response, request.user.pk, amount)
+        return Response({"status": "error", "message": "No response from gateway"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class AsyncPaymentView(AsyncDispatchMixin, PaymentView):
+    @idempotent('charge')
+    async def post(self, request):
+        serializer = CreatePaymentSerializer(data=request.data)
+        if serializer.is_valid():
+            amount = serializer.validated_data['amount']
+            nonce = serializer.validated_data['nonce']
+            descriptor = serializer.validated_data.get('descriptor')
+
+            service = AsyncAuthorizeNetService()
+            response = await service.create_transaction(amount, nonce, descriptor)
+            return await sync_to_async(self._charge_response)(request, amount, response)
+
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class BatchChargeView(APIView):
+    """
+    Charge many nonces or stored profiles in one request. Results are
+    streamed as NDJSON, one line per charge followed by a summary line:
+    declines as they complete, approved charges once their rows are written
+    (status "conflict" if the transId was already recorded for another charge).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = BatchChargeSerializer(data=request.data)
+        if serializer.is_valid():
+            charges = serializer.validated_data['charges']
+            run = BatchRun(charges, charge_owners(charges, request.user))
+            return StreamingHttpResponse(self._stream(run), content_type='application/x-ndjson')
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def _stream(self, run):
+        return run.stream()
+
+class AsyncBatchChargeView(AsyncDispatchMixin, BatchChargeView):
+    async def post(self, request):
+        return await sync_to_async(super().post)(request)
+
+    def _stream(self, run):
+        return run.astream()
+
+class GatewayTransportStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        # Connection reuse counters for the worker process that served this request
+        return Response(get_transport().stats())
+
+class GatewayMetricsView(APIView):
+    """
+    Gateway metrics in Prometheus text format, for admin users or a scraper
+    sending GATEWAY_METRICS_TOKEN as a bearer token.
+    """
+    authentication_classes = [MetricsTokenAuthentication, CachedJWTAuthentication]
+    permission_classes = [HasMetricsToken | permissions.IsAdminUser]
+
+    def get(self, request):
+        stats = get_transport().stats()
+        body = metrics.render(extra_counters=[
+            ("authorizenet_pool_requests_total", "Requests sent over this process's pooled gateway connections.", stats['requests']),
+            ("authorizenet_pool_connections_opened_total", "Gateway connections opened by this process.", stats['connections_opened']),
+        ])
+        return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class RevenueReportView(APIView):
+    """
+    Revenue per day or month from the rollup table (see payments.rollups).
+
+    Query: `start`, `end` (YYYY-MM-DD, inclusive), `period` (day|month),
+    `group_by` (status|plan|interval), `status` (repeatable). Grouping by
+    status covers all transactions; plan and interval cover subscription
+    payments. `as_of` is the rollup watermark: rows changed after it may
+    not be counted yet. `total.amount` is net revenue: approved amounts
+    minus refunds, leaving out failed and voided rows; `total.count`
+    counts every row.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        filters = RevenueReportFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        data = filters.validated_data
+        args = (data['period'], data['start'], data['end'], data['group_by'], data.get('status'))
+        rows = list(rollups.report(*args))
+        total = rollups.net_revenue(*args)
+        for row in rows:
+            row['amount'] = str(row['amount'].quantize(Decimal('0.01')))
+        cursor = SyncCursor.objects.filter(name=rollups.CURSOR).first()
+        return Response({
+            "period": data['period'],
+            "group_by": data['group_by'],
+            "as_of": cursor.position if cursor else None,
+            "total": {
+                "count": sum(row['count'] for row in rows),
+                "amount": str(total.quantize(Decimal('0.01'))),
+            },
+            "results": rows,
+        })
+
+class UpcomingRenewalsView(generics.ListAPIView):
+    """
+    Active subscriptions billing in the next `days` days (default 7),
+    soonest first, with the expected count and amount for the window.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = SubscriptionSerializer
+    pagination_class = BillingDateCursorPagination
+
+    def get_queryset(self):
+        filters = RenewalFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        today = timezone.localdate()
+        self.window = (today, today + datetime.timedelta(days=filters.validated_data['days'] - 1))
+        return renewals.upcoming(*self.window)
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        total = self.get_queryset().aggregate(count=Count('id'), amount=Sum('amount'))
+        response.data['start'], response.data['end'] = self.window
+        response.data['total'] = {
+            "count": total['count'],
+            "amount": str((total['amount'] or Decimal('0')).quantize(Decimal('0.01'))),
+        }
+        return response
+
+class DunningView(generics.ListAPIView):
+    """
+    Subscriptions to chase: failed or suspended ones, and active ones more
+    than DUNNING_GRACE_DAYS past their billing date with no payment posted.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = SubscriptionSerializer
+    pagination_class = BillingDateCursorPagination
+
+    def get_queryset(self):
+        return renewals.dunning()
+
+class ExportView(APIView):
+    """
+    Streams a whole table for accounting: /exports/transactions.csv,
+    /exports/subscription-payments.ndjson, etc. Optional `start`/`end`
+    (ISO 8601 date or datetime) bound the row time. Gzipped on the fly when
+    the client accepts it.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, name, extension):
+        if name not in exports.EXPORTS or extension not in exports.FORMATS:
+            return Response({"error": "Unknown export"}, status=status.HTTP_404_NOT_FOUND)
+        filters = ExportFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        compress = exports.accepts_gzip(request.headers.get('Accept-Encoding', ''))
+        response = StreamingHttpResponse(
+            exports.stream(name, extension, filters.validated_data.get('start'), filters.validated_data.get('end'), compress),
+            content_type=exports.FORMATS[extension],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{name}.{extension}"'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
+class AuthorizeNetWebhookView(APIView):
+    """
+    Receives Authorize.Net webhook notifications. Acknowledges as soon as the
+    signature checks out; the writes happen in batches on webhooks.WebhookWriter.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        body = request.body
+        if not webhooks.verify_signature(body, request.headers.get(webhooks.SIGNATURE_HEADER)):
+            return Response({"message": "Invalid signature."}, status=status.HTTP_401_UNAUTHORIZED)
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return Response({"message": "Invalid JSON."}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(event, dict) or not event.get('notificationId'):
+            return Response({"message": "notificationId is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        webhooks.get_writer().add(event)
+        return Response(status=status.HTTP_200_OK)
+
+class TransactionViewSet(FollowerReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    The user's transactions, newest first, cursor-paginated.
+
+    Filters: `status` (repeatable), `min_amount`, `max_amount`,
+    `created_after`, `created_before` (ISO 8601 date or datetime).
+
+    Served from follower reads, so a page can trail writes by a few
+    seconds, except right after the user's own writes. Archived
+    transactions are listed after the recent ones and can be retrieved
+    by id like any other.
+    """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = TransactionSerializer
+    archive_continuation = None
+    pagination_class = TransactionCursorPagination
 
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user).order_by('-created_at')
+        queryset = Transaction.objects.filter(user=self.request.user).order_by('-created_at')
+        if self.action != 'list':
+            return queryset
+
+        filters = TransactionFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        data = filters.validated_data
+        # Pages come from the primary table while the range reaches it and
+        # then continue in the archive, see TransactionCursorPagination
+        tiers = archival.tiers('transactions', data.get('created_after'), data.get('created_before'))
+        queryset = tiers[0].filter(user=self.request.user).order_by('-created_at')
+        if len(tiers) > 1:
+            self.archive_continuation = archival.boundary('transactions')
+        if data.get('status'):
+            queryset = queryset.filter(status__in=data['status'])
+        if 'min_amount' in data:
+            queryset = queryset.filter(amount__gte=data['min_amount'])
+        if 'max_amount' in data:
+            queryset = queryset.filter(amount__lte=data['max_amount'])
+        return queryset
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            return generics.get_object_or_404(ArchivedTransaction, user=self.request.user, pk=self.kwargs['pk'])
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Count and net amount spent over all of the user's transactions, archived ones included."""
+        count, spent = 0, Decimal('0')
+        for rows in archival.tiers('transactions'):
+            totals = rows.filter(user=request.user).aggregate(
+                count=Count('id'),
+                charged=Sum('amount', filter=Q(status__in=Transaction.CHARGED_STATUSES)),
+                refunded=Sum('amount', filter=Q(status='refunded')),
+            )
+            count += totals['count']
+            spent += (totals['charged'] or 0) - (totals['refunded'] or 0)
+        return Response({"count": count, "total_spent": str(spent.quantize(Decimal('0.01')))})
 
 class SubscriptionViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
@@ -84,106 +355,283 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Subscription.objects.filter(user=self.request.user)
 
+    @idempotent('subscription-create')
     def create(self, request):
         serializer = CreateSubscriptionSerializer(data=request.data)
         if serializer.is_valid():
             service = AuthorizeNetService()
-            user = request.user
+            data = serializer.validated_data
+            saved = None
+            if 'payment_profile' in data:
+                saved = self._saved_payment_profile(request.user, data['payment_profile'])
+                if saved is None:
+                    return Response({"message": "Payment profile not found."}, status=400)
+            if self._respond_async(request):
+                return self._provision_later(request, data, saved)
+
+            if saved:
+                # Returning customer with a saved card: a single gateway call
+                sub_response = service.create_subscription(
+                    **self._subscription_request(data, saved.customer_profile, saved.payment_profile_id)
+                )
+                return self._subscription_response(request.user, data, sub_response)
             
             # 1. Get or Create Customer Profile
-            profile, created = CustomerProfile.objects.get_or_create(user=user)
+            profile, created = CustomerProfile.objects.get_or_create(user=request.user)
             
-            customer_payment_profile_id = None
             if created or not profile.authorize_net_profile_id:
                 # Create new profile on Auth.Net
                 response = service.create_customer_profile(
-                    email=serializer.validated_data['email'],
-                    nonce=serializer.validated_data['nonce'],
-                    first_name=serializer.validated_data['first_name'],
-                    last_name=serializer.validated_data['last_name']
+                    email=data['email'],
+                    nonce=data['nonce'],
+                    first_name=data['first_name'],
+                    last_name=data['last_name']
                 )
-                
-                if response and response['messages']['resultCode'] == "Ok":
-                    profile.authorize_net_profile_id = response['customerProfileId']
-                    profile.save()
-                    if 'customerPaymentProfileIdList' in response:
-                        customer_payment_profile_id = response['customerPaymentProfileIdList'][0]
-                else:
-                     details = "Unknown Error"
-                     if response:
-                         details = response['messages']['message'][0]['text']
-                     return Response({"message": f"Failed to create customer profile: {details}"}, status=400)
+                customer_payment_profile_id, error = self._store_customer_profile(profile, response)
             else:
                 # User exists. Create a new payment profile for this subscription.
                 pp_response = service.create_customer_payment_profile(
                     customer_profile_id=profile.authorize_net_profile_id,
-                    nonce=serializer.validated_data['nonce'],
-                    first_name=serializer.validated_data['first_name'],
-                    last_name=serializer.validated_data['last_name']
+                    nonce=data['nonce'],
+                    first_name=data['first_name'],
+                    last_name=data['last_name']
                 )
+                customer_payment_profile_id, error = self._payment_profile_result(profile, pp_response)
 
-                if pp_response and pp_response['messages']['resultCode'] == "Ok":
-                     if 'customerPaymentProfileId' in pp_response:
-                        customer_payment_profile_id = pp_response['customerPaymentProfileId']
-                else:
-                     details = "Unknown Error"
-                     if pp_response:
-                         details = pp_response['messages']['message'][0]['text']
-                     return Response({"message": f"Failed to create payment profile: {details}"}, status=400)
-
+            if error:
+                return error
 
             # 2. Create Subscription
             if not customer_payment_profile_id:
                  return Response({"message": "Payment profile ID not found."}, status=400)
 
             sub_response = service.create_subscription(
-                name=serializer.validated_data['name'],
-                amount=serializer.validated_data['amount'],
-                interval_length=serializer.validated_data['interval_length'],
-                interval_unit=serializer.validated_data['interval_unit'],
-                start_date=datetime.date.today().isoformat(),
-                customer_profile_id=profile.authorize_net_profile_id,
-                customer_payment_profile_id=customer_payment_profile_id
+                **self._subscription_request(data, profile, customer_payment_profile_id)
             )
+            return self._subscription_response(request.user, data, sub_response)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def _respond_async(self, request):
+        # RFC 7240: `Prefer: respond-async` asks for a 202 and background provisioning
+        return 'respond-async' in request.headers.get('Prefer', '').lower()
 
-            if sub_response and sub_response['messages']['resultCode'] == "Ok":
-                subscription = Subscription.objects.create(
-                    user=user,
-                    subscription_id=sub_response['subscriptionId'],
-                    name=serializer.validated_data['name'],
-                    amount=serializer.validated_data['amount'],
-                    interval_length=serializer.validated_data['interval_length'],
-                    interval_unit=serializer.validated_data['interval_unit'],
-                    start_date=datetime.date.today(),
-                    status='active'
+    def _saved_payment_profile(self, user, pk):
+        return PaymentProfile.objects.select_related('customer_profile').filter(
+            pk=pk, customer_profile__user=user
+        ).first()
+
+    def _provision_later(self, request, data, saved=None):
+        with transaction.atomic():
+            subscription = Subscription.objects.create(
+                user=request.user,
+                name=data['name'],
+                amount=data['amount'],
+                interval_length=data['interval_length'],
+                interval_unit=data['interval_unit'],
+                start_date=datetime.date.today(),
+                next_billing_date=datetime.date.today(),
+                status='pending'
+            )
+            if saved:
+                # Nothing to tokenize; go straight to the ARB call
+                record = SubscriptionProvisioning.objects.create(
+                    subscription=subscription,
+                    step='subscription',
+                    customer_profile_id=saved.customer_profile.authorize_net_profile_id,
+                    customer_payment_profile_id=saved.payment_profile_id
                 )
-                return Response(SubscriptionSerializer(subscription).data, status=status.HTTP_201_CREATED)
             else:
-                 details = "Unknown Error"
-                 if sub_response:
-                     details = sub_response['messages']['message'][0]['text']
-                 return Response({"message": f"Failed to create subscription: {details}"}, status=400)
+                record = SubscriptionProvisioning.objects.create(
+                    subscription=subscription,
+                    nonce=data['nonce'],
+                    email=data['email'],
+                    first_name=data['first_name'],
+                    last_name=data['last_name']
+                )
+            enqueue_provisioning(record.pk)
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        response = Response(self._provisioning_status(subscription), status=status.HTTP_202_ACCEPTED)
+        response['Location'] = reverse('subscription-provisioning', args=[subscription.pk], request=request)
+        return response
+
+    def _provisioning_status(self, subscription):
+        record = getattr(subscription, 'provisioning', None)
+        return {
+            "subscription": SubscriptionSerializer(subscription).data,
+            "step": record.step if record else "done",
+            "attempts": record.attempts if record else 0,
+            "error": record.error if record and record.error else None,
+        }
+
+    def _poll_wait(self, request):
+        try:
+            wait = float(request.query_params.get('wait', 0))
+        except ValueError:
+            wait = 0
+        return max(0, min(wait, settings.SUBSCRIPTION_PROVISIONING_MAX_WAIT))
+
+    @action(detail=True, methods=['get'])
+    def provisioning(self, request, pk=None):
+        """
+        Provisioning state. `?wait=N` long-polling needs PAYMENTS_ASYNC_VIEWS;
+        here it is ignored, since a sleeping poller would hold a whole worker.
+        """
+        return Response(self._provisioning_status(self.get_object()))
+
+    def _store_customer_profile(self, profile, response):
+        if response and response['messages']['resultCode'] == "Ok":
+            profile.authorize_net_profile_id = response['customerProfileId']
+            profile.save()
+            if response.get('customerPaymentProfileIdList'):
+                payment_profile_id = response['customerPaymentProfileIdList'][0]
+                direct_responses = response.get('validationDirectResponseList') or [None]
+                profiles.remember(profile, payment_profile_id, direct_responses[0])
+                return payment_profile_id, None
+            return None, None
+        details = gateway_error(response)
+        return None, Response({"message": f"Failed to create customer profile: {details}"}, status=400)
+
+    def _payment_profile_result(self, profile, pp_response):
+        payment_profile_id = profiles.payment_profile_id(pp_response)
+        if payment_profile_id:
+            profiles.remember(profile, payment_profile_id, pp_response.get('validationDirectResponse'))
+            return payment_profile_id, None
+        details = gateway_error(pp_response)
+        return None, Response({"message": f"Failed to create payment profile: {details}"}, status=400)
+
+    def _subscription_request(self, data, profile, customer_payment_profile_id):
+        return {
+            "name": data['name'],
+            "amount": data['amount'],
+            "interval_length": data['interval_length'],
+            "interval_unit": data['interval_unit'],
+            "start_date": datetime.date.today().isoformat(),
+            "customer_profile_id": profile.authorize_net_profile_id,
+            "customer_payment_profile_id": customer_payment_profile_id,
+        }
+
+    def _subscription_response(self, user, data, sub_response):
+        if sub_response and sub_response['messages']['resultCode'] == "Ok":
+            subscription = Subscription.objects.create(
+                user=user,
+                subscription_id=sub_response['subscriptionId'],
+                name=data['name'],
+                amount=data['amount'],
+                interval_length=data['interval_length'],
+                interval_unit=data['interval_unit'],
+                start_date=datetime.date.today(),
+                next_billing_date=datetime.date.today(),
+                status='active'
+            )
+            return Response(SubscriptionSerializer(subscription).data, status=status.HTTP_201_CREATED)
+        details = gateway_error(sub_response)
+        return Response({"message": f"Failed to create subscription: {details}"}, status=400)
 
     def destroy(self, request, *args, **kwargs):
         subscription = self.get_object()
+        if not subscription.subscription_id:
+            return Response({"message": "Subscription has not been created on the gateway."}, status=status.HTTP_409_CONFLICT)
         service = AuthorizeNetService()
         
         logger.info(f"Attempting to cancel subscription: {subscription.subscription_id}")
         response = service.cancel_subscription(subscription.subscription_id)
-        
+        return self._cancel_response(subscription, response)
+
+    def _cancel_response(self, subscription, response):
         if response and response['messages']['resultCode'] == "Ok":
             subscription.status = 'canceled'
             subscription.save()
             return Response({"status": "Subscription canceled", "message": "Subscription canceled successfully"})
         else:
-             details = "Unknown Error"
-             if response:
-                 details = response['messages']['message'][0]['text']
+             details = gateway_error(response)
              logger.error(f"Failed to cancel subscription {subscription.subscription_id}: {details}")
              return Response({"message": f"Failed to cancel subscription: {details}"}, status=400)
 
+class AsyncSubscriptionViewSet(AsyncDispatchMixin, SubscriptionViewSet):
+    @idempotent('subscription-create')
+    async def create(self, request):
+        serializer = CreateSubscriptionSerializer(data=request.data)
+        if serializer.is_valid():
+            service = AsyncAuthorizeNetService()
+            data = serializer.validated_data
+            saved = None
+            if 'payment_profile' in data:
+                saved = await sync_to_async(self._saved_payment_profile)(request.user, data['payment_profile'])
+                if saved is None:
+                    return Response({"message": "Payment profile not found."}, status=400)
+            if self._respond_async(request):
+                return await sync_to_async(self._provision_later)(request, data, saved)
+
+            if saved:
+                sub_response = await service.create_subscription(
+                    **self._subscription_request(data, saved.customer_profile, saved.payment_profile_id)
+                )
+                return await sync_to_async(self._subscription_response)(request.user, data, sub_response)
+
+            # 1. Get or Create Customer Profile
+            profile, created = await CustomerProfile.objects.aget_or_create(user=request.user)
+
+            if created or not profile.authorize_net_profile_id:
+                response = await service.create_customer_profile(
+                    email=data['email'],
+                    nonce=data['nonce'],
+                    first_name=data['first_name'],
+                    last_name=data['last_name']
+                )
+                customer_payment_profile_id, error = await sync_to_async(self._store_customer_profile)(profile, response)
+            else:
+                pp_response = await service.create_customer_payment_profile(
+                    customer_profile_id=profile.authorize_net_profile_id,
+                    nonce=data['nonce'],
+                    first_name=data['first_name'],
+                    last_name=data['last_name']
+                )
+                customer_payment_profile_id, error = await sync_to_async(self._payment_profile_result)(profile, pp_response)
+
+            if error:
+                return error
+
+            # 2. Create Subscription
+            if not customer_payment_profile_id:
+                return Response({"message": "Payment profile ID not found."}, status=400)
+
+            sub_response = await service.create_subscription(
+                **self._subscription_request(data, profile, customer_payment_profile_id)
+            )
+            return await sync_to_async(self._subscription_response)(request.user, data, sub_response)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    async def destroy(self, request, *args, **kwargs):
+        subscription = await sync_to_async(self.get_object)()
+        if not subscription.subscription_id:
+            return Response({"message": "Subscription has not been created on the gateway."}, status=status.HTTP_409_CONFLICT)
+        service = AsyncAuthorizeNetService()
+
+        logger.info(f"Attempting to cancel subscription: {subscription.subscription_id}")
+        response = await service.cancel_subscription(subscription.subscription_id)
+        return await sync_to_async(self._cancel_response)(subscription, response)
+
+    @action(detail=True, methods=['get'])
+    async def provisioning(self, request, pk=None):
+        """Provisioning state; `?wait=N` long-polls up to N seconds while pending."""
+        subscription = await sync_to_async(self.get_object)()
+        deadline = time.monotonic() + self._poll_wait(request)
+        while subscription.status == 'pending' and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+            await subscription.arefresh_from_db()
+        return Response(await sync_to_async(self._provisioning_status)(subscription))
+
+
+class PaymentProfileViewSet(viewsets.ReadOnlyModelViewSet):
+    """The user's saved cards; pass an `id` as `payment_profile` when subscribing."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = PaymentProfileSerializer
+
+    def get_queryset(self):
+        return PaymentProfile.objects.filter(customer_profile__user=self.request.user).order_by('-created_at')
+
 
 # Simple Registration View
 from rest_framework.permissions import AllowAny
@@ -205,12 +653,22 @@ def register(request):
     user = User.objects.create_user(username=username, email=email, password=password)
     return Response({"message": "User created successfully"}, status=201)
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(FollowerReadMixin, viewsets.ReadOnlyModelViewSet):
+    # Public and served from the catalog cache; skipping authentication keeps the list off the DB
+    authentication_classes = []
     permission_classes = [permissions.AllowAny] # Allow viewing products without login
     serializer_class = ProductSerializer
     queryset = Product.objects.all()
 
-class SubscriptionPlanViewSet(viewsets.ReadOnlyModelViewSet):
+    # The list is rebuilt from the leaseholder so the cache never holds a stale snapshot
+    def list(self, request, *args, **kwargs):
+        return catalog.respond(request, 'products')
+
+class SubscriptionPlanViewSet(FollowerReadMixin, viewsets.ReadOnlyModelViewSet):
+    authentication_classes = []
     permission_classes = [permissions.AllowAny] # Allow viewing plans without login
     serializer_class = SubscriptionPlanSerializer
     queryset = SubscriptionPlan.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        return catalog.respond(request, 'plans')
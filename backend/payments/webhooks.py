@@ -0,0 +1,226 @@
+"""
+Authorize.Net webhook handling.
+
+The view only verifies the signature and hands the notification to the
+process-wide WebhookWriter, which applies notifications in batches: one
+dedupe query, one insert of WebhookEvent rows and a handful of bulk writes
+per batch instead of several round trips per notification.
+
+Notifications are acknowledged before they are written, so a crash can lose
+the last unflushed batch. ``ingest_settlements`` and
+``reconcile_subscriptions`` remain the backstop for anything missed.
+"""
+import atexit
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import renewals
+from .buffering import MAX_WRITE_ATTEMPTS, BufferedWriter
+from .models import Subscription, SubscriptionPayment, Transaction, WebhookEvent
+from .reconciliation import GATEWAY_STATUSES
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'X-ANET-Signature'
+BULK_BATCH_SIZE = 250
+RECENT_IDS = 10000
+
+PAYMENT_EVENTS = {
+    'net.authorize.payment.authorization.created': 'authorized',
+    'net.authorize.payment.authcapture.created': 'captured',
+    'net.authorize.payment.capture.created': 'captured',
+    'net.authorize.payment.priorAuthCapture.created': 'captured',
+    'net.authorize.payment.void.created': 'voided',
+    'net.authorize.payment.refund.created': 'refunded',
+}
+
+SUBSCRIPTION_EVENTS = {
+    'net.authorize.customer.subscription.created': 'active',
+    'net.authorize.customer.subscription.updated': 'active',
+    'net.authorize.customer.subscription.suspended': 'suspended',
+    'net.authorize.customer.subscription.terminated': 'terminated',
+    'net.authorize.customer.subscription.cancelled': 'canceled',
+    'net.authorize.customer.subscription.expired': 'expired',
+}
+
+# Notifications can arrive out of order; a transaction never moves back to a lower rank
+TRANSACTION_RANK = {'authorized': 0, 'captured': 1, 'failed': 1, 'voided': 2, 'refunded': 2}
+SUBSCRIPTION_TERMINAL = ('canceled', 'expired', 'terminated')
+
+PAYMENT_STATUSES = {'captured': 'Success', 'failed': 'Failed', 'voided': 'Voided', 'refunded': 'Refunded'}
+
+
+def verify_signature(body, header):
+    """Check ``X-ANET-Signature: sha512=<hex>`` against the HMAC-SHA512 of the raw body."""
+    key = settings.AUTHORIZENET_SIGNATURE_KEY
+    if not key or not header or not header.lower().startswith('sha512='):
+        return False
+    expected = hmac.new(key.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected.upper(), header[len('sha512='):].strip().upper())
+
+
+def _event_date(event):
+    try:
+        return parse_datetime(event.get('eventDate') or '')
+    except ValueError:
+        return None
+
+
+def _payment_status(event):
+    status = PAYMENT_EVENTS[event['eventType']]
+    response_code = event.get('payload', {}).get('responseCode')
+    if status in ('authorized', 'captured') and response_code is not None and str(response_code) != '1':
+        return 'failed'
+    return status
+
+
+def _apply_payments(events):
+    final = {}
+    for event in events:
+        payload = event.get('payload', {})
+        if not payload.get('id'):
+            continue
+        transaction_id = str(payload['id'])
+        status = _payment_status(event)
+        previous = final.get(transaction_id)
+        if previous is None or TRANSACTION_RANK[status] >= TRANSACTION_RANK[previous[0]]:
+            final[transaction_id] = (status, payload)
+    if not final:
+        return
+
+    existing = {
+        t.transaction_id: t
+        for t in Transaction.objects.filter(transaction_id__in=final).only('pk', 'transaction_id', 'status')
+    }
+    now = timezone.now()
+    to_update = []
+    to_create = []
+    for transaction_id, (status, payload) in final.items():
+        current = existing.get(transaction_id)
+        if current is None:
+            to_create.append(Transaction(
+                transaction_id=transaction_id,
+                amount=Decimal(str(payload.get('authAmount', 0))),
+                status=status,
+                response_code=str(payload.get('responseCode', '')) or None,
+            ))
+        elif current.status != status and TRANSACTION_RANK[status] >= TRANSACTION_RANK.get(current.status, 0):
+            current.status = status
+            current.updated_at = now
+            to_update.append(current)
+    Transaction.objects.bulk_update(to_update, ['status', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+    Transaction.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+
+    payments = []
+    for payment in SubscriptionPayment.objects.filter(transaction_id__in=final).only(
+        'pk', 'subscription_id', 'transaction_id', 'status', 'date',
+    ):
+        status = PAYMENT_STATUSES.get(final[payment.transaction_id][0])
+        if status and payment.status != status:
+            payment.status = status
+            payment.updated_at = now
+            payments.append(payment)
+    SubscriptionPayment.objects.bulk_update(payments, ['status', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+    renewals.advance(payments)
+
+
+def _apply_subscriptions(events):
+    final = {}
+    for event in events:
+        payload = event.get('payload', {})
+        if not payload.get('id'):
+            continue
+        status = GATEWAY_STATUSES.get(str(payload.get('status', '')).lower()) or SUBSCRIPTION_EVENTS[event['eventType']]
+        final[str(payload['id'])] = status
+
+    by_status = {}
+    for subscription_id, status in final.items():
+        by_status.setdefault(status, []).append(subscription_id)
+    for status, ids in by_status.items():
+        matching = Subscription.objects.filter(subscription_id__in=ids).exclude(status=status)
+        if status not in SUBSCRIPTION_TERMINAL:
+            matching = matching.exclude(status__in=SUBSCRIPTION_TERMINAL)
+        matching.update(status=status, updated_at=timezone.now())
+
+
+def apply_events(events):
+    """Apply a batch of notifications, skipping ones already recorded. Returns the number applied."""
+    unique = OrderedDict()
+    for event in events:
+        unique.setdefault(event['notificationId'], event)
+    seen = set(WebhookEvent.objects.filter(notification_id__in=unique).values_list('notification_id', flat=True))
+    new = sorted(
+        (e for nid, e in unique.items() if nid not in seen),
+        key=lambda e: e.get('eventDate') or '',
+    )
+    if not new:
+        return 0
+
+    with transaction.atomic():
+        WebhookEvent.objects.bulk_create([
+            WebhookEvent(
+                notification_id=e['notificationId'],
+                event_type=e.get('eventType', ''),
+                event_date=_event_date(e),
+                payload=e.get('payload', {}),
+            ) for e in new
+        ], batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+        _apply_payments([e for e in new if e.get('eventType') in PAYMENT_EVENTS])
+        _apply_subscriptions([e for e in new if e.get('eventType') in SUBSCRIPTION_EVENTS])
+    return len(new)
+
+
+class WebhookWriter(BufferedWriter):
+    """Buffers notifications for ``apply_events``, dropping ones this process has already seen."""
+    name = 'webhook-writer'
+    description = 'webhook notifications'
+
+    def __init__(self, batch_size=None, interval=None):
+        super().__init__(
+            batch_size or settings.WEBHOOK_BATCH_SIZE,
+            interval or settings.WEBHOOK_FLUSH_INTERVAL,
+        )
+        self.recent = OrderedDict()
+
+    def add(self, event):
+        """Queue a notification. Returns False for a duplicate this process has already seen."""
+        with self.condition:
+            notification_id = event['notificationId']
+            if notification_id in self.recent:
+                return False
+            self.recent[notification_id] = True
+            if len(self.recent) > RECENT_IDS:
+                self.recent.popitem(last=False)
+            return super().add(event)
+
+    def apply(self, batch):
+        apply_events(batch)
+
+    def dropped(self, batch):
+        ids = [e['notificationId'] for e in batch]
+        logger.error(f"Dropped webhook notifications after {MAX_WRITE_ATTEMPTS} attempts: {ids}")
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer = WebhookWriter()
+            _writer_pid = os.getpid()
+            atexit.register(_writer.close)
+        return _writer
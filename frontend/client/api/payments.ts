@@ -45,6 +45,12 @@ export interface Transaction {
 
 export interface TransactionsResponse {
   results: Transaction[];
+  next: string | null;
+}
+
+export interface TransactionSummary {
+  count: number;
+  total_spent: string;
 }
 
 export interface SubscriptionRequest {
@@ -158,8 +164,16 @@ class PaymentsAPI {
     return response.data;
   }
 
-  async getTransactions(): Promise<Transaction[]> {
-    const response = await this.client.get<Transaction[]>("/transactions/");
+  // Cursor-paginated; pass the previous page's `next` URL to continue
+  async getTransactions(url: string = "/transactions/"): Promise<TransactionsResponse> {
+    const response = await this.client.get<TransactionsResponse>(url);
+    return response.data;
+  }
+
+  async getTransactionSummary(): Promise<TransactionSummary> {
+    const response = await this.client.get<TransactionSummary>(
+      "/transactions/summary/",
+    );
     return response.data;
   }
 
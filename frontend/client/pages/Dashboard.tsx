@@ -33,15 +33,15 @@ export default function Dashboard() {
   useEffect(() => {
     const fetchStats = async () => {
       try {
-        const [transactions, subscriptions] = await Promise.all([
-          paymentsAPI.getTransactions(),
-          paymentsAPI.getSubscriptions(),
-        ]);
+        const [{ results: transactions }, subscriptions, summary] =
+          await Promise.all([
+            paymentsAPI.getTransactions(),
+            paymentsAPI.getSubscriptions(),
+            paymentsAPI.getTransactionSummary(),
+          ]);
 
-        const totalSpent = transactions.reduce(
-          (sum, t) => sum + parseFloat(t.amount.toString()),
-          0,
-        );
+        // Computed server-side: the list is paginated
+        const totalSpent = parseFloat(summary.total_spent);
 
         const activeSubscriptions = subscriptions.filter(
           (s) => s.status === "active",
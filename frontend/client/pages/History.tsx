@@ -15,28 +15,34 @@ import { Trash2, Calendar } from "lucide-react";
 interface HistoryState {
   transactions: Transaction[];
   subscriptions: Subscription[];
+  next: string | null;
   loading: boolean;
+  loadingMore: boolean;
 }
 
 export default function History() {
   const [state, setState] = useState<HistoryState>({
     transactions: [],
     subscriptions: [],
+    next: null,
     loading: true,
+    loadingMore: false,
   });
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [transactions, subscriptions] = await Promise.all([
-          paymentsAPI.getTransactions(),
-          paymentsAPI.getSubscriptions(),
-        ]);
+        const [{ results: transactions, next }, subscriptions] =
+          await Promise.all([
+            paymentsAPI.getTransactions(),
+            paymentsAPI.getSubscriptions(),
+          ]);
 
         setState((prev) => ({
           ...prev,
           transactions,
           subscriptions,
+          next,
           loading: false,
         }));
       } catch (error) {
@@ -48,6 +54,22 @@ export default function History() {
     fetchData();
   }, []);
 
+  const loadMore = async () => {
+    if (!state.next) return;
+    setState((prev) => ({ ...prev, loadingMore: true }));
+    try {
+      const { results, next } = await paymentsAPI.getTransactions(state.next);
+      setState((prev) => ({
+        ...prev,
+        transactions: [...prev.transactions, ...results],
+        next,
+        loadingMore: false,
+      }));
+    } catch (error) {
+      toast.error("Failed to load more transactions");
+      setState((prev) => ({ ...prev, loadingMore: false }));
+    }
+  };
 
 
   if (state.loading) {
@@ -138,6 +160,17 @@ export default function History() {
                     ))}
                   </tbody>
                 </table>
+                {state.next && (
+                  <div className="pt-4 text-center">
+                    <Button
+                      variant="outline"
+                      onClick={loadMore}
+                      disabled={state.loadingMore}
+                    >
+                      {state.loadingMore ? "Loading..." : "Load more"}
+                    </Button>
+                  </div>
+                )}
               </div>
             ) : (
               <div className="py-8 text-center">